@@ -1,91 +1,479 @@
 import sqlite3
 import os
-import tempfile
+import unicodedata
+
+import db_pool
+import metrics
+import migrations
+import query_cache
+import storage
 
 
 DB_FILENAME = os.path.join(os.path.dirname(__file__), "projects.db")
 
+PAGE_SIZE = 20
+
+# Search ranks only the newest matches so very common terms stay fast at 1M rows
+SEARCH_RANK_WINDOW = 2000
+
+# Listing results kept per database file; 0 disables the read-through cache
+CACHE_MAX_ENTRIES = int(os.getenv("PROJECTS_CACHE_ENTRIES", "128"))
+
+_PROJECT_COLUMNS = "id, Title, Description, ImageFileName, CreatedAt"
+
+# Shared with contact_DAL; see storage.resolve_path
+_resolved_paths = storage._resolved_paths
+
 
 def _resolve_db_path():
-    path = DB_FILENAME
-    dirpath = os.path.dirname(path) or "."
-    try:
-        os.makedirs(dirpath, exist_ok=True)
-    except Exception:
-        # If we cannot create the directory, fall back to temp dir
-        pass
-    # If directory is not writable, fall back to temp directory
-    if not os.access(dirpath, os.W_OK):
-        tempdir = tempfile.gettempdir()
-        path = os.path.join(tempdir, os.path.basename(DB_FILENAME))
-    return path
+    return storage.resolve_path(DB_FILENAME)
+
+
+def _get_pool():
+    return storage.projects_pool()
+
+
+def _get_cache():
+    return query_cache.get_cache(_resolve_db_path(), max_entries=CACHE_MAX_ENTRIES)
+
+
+def _cached(key, loader):
+    if not CACHE_MAX_ENTRIES:
+        return loader()
+    return _get_cache().get_or_load(key, loader)
+
+
+def cache_stats():
+    """Hit ratio and invalidation counters for the project listing cache"""
+    return _get_cache().stats()
 
 
 def get_connection():
-    path = _resolve_db_path()
-    return sqlite3.connect(path)
+    """Check out a pooled connection; close() returns it to the pool"""
+    return _get_pool().acquire()
+
 
+MIGRATIONS = []
 
+
+@migrations.migration(MIGRATIONS, "projects table")
+def _create_projects(conn):
+    # IF NOT EXISTS: databases created before versioning start at version 0
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Title TEXT NOT NULL,
+            Description TEXT NOT NULL,
+            ImageFileName TEXT NOT NULL,
+            CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+@migrations.migration(MIGRATIONS, "full-text search index")
+def _create_search_index(conn):
+    """Create the FTS5 index over Title/Description and the triggers that sync it"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'"
+    ).fetchone()
+    if exists:
+        return
+    # External-content table: the index stores no second copy of the text.
+    # One statement per execute(): executescript() would commit mid-migration.
+    for statement in (
+        """
+        CREATE VIRTUAL TABLE projects_fts USING fts5(
+            Title, Description, content='projects', content_rowid='id', prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts(rowid, Title, Description)
+            VALUES (new.id, new.Title, new.Description);
+        END
+        """,
+        """
+        CREATE TRIGGER projects_fts_delete AFTER DELETE ON projects BEGIN
+            INSERT INTO projects_fts(projects_fts, rowid, Title, Description)
+            VALUES ('delete', old.id, old.Title, old.Description);
+        END
+        """,
+        """
+        CREATE TRIGGER projects_fts_update AFTER UPDATE ON projects BEGIN
+            INSERT INTO projects_fts(projects_fts, rowid, Title, Description)
+            VALUES ('delete', old.id, old.Title, old.Description);
+            INSERT INTO projects_fts(rowid, Title, Description)
+            VALUES (new.id, new.Title, new.Description);
+        END
+        """,
+    ):
+        conn.execute(statement)
+    # Index rows that predate the search table
+    conn.execute("INSERT INTO projects_fts(projects_fts) VALUES ('rebuild')")
+
+
+@migrations.migration(MIGRATIONS, "seed projects")
+def _seed_projects(conn):
+    if conn.execute("SELECT 1 FROM projects LIMIT 1").fetchone():
+        return
+    seed_projects = [
+        (
+            "Sign Language Recognition using Deep Learning",
+            "Real-time translator using Python, OpenCV, Mediapipe, TensorFlow, scikit-learn, CNN; achieved 99% accuracy; Springer published.",
+            "sign.webp",
+        ),
+        (
+            "Decentro Vault: Decentralized Banking System",
+            "Decentralized banking with MetaMask wallet integration and secure transaction protocols for crypto management.",
+            "block.webp",
+        ),
+    ]
+    conn.executemany(
+        "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)",
+        seed_projects,
+    )
+
+
+@metrics.timed
+@db_pool.retry_on_lock
 def init_db():
-    os.makedirs(os.path.dirname(__file__), exist_ok=True)
-    with get_connection() as conn:
-        conn.execute(
+    """Apply pending schema migrations; a no-op beyond one pragma read when current"""
+    migrations.migrate(_resolve_db_path(), MIGRATIONS)
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix.
+
+    Each word is quoted so user input can never be parsed as FTS syntax. Single
+    characters are not expanded as prefixes: the prefix index starts at two, and
+    an unindexed one-letter prefix scans most of the vocabulary.
+    """
+    # FTS5 cannot take NUL ("unterminated string") and no other control character means anything in a search
+    text = "".join(" " if unicodedata.category(ch) == "Cc" else ch for ch in text)
+    words = text.split()
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    if terms and len(words[-1]) >= 2:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _projects_query(after_id=None, before_id=None, limit=None):
+    clauses = []
+    params = []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    # Paging backwards walks the index in reverse and flips the page afterwards
+    descending = before_id is not None and after_id is None
+    sql = f"SELECT {_PROJECT_COLUMNS} FROM projects{where} ORDER BY id {'DESC' if descending else 'ASC'}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params, descending
+
+
+@metrics.timed
+def list_projects(after_id=None, limit=None, before_id=None):
+    """Return projects ordered by id ASC.
+
+    Pages are addressed by keyset rather than OFFSET: after_id returns the rows
+    following that id and before_id the rows preceding it, so every page is a
+    primary-key range scan whatever its position. limit=None returns all rows.
+    """
+    rows = _cached(
+        ("list", after_id, before_id, limit),
+        lambda: _load_projects(after_id, before_id, limit),
+    )
+    return list(rows)
+
+
+def _load_projects(after_id=None, before_id=None, limit=None):
+    sql, params, descending = _projects_query(after_id, before_id, limit)
+    with _get_pool().connection() as conn:
+        conn.row_factory = sqlite3.Row
+        rows = [dict(row) for row in conn.execute(sql, params)]
+    if descending:
+        rows.reverse()
+    return rows
+
+
+def iter_projects(after_id=None, limit=None):
+    """Yield projects ordered by id ASC as the cursor produces them.
+
+    The pooled connection stays checked out until the generator is exhausted
+    or closed, so consume it promptly.
+    """
+    sql, params, _ = _projects_query(after_id=after_id, limit=limit)
+    with _get_pool().connection() as conn:
+        cursor = conn.execute(sql, params)
+        cursor.row_factory = sqlite3.Row
+        for row in cursor:
+            yield dict(row)
+
+
+def _has_project(comparison, project_id):
+    with _get_pool().connection() as conn:
+        return conn.execute(
+            f"SELECT 1 FROM projects WHERE id {comparison} ? LIMIT 1", (project_id,)
+        ).fetchone() is not None
+
+
+class ProjectStream:
+    """A forward page of projects that is read lazily while it is rendered.
+
+    Iterate it once; next_after and prev_before become meaningful as rows are
+    consumed, which suits templates that place the page links after the rows.
+    """
+
+    def __init__(self, after_id=None, page_size=PAGE_SIZE):
+        self.after_id = after_id
+        self.page_size = page_size
+        self.first_id = None
+        self.last_id = None
+        self.count = 0
+        self._has_next = False
+
+    def __iter__(self):
+        # One extra row tells us whether there is a next page
+        for project in iter_projects(after_id=self.after_id, limit=self.page_size + 1):
+            if self.count == self.page_size:
+                self._has_next = True
+                break
+            if self.first_id is None:
+                self.first_id = project["id"]
+            self.last_id = project["id"]
+            self.count += 1
+            yield project
+
+    def __bool__(self):
+        return self.count > 0
+
+    @property
+    def next_after(self):
+        return self.last_id if self._has_next else None
+
+    @property
+    def prev_before(self):
+        if self.after_id is None or self.first_id is None:
+            return None
+        return self.first_id if _has_project("<", self.first_id) else None
+
+
+@metrics.timed
+def get_projects_page(after_id=None, before_id=None, page_size=PAGE_SIZE):
+    """Return one page of projects plus the cursors for its neighbours.
+
+    The result dict has "projects", "next_after" (pass as after_id for the next
+    page, None on the last page) and "prev_before" (pass as before_id for the
+    previous page, None on the first page).
+    """
+    page = _cached(
+        ("page", after_id, before_id, page_size),
+        lambda: _load_projects_page(after_id, before_id, page_size),
+    )
+    return dict(page, projects=list(page["projects"]))
+
+
+def _load_projects_page(after_id, before_id, page_size):
+    backwards = before_id is not None and after_id is None
+    # Fetching one extra row tells us whether a page exists in the direction we move
+    if backwards:
+        rows = _load_projects(before_id=before_id, limit=page_size + 1)
+        projects = rows[-page_size:]
+        has_prev = len(rows) > page_size
+    else:
+        rows = _load_projects(after_id=after_id, limit=page_size + 1)
+        projects = rows[:page_size]
+        has_next = len(rows) > page_size
+    # The other direction costs a single indexed probe
+    if not projects:
+        has_next = has_prev = False
+    elif backwards:
+        has_next = _has_project(">", projects[-1]["id"])
+    else:
+        has_prev = after_id is not None and _has_project("<", projects[0]["id"])
+    return {
+        "projects": projects,
+        "next_after": projects[-1]["id"] if has_next else None,
+        "prev_before": projects[0]["id"] if has_prev else None,
+    }
+
+
+@metrics.timed
+def get_projects_validator():
+    """Return a cheap summary of the table state for HTTP cache validation.
+
+    The dict holds "count", "max_id" and "last_modified" (the CreatedAt of the
+    newest row, or None for an empty table). It is cached like the listings,
+    so a repeat call costs only the data_version check.
+    """
+    return dict(_cached(("validator",), _load_projects_validator))
+
+
+def _load_projects_validator():
+    with _get_pool().connection() as conn:
+        count, max_id, last_modified = conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                Title TEXT NOT NULL,
-                Description TEXT NOT NULL,
-                ImageFileName TEXT NOT NULL,
-                CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            SELECT COUNT(*), MAX(id),
+                   (SELECT CreatedAt FROM projects ORDER BY id DESC LIMIT 1)
+            FROM projects
             """
-        )
-        conn.commit()
+        ).fetchone()
+    return {"count": count, "max_id": max_id, "last_modified": last_modified}
 
-        cursor = conn.execute("SELECT COUNT(*) FROM projects")
-        count = cursor.fetchone()[0]
-        if count == 0:
-            seed_projects = [
-                (
-                    "Sign Language Recognition using Deep Learning",
-                    "Real-time translator using Python, OpenCV, Mediapipe, TensorFlow, scikit-learn, CNN; achieved 99% accuracy; Springer published.",
-                    "sign.webp",
-                ),
-                (
-                    "Decentro Vault: Decentralized Banking System",
-                    "Decentralized banking with MetaMask wallet integration and secure transaction protocols for crypto management.",
-                    "block.webp",
-                ),
-            ]
-            conn.executemany(
-                "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)",
-                seed_projects,
-            )
-            conn.commit()
 
+@metrics.timed
+def search_projects(query, page=1, page_size=PAGE_SIZE):
+    """Full-text search over Title and Description, best bm25 match first.
 
-def list_projects():
-    with get_connection() as conn:
+    Returns a dict with "projects", "page" and "has_next". Title matches weigh
+    more than Description matches. When a query matches more than
+    SEARCH_RANK_WINDOW projects, only the newest of them are ranked and paged.
+    """
+    if isinstance(page_size, bool) or not isinstance(page_size, int) or page_size < 1:
+        raise ValueError(f"page_size must be a positive integer, got {page_size!r}")
+    match = _fts_query(query or "")
+    # Like asgi._int_arg, a malformed page number falls back to the first page
+    try:
+        page = int(page)
+    except (TypeError, ValueError):
+        page = 1
+    # Only the rank window is ever paged, so later pages are empty; clamping also
+    # keeps the OFFSET within SQLite's 64-bit integers
+    page = min(max(page, 1), SEARCH_RANK_WINDOW // page_size + 1)
+    if not match:
+        return {"projects": [], "page": page, "has_next": False}
+    result = _cached(
+        ("search", match, page, page_size),
+        lambda: _load_search(match, page, page_size),
+    )
+    return dict(result, projects=list(result["projects"]))
+
+
+def _load_search(match, page, page_size):
+    with _get_pool().connection() as conn:
+        # Walking matches in rowid order is cheap; bm25 over all of them is not
+        cutoff = conn.execute(
+            "SELECT rowid FROM projects_fts WHERE projects_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (match, SEARCH_RANK_WINDOW - 1),
+        ).fetchone()
         conn.row_factory = sqlite3.Row
         rows = conn.execute(
-            "SELECT id, Title, Description, ImageFileName, CreatedAt FROM projects ORDER BY id ASC"
+            """
+            SELECT p.id, p.Title, p.Description, p.ImageFileName, p.CreatedAt
+            FROM (
+                SELECT rowid, bm25(projects_fts, 10.0, 1.0) AS score
+                FROM projects_fts
+                WHERE projects_fts MATCH ? AND rowid >= ?
+                ORDER BY score, rowid
+                LIMIT ? OFFSET ?
+            ) AS hits
+            JOIN projects AS p ON p.id = hits.rowid
+            ORDER BY hits.score, hits.rowid
+            """,
+            (match, cutoff[0] if cutoff else 0, page_size + 1, (page - 1) * page_size),
         ).fetchall()
-        return [dict(row) for row in rows]
+    projects = [dict(row) for row in rows[:page_size]]
+    return {"projects": projects, "page": page, "has_next": len(rows) > page_size}
 
 
-def insert_project(title, description, image_file_name):
+def _validate_project(title, description, image_file_name):
+    """Normalize and validate one project's fields, returning the cleaned tuple"""
+    if not all(value is None or isinstance(value, str) for value in (title, description, image_file_name)):
+        raise ValueError("Project fields must be text")
     # Normalize and validate inputs to prevent whitespace-only values
     title = (title or "").strip()
     description = (description or "").strip()
     image_file_name = (image_file_name or "").strip()
     if not title or not description or not image_file_name:
         raise ValueError("All fields (title, description, image_file_name) are required")
-    with get_connection() as conn:
-        conn.execute(
-            "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)",
-            (title, description, image_file_name),
-        )
+    return title, description, image_file_name
+
+
+_INSERT_PROJECT_SQL = "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)"
+
+
+@metrics.timed
+@db_pool.retry_on_lock
+def insert_project(title, description, image_file_name):
+    values = _validate_project(title, description, image_file_name)
+    with _get_pool().connection() as conn:
+        conn.execute(_INSERT_PROJECT_SQL, values)
+        conn.commit()
+    _get_cache().invalidate()
+
+
+BULK_CHUNK_SIZE = 5000
+
+
+@db_pool.retry_on_lock
+def _write_chunk(chunk):
+    """Insert (row, values) pairs in one transaction; returns per-row failures.
+
+    A failing executemany rolls back and the chunk is replayed row by row, so
+    one bad row costs its neighbours a slower path but never their insert.
+    """
+    with _get_pool().connection() as conn:
+        try:
+            conn.executemany(_INSERT_PROJECT_SQL, [values for _, values in chunk])
+            conn.commit()
+            return []
+        except sqlite3.IntegrityError:
+            conn.rollback()
+        failures = []
+        for row, values in chunk:
+            try:
+                conn.execute(_INSERT_PROJECT_SQL, values)
+            except sqlite3.IntegrityError as e:
+                failures.append((row, str(e)))
         conn.commit()
+        return failures
+
+
+@metrics.timed
+def insert_projects_bulk(records, chunk_size=BULK_CHUNK_SIZE, known_image=None):
+    """Validate and insert many projects, committing every chunk_size rows.
 
+    records is an iterable of (title, description, image_file_name) tuples; an
+    item may instead be an exception describing why that row could not be
+    parsed. known_image, if given, is called with each image file name and a
+    row whose image it rejects is an error, the same check the new-project form
+    makes against the image catalog. Invalid rows are reported, not fatal. Returns a dict with
+    "inserted" and "errors", a list of (row, message) with 1-based rows.
+    """
+    inserted = 0
+    errors = []
+    chunk = []
 
+    def flush():
+        failures = _write_chunk(chunk)
+        errors.extend(failures)
+        return len(chunk) - len(failures)
 
+    for row, record in enumerate(records, start=1):
+        if isinstance(record, Exception):
+            errors.append((row, str(record)))
+            continue
+        try:
+            values = _validate_project(*record)
+        except (TypeError, ValueError) as e:
+            errors.append((row, str(e)))
+            continue
+        if known_image is not None and not known_image(values[2]):
+            errors.append((row, f'Image "{values[2]}" was not found in static/images'))
+            continue
+        chunk.append((row, values))
+        if len(chunk) >= chunk_size:
+            inserted += flush()
+            chunk = []
+    if chunk:
+        inserted += flush()
+    if inserted:
+        _get_cache().invalidate()
+    return {"inserted": inserted, "errors": errors}
@@ -1,32 +1,296 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, abort, appcontext_pushed, current_app, g, render_template, stream_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+from flask.cli import with_appcontext
+from werkzeug.http import is_resource_modified
+from datetime import datetime, timezone
+import functools
+import hashlib
 import os
+import sys
+import threading
+import click
 import DAL
 import contact_DAL
+import db_pool
+import response_cache
+import project_import
+import passwords
+import thumbnails
+import assets
+import compression
+import image_catalog
+import metrics
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-here'  # Change this to a random secret key
-DAL.init_db()
-contact_DAL.init_contact_db()
+# Views, template globals and CLI commands are collected here and attached to
+# each app by create_app()
+_routes = []
+_template_globals = []
+_commands = []
 
-@app.route('/')
+
+def route(rule, **options):
+    def register(view):
+        _routes.append((rule, view, options))
+        return view
+    return register
+
+
+def template_global(fn):
+    _template_globals.append(fn)
+    return fn
+
+
+def command(name):
+    """A `flask <name>` CLI command that runs inside an app context"""
+    def register(fn):
+        cmd = click.command(name)(with_appcontext(fn))
+        _commands.append(cmd)
+        return cmd
+    return register
+
+
+def init_databases():
+    """Bring both databases up to the latest schema version (see migrations.py).
+
+    When the schema is current this is one PRAGMA read per database, so every
+    worker can call it at start-up. Pending migrations run under a file lock,
+    so workers starting together apply each one once.
+    """
+    DAL.init_db()
+    contact_DAL.init_contact_db()
+
+
+_bound_lock = threading.Lock()
+
+
+def _bind_databases():
+    """Migrate the DAL's current database files the first time this process uses them"""
+    bound = current_app.extensions['bound_databases']
+    key = (DAL._resolve_db_path(), contact_DAL._resolve_db_path())
+    if key in bound:
+        return
+    with _bound_lock:
+        if key not in bound:
+            init_databases()
+            bound.add(key)
+
+
+def _remember_connections(sender, **extra):
+    g._db_connections = db_pool.checked_out()
+
+
+def _return_leaked_connections(exc):
+    """Return pooled connections the request checked out and never closed"""
+    leaked = db_pool.release_leaked(g.pop('_db_connections', frozenset()))
+    if leaked:
+        current_app.logger.warning('%d pooled database connection(s) were not closed', leaked)
+
+
+def _get_image_catalog(app=None):
+    """Size, dimensions and hash of every file in static/images, read on first use"""
+    app = app or current_app
+    catalog = app.extensions.get('image_catalog')
+    if catalog is None:
+        with _bound_lock:
+            catalog = app.extensions.get('image_catalog')
+            if catalog is None:
+                catalog = image_catalog.ImageCatalog(os.path.join(app.static_folder, 'images'))
+                app.extensions['image_catalog'] = catalog
+    return catalog
+
+@route('/')
+@response_cache.cached('index.html')
 def home():
     return render_template('index.html', active_page='home')
 
-@app.route('/about')
+@route('/about')
+@response_cache.cached('about.html')
 def about():
     return render_template('about.html', active_page='about')
 
-@app.route('/resume')
+@route('/resume')
+@response_cache.cached('resume.html')
 def resume():
     return render_template('resume.html', active_page='resume')
 
-@app.route('/projects')
+def _get_thumbnails(app=None):
+    """The app's thumbnail cache; the lock keeps concurrent first requests to one builder"""
+    app = app or current_app
+    cache = app.extensions.get('thumbnails')
+    if cache is None:
+        with _bound_lock:
+            cache = app.extensions.get('thumbnails')
+            if cache is None:
+                cache = thumbnails.ThumbnailCache(
+                    os.path.join(app.static_folder, 'images'), app.config['THUMBNAIL_DIR']
+                )
+                app.extensions['thumbnails'] = cache
+    return cache
+
+
+@template_global
+def image_info(filename):
+    """Catalog entry (width, height, format, ...) for a file in static/images, or None"""
+    return _get_image_catalog().get(filename)
+
+
+@template_global
+def responsive_image(filename):
+    """srcset/sizes and intrinsic size for a project image, or None to use the original"""
+    image = image_info(filename)
+    if image is None:
+        return None
+    info = _get_thumbnails().lookup(filename, signature=(image.mtime_ns, image.size))
+    if info is None:
+        return None
+    srcset = {
+        fmt: ', '.join(f"{url_for('thumbnail', name=name)} {w}w" for name, w in variants)
+        for fmt, variants in info['variants'].items()
+    }
+    return {
+        'src': url_for('thumbnail', name=info['variants']['jpeg'][0][0]),
+        'srcset': srcset,
+        'sizes': thumbnails.SIZES,
+        'width': info['width'],
+        'height': info['height'],
+    }
+
+
+@route('/thumbs/<name>')
+def thumbnail(name):
+    # Names carry a content hash, so a given URL never changes
+    response = send_from_directory(current_app.config['THUMBNAIL_DIR'], name, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
+
+STREAM_CHUNK_SIZE = 8192
+
+
+def _buffered(chunks, size=STREAM_CHUNK_SIZE):
+    """Coalesce Jinja's many small fragments into socket-sized chunks"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+_template_version = None
+_template_mtime = None
+
+
+def _get_template_version():
+    """Hash of every template's contents, read once per process so a deploy changes every ETag"""
+    global _template_version, _template_mtime
+    if _template_version is None:
+        folder = os.path.join(current_app.root_path, current_app.template_folder)
+        digest = hashlib.sha256()
+        newest = 0
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            with open(path, 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+            newest = max(newest, os.stat(path).st_mtime)
+        _template_mtime = newest
+        _template_version = digest.hexdigest()[:16]
+    return _template_version
+
+
+def _projects_validators(after_id, before_id, page_size):
+    """Weak ETag and Last-Modified for a projects page, computed without rendering it.
+
+    The ETag is weak: a thumbnail finishing in the background swaps <img> for
+    <picture> without changing it, so it only promises an equivalent page, not
+    the same bytes. Only content-derived state goes in, so every worker gives an
+    unchanged page the same ETag. Last-Modified is the newest of the rows,
+    the templates and the images, so it moves whenever the ETag's inputs do.
+    """
+    state = DAL.get_projects_validator()
+    catalog = _get_image_catalog()
+    key = (
+        f"{_get_template_version()}:{catalog.fingerprint}:{thumbnails.AVAILABLE}:"
+        f"{state['count']}:{state['max_id']}:{state['last_modified']}:"
+        f"{after_id}:{before_id}:{page_size}"
+    )
+    etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+    newest = max(_template_mtime, catalog.newest_mtime_ns / 1e9)
+    if state['last_modified']:
+        # CreatedAt is stored by SQLite as 'YYYY-MM-DD HH:MM:SS' in UTC
+        rows = datetime.strptime(state['last_modified'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        newest = max(newest, rows.timestamp())
+    last_modified = datetime.fromtimestamp(int(newest), timezone.utc) if newest else None
+    return etag, last_modified
+
+
+# SQLite integers are signed 64-bit; binding anything larger raises OverflowError
+SQLITE_MAX_INT = 2 ** 63 - 1
+
+
+def _id_arg(name):
+    """An integer query argument, or None when it is missing, malformed or outside SQLite's range"""
+    value = request.args.get(name, type=int)
+    if value is None or not -SQLITE_MAX_INT - 1 <= value <= SQLITE_MAX_INT:
+        return None
+    return value
+
+
+@route('/projects')
 def projects():
-    projects_list = DAL.list_projects()
-    return render_template('projects.html', active_page='projects', projects=projects_list)
+    # Keyset pagination: ?after=<id> for the next page, ?before=<id> for the previous one
+    after_id = _id_arg('after')
+    before_id = _id_arg('before')
+    page_size = current_app.config['PROJECTS_PAGE_SIZE']
+
+    # Pending flash messages are rendered by base.html, so those responses must be fresh
+    if session.get('_flashes'):
+        return _render_projects(after_id, before_id, page_size)
+
+    etag, last_modified = _projects_validators(after_id, before_id, page_size)
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = _render_projects(after_id, before_id, page_size)
+    else:
+        response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # Let browsers and the CDN keep the page but revalidate it on every use
+    response.cache_control.no_cache = True
+    return response
 
 
-@app.route('/projects/new', methods=['GET', 'POST'])
+def _render_projects(after_id, before_id, page_size):
+    if current_app.config['STREAM_PROJECTS'] and before_id is None:
+        page = DAL.ProjectStream(after_id=after_id, page_size=page_size)
+        chunks = stream_template('projects.html', active_page='projects', projects=page, page=page)
+        return Response(_buffered(chunks), mimetype='text/html')
+
+    page = DAL.get_projects_page(after_id=after_id, before_id=before_id, page_size=page_size)
+    return current_app.make_response(
+        render_template('projects.html', active_page='projects', projects=page['projects'], page=page)
+    )
+
+
+@route('/projects/search')
+def search_projects():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results = DAL.search_projects(query, page=page, page_size=current_app.config['PROJECTS_PAGE_SIZE'])
+    return render_template(
+        'project_search.html',
+        active_page='projects',
+        query=query,
+        projects=results['projects'],
+        page=results['page'],
+        has_next=results['has_next'],
+    )
+
+
+@route('/projects/new', methods=['GET', 'POST'])
 def new_project():
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
@@ -37,6 +301,10 @@ def new_project():
             flash('All fields are required: Title, Description, and Image File Name.', 'error')
             return redirect(url_for('new_project'))
 
+        if image_file_name not in _get_image_catalog():
+            flash(f'Image "{image_file_name}" was not found in static/images.', 'error')
+            return redirect(url_for('new_project'))
+
         try:
             DAL.insert_project(title, description, image_file_name)
         except Exception as e:
@@ -48,7 +316,38 @@ def new_project():
 
     return render_template('project_form.html', active_page='projects')
 
-@app.route('/contact', methods=['GET', 'POST'])
+@route('/projects/import', methods=['POST'])
+def import_projects():
+    # Accept a multipart upload in the 'file' field or the raw request body
+    upload = request.files.get('file')
+    fmt = request.args.get('format') or project_import.detect_format(
+        upload.filename if upload else None,
+        upload.mimetype if upload else request.mimetype,
+    )
+    if fmt not in project_import.FORMATS:
+        return jsonify(error='Unknown import format; use format=csv or format=jsonl.'), 400
+
+    lines = project_import.decode_lines(upload.stream if upload else request.stream)
+    # Rows get the same image check as the new-project form
+    report = project_import.import_projects(lines, fmt, known_image=_get_image_catalog().__contains__)
+    errors = [{'row': row, 'message': message} for row, message in report['errors']]
+    if report['stopped']:
+        # Earlier chunks are already committed, so say how much of the file went in
+        return jsonify(
+            error=f"{report['stopped']}; {report['inserted']} rows before it were imported.",
+            inserted=report['inserted'],
+            errors=errors,
+        ), 400
+    return jsonify(inserted=report['inserted'], errors=errors)
+
+def _store_contact(logger, first_name, last_name, email, future):
+    """Save a contact submission once its password hash is done (runs on a hashing thread)"""
+    try:
+        contact_DAL.insert_contact(first_name, last_name, email, future.result())
+    except Exception:
+        logger.exception('Could not save the contact submission from %s', email)
+
+@route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
         # Get form data
@@ -72,25 +371,149 @@ def contact():
             flash('Password must be at least 4 characters.', 'error')
             return redirect(url_for('contact'))
         
-        # Save contact form data to the contacts database
         try:
-            contact_DAL.insert_contact(first_name, last_name, email, password)
-            flash('Thank you for your message! Your information has been saved.', 'success')
-        except Exception as e:
+            first_name, last_name, email, _ = contact_DAL.validate_contact(first_name, last_name, email, password)
+        except ValueError as e:
             flash(f'Failed to save your information: {e}', 'error')
             return redirect(url_for('contact'))
         
+        # Hash on the bounded worker pool and store the submission when the hash
+        # is done, so the request never waits for the KDF; when the queue is
+        # full, ask the visitor to retry
+        try:
+            future = passwords.get_pool().submit_hash(password)
+        except passwords.HashingPoolFull:
+            flash('We are receiving a lot of messages right now. Please try again in a moment.', 'error')
+            return redirect(url_for('contact'))
+        future.add_done_callback(
+            functools.partial(_store_contact, current_app.logger, first_name, last_name, email)
+        )
+        flash('Thank you for your message! We have received your information.', 'success')
         return redirect(url_for('thank_you'))
     
     return render_template('contact.html', active_page='contact')
 
-@app.route('/thank-you')
+@route('/thank-you')
+@response_cache.cached('thankyou.html')
 def thank_you():
     return render_template('thankyou.html', active_page='contact')
 
+@route('/metrics')
+def metrics_endpoint():
+    # Scraped by Prometheus; block it at the proxy if it should not be public
+    if not current_app.config['METRICS_ENDPOINT']:
+        abort(404)
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@command('export-contacts')
+@click.option('--format', 'fmt', type=click.Choice(contact_DAL.EXPORT_FORMATS), default='csv', show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='File to write (default: stdout).')
+def export_contacts_command(fmt, output):
+    """Stream every contact submission (without passwords) as CSV or NDJSON."""
+    _bind_databases()
+    if output:
+        with open(output, 'w', newline='', encoding='utf-8') as stream:
+            count = contact_DAL.export_contacts(stream, fmt)
+    else:
+        count = contact_DAL.export_contacts(sys.stdout, fmt)
+    click.echo(f'Exported {count} contacts.', err=True)
+
+@command('import-projects')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(project_import.FORMATS), help='Default: guessed from the file extension.')
+@click.option('--chunk-size', type=int, default=DAL.BULK_CHUNK_SIZE, show_default=True)
+def import_projects_command(path, fmt, chunk_size):
+    """Bulk-import projects from a CSV or JSON Lines file."""
+    _bind_databases()
+    fmt = fmt or project_import.detect_format(path)
+    if fmt is None:
+        raise click.UsageError('Cannot tell the format from the file name; pass --format.')
+    with open(path, newline='', encoding='utf-8') as stream:
+        report = project_import.import_projects(
+            stream, fmt, chunk_size=chunk_size, known_image=_get_image_catalog().__contains__
+        )
+    for row, message in report['errors']:
+        click.echo(f'Row {row}: {message}', err=True)
+    click.echo(f"Imported {report['inserted']} projects, {len(report['errors'])} rows rejected.")
+    if report['stopped']:
+        raise click.ClickException(report['stopped'])
+
+@command('assets')
+def assets_command():
+    """Fingerprint and precompress everything in static/."""
+    manifest = assets.build(current_app.static_folder, current_app.config['ASSETS_DIR'])
+    click.echo(f"{len(manifest['files'])} assets written to {current_app.config['ASSETS_DIR']}.")
+
+@command('thumbnails')
+def thumbnails_command():
+    """Pre-build resized variants of every image in static/images."""
+    if not thumbnails.AVAILABLE:
+        raise click.ClickException('Pillow is not installed.')
+    cache = _get_thumbnails()
+    count = cache.prewarm()
+    click.echo(f'{count} images ready, {cache.generated} variants written to {cache.cache_dir}.')
+
+
+
+def create_app(config=None):
+    """Build the site's Flask app; config is a mapping applied over the defaults.
+
+    Creating an app touches neither database nor the image catalog: the
+    databases are migrated by the first request or CLI command that needs them,
+    the catalog is read on first use, and templates are compiled when first
+    rendered. The one exception is the fingerprinted assets. Unless
+    ASSETS_PREBUILT is set, every static file is read and hashed here (only
+    changed files are recompressed and rewritten), so production images
+    prebuild the manifest and only load it.
+    """
+    app = Flask(__name__)
+    app.config.update(
+        # Signs the session cookie; always set SECRET_KEY in production
+        SECRET_KEY=os.getenv('SECRET_KEY', 'your-secret-key-here'),
+        # Stream /projects row by row instead of rendering the whole page up front
+        STREAM_PROJECTS=os.getenv('STREAM_PROJECTS', '0') == '1',
+        PROJECTS_PAGE_SIZE=DAL.PAGE_SIZE,
+        # Full-response cache for template-only pages: 'memory', 'disk' or '' to disable
+        RESPONSE_CACHE_BACKEND=os.getenv('RESPONSE_CACHE_BACKEND', 'memory'),
+        RESPONSE_CACHE_DIR=os.getenv('RESPONSE_CACHE_DIR'),
+        RESPONSE_CACHE_MAX_ENTRIES=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', str(response_cache.DEFAULT_MAX_ENTRIES))),
+        # Resized project images (see thumbnails.py); regenerate with `flask thumbnails`
+        THUMBNAIL_DIR=os.getenv('THUMBNAIL_DIR') or os.path.join(app.static_folder, 'thumbs'),
+        # Content-hashed, precompressed static files (see assets.py). With ASSETS_PREBUILT
+        # the manifest written by `flask assets` at build time is loaded instead of rebuilt
+        ASSETS_FINGERPRINT=os.getenv('ASSETS_FINGERPRINT', '1') == '1',
+        ASSETS_PREBUILT=os.getenv('ASSETS_PREBUILT', '0') == '1',
+        ASSETS_DIR=os.getenv('ASSETS_DIR') or os.path.join(app.static_folder, 'dist'),
+        # gzip/brotli for HTML and other text responses; stats() via app.extensions['compression']
+        COMPRESS_RESPONSES=os.getenv('COMPRESS_RESPONSES', '1') == '1',
+        # Serve /metrics (see metrics.py); METRICS_ENABLED=0 turns recording off entirely
+        METRICS_ENDPOINT=os.getenv('METRICS_ENDPOINT', '1') == '1',
+    )
+    app.config.update(config or {})
+
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    for fn in _template_globals:
+        app.add_template_global(fn)
+    for cmd in _commands:
+        app.cli.add_command(cmd)
+    app.extensions['bound_databases'] = set()
+    metrics.init_app(app)
+    app.before_request(_bind_databases)
+    appcontext_pushed.connect(_remember_connections, app)
+    app.teardown_appcontext(_return_leaked_connections)
+
+    if app.config['ASSETS_FINGERPRINT']:
+        assets.init_app(app, app.config['ASSETS_DIR'], rebuild=not app.config['ASSETS_PREBUILT'])
+    if app.config['COMPRESS_RESPONSES']:
+        app.wsgi_app = compression.CompressionMiddleware(app.wsgi_app)
+        app.extensions['compression'] = app.wsgi_app
+    return app
+
+
 if __name__ == '__main__':
     # Allow configuring host/port/debug via environment (useful for Docker)
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', '5000'))
     debug = os.getenv('FLASK_DEBUG', '0') == '1'
-    app.run(host=host, port=port, debug=debug)
+    create_app().run(host=host, port=port, debug=debug)
@@ -0,0 +1,253 @@
+"""
+ASGI variant of the site, for holding many slow connections in one process.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The read-heavy pages (home, about, resume, thank-you, projects and search) are
+async handlers. The event loop only parses requests and sends responses.
+Every DAL call runs on a fixed pool of ASGI_DB_THREADS threads, and Jinja
+rendering (and reading a session cookie for flashes) on ASGI_RENDER_THREADS
+more. At most ASGI_DB_MAX_PENDING calls may be waiting for either pool; past
+that, handlers wait for a slot instead of queueing more work. A client that is
+slow to send or read therefore costs a coroutine, not a thread. The image
+catalog is built during lifespan start-up, before the first request.
+
+Everything else (forms, the import endpoint, static files, thumbnails) is
+handed to the Flask app through a WSGI adapter. Pages with pending flash
+messages are too, because Flask consumes those through its session cookie.
+"""
+
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template, session
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+import DAL
+import db_pool
+import metrics
+from app import SQLITE_MAX_INT, _bind_databases, _get_image_catalog, _projects_validators, create_app
+
+
+DB_THREADS = int(os.getenv("ASGI_DB_THREADS", "8"))
+RENDER_THREADS = int(os.getenv("ASGI_RENDER_THREADS", "4"))
+MAX_PENDING = int(os.getenv("ASGI_DB_MAX_PENDING", "256"))
+# Threads the WSGI adapter uses for the routes Flask still serves
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))
+
+
+class BoundedExecutor:
+    """Runs blocking calls on a fixed thread pool with a cap on waiting calls"""
+
+    def __init__(self, threads=DB_THREADS, max_pending=MAX_PENDING, name="asgi-db"):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.name = name
+        # Both are created on first use, so they belong to the running server
+        # (and its event loop) and can be recreated after shutdown()
+        self._executor = None
+        self._slots = None
+
+    async def run(self, fn, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix=self.name)
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        executor, self._executor, self._slots = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+flask_app = create_app()
+db = BoundedExecutor()
+renderer = BoundedExecutor(RENDER_THREADS, name="asgi-render")
+wsgi_fallback = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+
+def _dal(fn, *args, **kwargs):
+    """Call a DAL function in an app context, migrating the databases first if this process has not yet"""
+    with flask_app.app_context():
+        _bind_databases()
+        return fn(*args, **kwargs)
+
+
+def _flask_context(request):
+    """A Flask request context mirroring the ASGI request, for url_for, session and templates"""
+    return flask_app.test_request_context(
+        request.url.path,
+        base_url=f"{request.url.scheme}://{request.url.netloc}",
+        query_string=request.url.query,
+        headers=[(k, v) for k, v in request.headers.items()],
+    )
+
+
+def _has_flashes(request):
+    with _flask_context(request):
+        return bool(session.get("_flashes"))
+
+
+async def _pending_flashes(request):
+    # Without a session cookie there is nothing to decode, so skip the thread hop
+    if flask_app.config["SESSION_COOKIE_NAME"] not in request.cookies:
+        return False
+    return await renderer.run(_has_flashes, request)
+
+
+def _render(request, template, **context):
+    with _flask_context(request):
+        return render_template(template, **context)
+
+
+def _html(request, body, status=200, headers=None):
+    """An HTML response, compressed the same way the WSGI app compresses"""
+    headers = dict(headers or {})
+    body = body.encode("utf-8")
+    compressor = flask_app.extensions.get("compression")
+    if compressor is not None:
+        encoding, body = compressor.compress(body, request.headers.get("accept-encoding"))
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            if "ETag" in headers and not headers["ETag"].startswith("W/"):
+                headers["ETag"] = "W/" + headers["ETag"]
+    return Response(body, status_code=status, headers=headers, media_type="text/html")
+
+
+def _page(template, **context):
+    async def handler(request):
+        return _html(request, await renderer.run(_render, request, template, **context))
+
+    return handler
+
+
+def _int_arg(request, name):
+    """Like app._id_arg: None when missing, malformed or outside SQLite's integer range"""
+    try:
+        value = int(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+    if not -SQLITE_MAX_INT - 1 <= value <= SQLITE_MAX_INT:
+        return None
+    return value
+
+
+async def projects(request):
+    after_id = _int_arg(request, "after")
+    before_id = _int_arg(request, "before")
+    page_size = flask_app.config["PROJECTS_PAGE_SIZE"]
+
+    etag, last_modified = await db.run(_dal, _projects_validators, after_id, before_id, page_size)
+    headers = {"ETag": quote_etag(etag, weak=True), "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "HTTP_IF_NONE_MATCH": request.headers.get("if-none-match"),
+        "HTTP_IF_MODIFIED_SINCE": request.headers.get("if-modified-since"),
+    }
+    if not is_resource_modified(environ, etag=etag, last_modified=last_modified):
+        return Response(status_code=304, headers=headers)
+
+    page = await db.run(_dal, DAL.get_projects_page, after_id=after_id, before_id=before_id, page_size=page_size)
+    body = await renderer.run(
+        _render, request, "projects.html", active_page="projects", projects=page["projects"], page=page
+    )
+    return _html(request, body, headers=headers)
+
+
+async def search_projects(request):
+    query = request.query_params.get("q", "").strip()
+    page = max(_int_arg(request, "page") or 1, 1)
+    results = await db.run(
+        _dal,
+        DAL.search_projects, query, page=page, page_size=flask_app.config["PROJECTS_PAGE_SIZE"]
+    )
+    body = await renderer.run(
+        _render,
+        request,
+        "project_search.html",
+        active_page="projects",
+        query=query,
+        projects=results["projects"],
+        page=results["page"],
+        has_next=results["has_next"],
+    )
+    return _html(request, body)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    # Read every image now rather than on the first request that needs the catalog
+    await renderer.run(_get_image_catalog, flask_app)
+    yield
+    db.shutdown()
+    renderer.shutdown()
+    db_pool.close_all()
+
+
+native = Starlette(
+    routes=[
+        Route("/", _page("index.html", active_page="home")),
+        Route("/about", _page("about.html", active_page="about")),
+        Route("/resume", _page("resume.html", active_page="resume")),
+        Route("/thank-you", _page("thankyou.html", active_page="contact")),
+        Route("/projects", projects),
+        Route("/projects/search", search_projects),
+    ],
+    lifespan=lifespan,
+)
+# Path -> Flask endpoint name, so both halves report the same metric labels
+NATIVE_PATHS = {
+    route.path: flask_app.url_map.bind("localhost").match(route.path)[0] for route in native.routes
+}
+
+
+async def _timed_native(scope, receive, send):
+    """Serve a native page, recording it in the same metrics as the Flask routes"""
+    endpoint = NATIVE_PATHS[scope["path"]]
+    status = [500]
+
+    async def send_status(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        await send(message)
+
+    in_flight = metrics.IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        await native(scope, receive, send_status)
+    finally:
+        metrics.observe_request(endpoint, scope["method"], status[0], time.perf_counter() - start)
+        in_flight.dec()
+
+
+async def app(scope, receive, send):
+    """Send GETs for the async pages to Starlette and everything else to Flask"""
+    if scope["type"] == "lifespan":
+        await native(scope, receive, send)
+    elif (
+        scope["type"] == "http"
+        and scope["method"] in ("GET", "HEAD")
+        and scope["path"] in NATIVE_PATHS
+        and not await _pending_flashes(Request(scope))
+    ):
+        if metrics.ENABLED:
+            await _timed_native(scope, receive, send)
+        else:
+            await native(scope, receive, send)
+    else:
+        await wsgi_fallback(scope, receive, send)
@@ -0,0 +1,170 @@
+"""
+Fingerprinted static assets with precompressed variants.
+
+build() copies every file in static/ to ASSETS_DIR under a content-hashed
+name (css/styles.css -> css/styles.3f2a9c1b0d4e.css), writes .gz and .br
+siblings for text assets, and records the mapping in manifest.json. A rebuild
+reuses the previous manifest entry of every file whose content is unchanged,
+so it only compresses and writes what changed.
+
+init_app() runs that build at startup (or loads the manifest written by
+`flask assets` at build time), makes url_for('static', filename=...) return
+the hashed name, and serves hashed files with Cache-Control: immutable and the
+smallest encoding the client accepts. Unknown names fall through to Flask's
+normal static handling.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+# Worth precompressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".html", ".json", ".txt", ".xml", ".map"}
+# Skip variants that save less than this fraction of the original
+MIN_SAVING = 0.05
+# Directories under static/ that hold generated, already-hashed files
+SKIP_DIRS = {"thumbs", "dist"}
+MAX_AGE = 31536000
+
+
+def _hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _encodings(data):
+    """Yield (encoding, suffix, compressed bytes) worth keeping for data"""
+    variants = [("gzip", ".gz", lambda b: gzip.compress(b, 9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ("br", ".br", lambda b: brotli.compress(b, quality=11)))
+    for encoding, suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            yield encoding, suffix, compressed
+
+
+def build(static_folder, output_dir):
+    """Fingerprint and precompress every static file; returns the manifest dict"""
+    try:
+        previous = load(output_dir)["files"]
+    except (OSError, ValueError, KeyError):
+        previous = None
+    files = {}
+    skip = {os.path.abspath(os.path.join(static_folder, d)) for d in SKIP_DIRS}
+    skip.add(os.path.abspath(output_dir))
+    for root, dirs, names in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) not in skip)
+        for name in sorted(names):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            hashed = _hashed_name(logical, hashlib.sha256(data).hexdigest()[:HASH_LENGTH])
+            target = os.path.join(output_dir, hashed)
+            entry = previous.get(logical) if previous else None
+            if entry and entry["path"] == hashed and all(
+                os.path.exists(os.path.join(output_dir, path))
+                for path in [hashed] + list(entry["encodings"].values())
+            ):
+                files[logical] = entry
+                continue
+            entry = {"path": hashed, "encodings": {}}
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for encoding, suffix, compressed in _encodings(data):
+                    entry["encodings"][encoding] = hashed + suffix
+                    if not os.path.exists(target + suffix):
+                        _write_atomic(target + suffix, compressed)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+            files[logical] = entry
+    manifest = {"files": files}
+    if files != previous:
+        _write_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def load(output_dir):
+    with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+class Assets:
+    """Lookup tables built from one manifest"""
+
+    def __init__(self, manifest, output_dir):
+        self.output_dir = output_dir
+        self.urls = {logical: entry["path"] for logical, entry in manifest["files"].items()}
+        self.files = {entry["path"]: entry for entry in manifest["files"].values()}
+        # Changes whenever any hashed URL does; caches of rendered pages key on it
+        self.version = hashlib.sha256(json.dumps(sorted(self.urls.items())).encode()).hexdigest()[:HASH_LENGTH]
+
+    def negotiate(self, hashed, accept_encodings):
+        """Return (encoding or None, file to send) for a hashed path"""
+        available = self.files[hashed]["encodings"]
+        best = None
+        for encoding, path in available.items():
+            quality = accept_encodings[encoding]
+            if quality and (best is None or quality > best[0]):
+                best = (quality, encoding, path)
+        if best is None:
+            return None, hashed
+        return best[1], best[2]
+
+
+def _serve_static(filename):
+    assets = current_app.extensions["assets"]
+    if filename not in assets.files:
+        return current_app.send_static_file(filename)
+    encoding, path = assets.negotiate(filename, request.accept_encodings)
+    response = send_from_directory(
+        assets.output_dir, path, mimetype=mimetypes.guess_type(filename)[0], max_age=MAX_AGE
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if assets.files[filename]["encodings"]:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app, output_dir=None, rebuild=True):
+    """Fingerprint app's static files and route url_for('static') through the manifest"""
+    output_dir = output_dir or os.path.join(app.static_folder, "dist")
+    if rebuild or not os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        manifest = build(app.static_folder, output_dir)
+    else:
+        manifest = load(output_dir)
+    assets = Assets(manifest, output_dir)
+    app.extensions["assets"] = assets
+
+    @app.url_defaults
+    def _fingerprint_static_urls(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = assets.urls.get(values["filename"], values["filename"])
+
+    app.view_functions["static"] = _serve_static
+    return assets
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compare the Gunicorn and ASGI servers while slow clients hold connections open.
+
+Each server is started on its own port against the working-copy databases.
+A number of "slow" clients connect and trickle a request header out one line
+per second, never finishing it. Meanwhile, fast clients GET /projects
+over keep-alive connections for a fixed time. The script reports the fast
+clients' throughput and latency for every slow-client count.
+
+Usage:
+    python benchmarks/bench_asgi_concurrency.py --slow 0 50 200 --clients 8 --seconds 5
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    # One worker process each, so the comparison is per process
+    'gunicorn': lambda port: [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app',
+    ],
+    'asgi': lambda port: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+        '--no-access-log', '--log-level', 'warning',
+    ],
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def slow_client(port, stop):
+    """Hold a connection open with a request header that never completes"""
+    try:
+        sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        sock.sendall(b'GET /projects HTTP/1.1\r\nHost: localhost\r\n')
+        i = 0
+        while not stop.wait(1):
+            sock.sendall(f'X-Slow-{i}: 1\r\n'.encode())
+            i += 1
+        sock.close()
+    except OSError:
+        pass  # the server dropped us, which is its right
+
+
+def fast_client(port, seconds, latencies, errors, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request('GET', '/projects', headers={'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            connection.close()
+        elapsed = time.perf_counter() - start
+        with lock:
+            (latencies if ok else errors).append(elapsed)
+    connection.close()
+
+
+def run(port, slow, clients, seconds):
+    """Return (req/s, latencies, errors) for one slow-client count"""
+    stop = threading.Event()
+    holders = [threading.Thread(target=slow_client, args=(port, stop), daemon=True) for _ in range(slow)]
+    for thread in holders:
+        thread.start()
+    time.sleep(1 if slow else 0)  # let the slow connections get accepted first
+
+    latencies, errors, lock = [], [], threading.Lock()
+    workers = [
+        threading.Thread(target=fast_client, args=(port, seconds, latencies, errors, lock))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in holders:
+        thread.join()
+    return len(latencies) / elapsed, latencies, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['gunicorn', 'asgi'])
+    parser.add_argument('--slow', type=int, nargs='+', default=[0, 50, 200])
+    parser.add_argument('--clients', type=int, default=8, help='fast client threads')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--port', type=int, default=8701)
+    args = parser.parse_args()
+
+    env = dict(os.environ, WEB_CONCURRENCY='1', GUNICORN_ACCESS_LOG='', GUNICORN_TIMEOUT='120')
+    print(f"{'server':>8} {'slow':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for offset, name in enumerate(args.servers):
+        port = args.port + offset
+        server = subprocess.Popen(SERVERS[name](port), cwd=ROOT, env=env)
+        try:
+            wait_for_port(port)
+            for slow in args.slow:
+                rate, latencies, errors = run(port, slow, args.clients, args.seconds)
+                if latencies:
+                    print(f"{name:>8} {slow:>5} {rate:>8.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+                          f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>7}")
+                else:
+                    print(f"{name:>8} {slow:>5} {0.0:>8.1f} {'-':>8} {'-':>8} {errors:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
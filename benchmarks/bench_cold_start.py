@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: a fresh interpreter importing the app and serving its first request.
+
+Each run starts a new Python process that imports Flask, imports app.py,
+calls create_app() and serves one GET through the test client. That first
+request includes binding the databases. The script reports the median and
+worst time of each phase, which is what a scale-to-zero platform adds to the
+request that wakes a container.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 10 --path /projects
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, sys, time
+path = sys.argv[1]
+start = time.perf_counter()
+import flask
+flask_done = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get(path).status_code
+served = time.perf_counter()
+print(json.dumps({
+    "status": status,
+    "import flask": flask_done - start,
+    "import app": imported - flask_done,
+    "create_app": created - imported,
+    "first request": served - created,
+    "total": served - start,
+}))
+"""
+
+PHASES = ["import flask", "import app", "create_app", "first request", "total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/projects')
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _CHILD, args.path], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output))
+    statuses = sorted({r['status'] for r in results})
+    print(f"{args.runs} cold starts, GET {args.path} -> {statuses}")
+    print(f"{'phase':>14} {'median ms':>10} {'max ms':>8}")
+    for phase in PHASES:
+        values = [r[phase] * 1000 for r in results]
+        print(f"{phase:>14} {statistics.median(values):>10.1f} {max(values):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
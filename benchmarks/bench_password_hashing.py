@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark contact submissions at several password hashing costs.
+
+For each PBKDF2 iteration count, a number of client threads POST /contact
+concurrently against a temporary database. The route only queues the hash and
+stores the submission when it is done, so the report separates request
+throughput and latency from stored/s, the rate at which submissions reached
+the database (measured until the hashing queue has drained). It also counts
+the submissions turned away because the hashing queue was full.
+
+Usage:
+    python benchmarks/bench_password_hashing.py --iterations 100000 260000 600000 --clients 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import contact_DAL  # noqa: E402
+import db_pool  # noqa: E402
+import passwords  # noqa: E402
+from app import create_app  # noqa: E402
+
+app = create_app()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(iterations, clients, requests_per_client, workers, max_queue):
+    """Return (request seconds, seconds until stored, latencies, rejected) for one cost setting"""
+    pool = passwords.HashingPool(workers=workers, max_queue=max_queue, iterations=iterations)
+    original_get_pool = passwords.get_pool
+    passwords.get_pool = lambda: pool
+    latencies = []
+    rejected = []
+    lock = threading.Lock()
+
+    def client_thread(n):
+        client = app.test_client()
+        for i in range(requests_per_client):
+            data = {
+                'first-name': 'Bench', 'last-name': str(n), 'email': f'bench{n}-{i}@example.com',
+                'message': 'Benchmark', 'password': 'benchmark-password',
+                'confirm-password': 'benchmark-password',
+            }
+            start = time.perf_counter()
+            response = client.post('/contact', data=data)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not response.location.endswith('/thank-you'):
+                    rejected.append(elapsed)
+
+    threads = [threading.Thread(target=client_thread, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        requests_done = time.perf_counter() - start
+        pool.wait_idle()
+        return requests_done, time.perf_counter() - start, latencies, len(rejected)
+    finally:
+        passwords.get_pool = original_get_pool
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[50000, 260000, 600000])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=10, help='requests per client')
+    parser.add_argument('--workers', type=int, default=passwords.WORKERS)
+    parser.add_argument('--max-queue', type=int, default=passwords.MAX_QUEUE)
+    args = parser.parse_args()
+
+    app.config['TESTING'] = True
+    original_filename = contact_DAL.DB_FILENAME
+    with tempfile.TemporaryDirectory() as temp_dir:
+        contact_DAL.DB_FILENAME = os.path.join(temp_dir, "bench_contacts.db")
+        contact_DAL.init_contact_db()
+        print(f"workers={args.workers} max_queue={args.max_queue} clients={args.clients}")
+        print(f"{'iterations':>10} {'req/s':>8} {'stored/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+              f"{'rejected':>8}")
+        try:
+            for iterations in args.iterations:
+                seconds, stored_seconds, latencies, rejected = run(
+                    iterations, args.clients, args.requests, args.workers, args.max_queue
+                )
+                stored = len(latencies) - rejected
+                print(f"{iterations:>10} {len(latencies) / seconds:>8.1f} {stored / stored_seconds:>9.1f} "
+                      f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                      f"{max(latencies) * 1000:>8.1f} {rejected:>8}")
+        finally:
+            db_pool.close_all()
+            contact_DAL.DB_FILENAME = original_filename
+
+
+if __name__ == '__main__':
+    main()
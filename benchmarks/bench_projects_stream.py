@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark buffered vs streamed rendering of the /projects page.
+
+Seeds a temporary projects database at several sizes and renders one page that
+holds the whole table, so the cost of materialising rows is visible. For each
+mode it reports time-to-first-byte, total time and peak Python memory.
+
+Usage:
+    python benchmarks/bench_projects_stream.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DAL  # noqa: E402
+import db_pool  # noqa: E402
+from app import create_app  # noqa: E402
+
+app = create_app()
+
+
+def seed_projects(count):
+    """Insert count projects in a single transaction"""
+    rows = (
+        (f"Benchmark Project {i}", f"Benchmark description for project {i}", "sign.webp")
+        for i in range(count)
+    )
+    with DAL._get_pool().connection() as conn:
+        conn.execute("DELETE FROM projects")
+        conn.executemany(
+            "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)", rows
+        )
+        conn.commit()
+
+
+def fetch(client, stream):
+    """Request /projects, returning (ttfb, total seconds, bytes)"""
+    app.config['STREAM_PROJECTS'] = stream
+    start = time.perf_counter()
+    response = client.get('/projects', buffered=False)
+    chunks = response.iter_encoded()
+    received = len(next(chunks, b''))
+    ttfb = time.perf_counter() - start
+    for chunk in chunks:
+        received += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+    return ttfb, total, received
+
+
+def peak_memory(client, stream):
+    """Peak traced allocation while serving one request"""
+    tracemalloc.start()
+    fetch(client, stream)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per measurement (best is kept)')
+    args = parser.parse_args()
+
+    app.config['TESTING'] = True
+    original_filename = DAL.DB_FILENAME
+    original_page_size = app.config['PROJECTS_PAGE_SIZE']
+    with tempfile.TemporaryDirectory() as temp_dir:
+        DAL.DB_FILENAME = os.path.join(temp_dir, "bench_projects.db")
+        DAL.init_db()
+        client = app.test_client()
+        print(f"{'rows':>8} {'mode':>9} {'ttfb ms':>9} {'total ms':>9} {'peak KiB':>9} {'KiB sent':>9}")
+        try:
+            for size in args.sizes:
+                seed_projects(size)
+                app.config['PROJECTS_PAGE_SIZE'] = size
+                for stream in (False, True):
+                    runs = [fetch(client, stream) for _ in range(args.repeat)]
+                    ttfb = min(r[0] for r in runs)
+                    total = min(r[1] for r in runs)
+                    sent = runs[0][2]
+                    peak = peak_memory(client, stream)
+                    mode = 'streamed' if stream else 'buffered'
+                    print(f"{size:>8} {mode:>9} {ttfb * 1000:>9.1f} {total * 1000:>9.1f} "
+                          f"{peak / 1024:>9.0f} {sent / 1024:>9.0f}")
+        finally:
+            app.config['PROJECTS_PAGE_SIZE'] = original_page_size
+            app.config['STREAM_PROJECTS'] = False
+            db_pool.close_all()
+            DAL.DB_FILENAME = original_filename
+
+
+if __name__ == '__main__':
+    main()
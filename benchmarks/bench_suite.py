@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data access layers and routes at several table sizes.
+
+Seeds temporary projects and contacts databases at each size (grown in place,
+so 1M reuses the 100k rows) and times the DAL and contact_DAL functions and a
+set of routes through the Flask test client. Each measurement runs at least
+three times and until --min-time has passed; the median and best times are
+reported. The query caches are bypassed so the database work is what gets
+measured, and contacts are written synchronously even if write-behind is on.
+
+Results can be saved as a JSON baseline and later runs compared against it.
+A measurement whose best time is slower than the baseline's by more than
+--tolerance is flagged (the best of several runs is far less noisy than the
+median), and the script exits with status 1. Baselines are
+only comparable on the same machine and Python/SQLite versions.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 1000 100000 1000000 --save benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DAL  # noqa: E402
+import contact_DAL  # noqa: E402
+import db_pool  # noqa: E402
+from app import create_app  # noqa: E402
+
+BASELINE_VERSION = 1
+SEED_BATCH = 50000
+
+
+def measure(fn, setup=None, min_time=0.5, max_runs=200):
+    """Time fn (setup is not timed); returns median/min seconds and the run count"""
+    times = []
+    while len(times) < 3 or (sum(times) < min_time and len(times) < max_runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "runs": len(times)}
+
+
+def _count(pool, table):
+    with pool.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _seed(pool, table, sql, make_row, target):
+    """Insert rows until table holds target rows, committing every SEED_BATCH"""
+    have = _count(pool, table)
+    with pool.connection() as conn:
+        while have < target:
+            batch = min(SEED_BATCH, target - have)
+            conn.executemany(sql, (make_row(i) for i in range(have, have + batch)))
+            conn.commit()
+            have += batch
+
+
+def seed(size):
+    _seed(
+        DAL._get_pool(), "projects",
+        "INSERT INTO projects (Title, Description, ImageFileName) VALUES (?, ?, ?)",
+        lambda i: (f"Benchmark Project {i}", f"Benchmark description number {i} for search", "sign.webp"),
+        size,
+    )
+    _seed(
+        contact_DAL._get_pool(), "contacts",
+        "INSERT INTO contacts (first_name, last_name, email, password) VALUES (?, ?, ?, ?)",
+        lambda i: ("Bench", f"User {i}", f"bench{i}@example.com", "not-a-real-hash"),
+        size,
+    )
+
+
+def dal_benchmarks():
+    """(name, fn, setup) for every data access call"""
+    invalidate_contacts = contact_DAL._get_cache().invalidate
+    return [
+        ("DAL.list_projects", DAL.list_projects, None),
+        ("DAL.list_projects[page]", lambda: DAL.list_projects(limit=DAL.PAGE_SIZE), None),
+        ("DAL.get_projects_page", DAL.get_projects_page, None),
+        ("DAL.search_projects", lambda: DAL.search_projects("benchmark"), None),
+        ("DAL.insert_project", lambda: DAL.insert_project("Bench insert", "Timed insert", "sign.webp"), None),
+        ("contact_DAL.insert_contact",
+         lambda: contact_DAL.insert_contact("Bench", "Insert", "insert@example.com", "not-a-real-hash"), None),
+        ("contact_DAL.list_contacts", contact_DAL.list_contacts, None),
+        ("contact_DAL.list_contacts_page", contact_DAL.list_contacts_page, None),
+        ("contact_DAL.get_contact_count", contact_DAL.get_contact_count, invalidate_contacts),
+    ]
+
+
+def route_benchmarks(app):
+    """(name, fn, setup) for requests through the Flask test client"""
+    client = app.test_client()
+
+    def get(path):
+        def fn():
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        return fn
+
+    def post(path, data):
+        def fn():
+            # A fresh client each time, so flash messages do not pile up in one session cookie
+            response = app.test_client().post(path, data=data)
+            assert response.status_code == 302, (path, response.status_code)
+        return fn
+
+    return [
+        ("GET /", get("/"), None),
+        ("GET /resume", get("/resume"), None),
+        ("GET /projects", get("/projects"), None),
+        ("GET /projects/search", get("/projects/search?q=benchmark"), None),
+        ("POST /projects/new", post("/projects/new", {
+            "title": "Bench route", "description": "Posted by the benchmark", "image_file_name": "sign.webp",
+        }), None),
+        ("POST /contact", post("/contact", {
+            "first-name": "Bench", "last-name": "Route", "email": "route@example.com", "message": "Benchmark",
+            "password": "benchmark-password", "confirm-password": "benchmark-password",
+        }), None),
+    ]
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def run(sizes, min_time, only=None):
+    """Return {size: {name: measurement}}, printing each result as it comes"""
+    app = create_app({"TESTING": True})
+    results = {}
+    originals = (DAL.DB_FILENAME, contact_DAL.DB_FILENAME, DAL.CACHE_MAX_ENTRIES, contact_DAL.WRITE_BEHIND)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        DAL.DB_FILENAME = os.path.join(temp_dir, "bench_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(temp_dir, "bench_contacts.db")
+        DAL.CACHE_MAX_ENTRIES = 0
+        contact_DAL.WRITE_BEHIND = False
+        try:
+            DAL.init_db()
+            contact_DAL.init_contact_db()
+            for size in sorted(sizes):
+                start = time.perf_counter()
+                seed(size)
+                print(f"-- {size} rows (seeded in {time.perf_counter() - start:.1f} s)", flush=True)
+                results[str(size)] = {}
+                for name, fn, setup in dal_benchmarks() + route_benchmarks(app):
+                    if only and not any(pattern in name for pattern in only):
+                        continue
+                    result = measure(fn, setup, min_time)
+                    results[str(size)][name] = result
+                    print(f"{size:>8} {name:<32} {result['median'] * 1000:>10.3f} "
+                          f"{result['min'] * 1000:>10.3f} {result['runs']:>5}", flush=True)
+        finally:
+            db_pool.close_all()
+            DAL.DB_FILENAME, contact_DAL.DB_FILENAME, DAL.CACHE_MAX_ENTRIES, contact_DAL.WRITE_BEHIND = originals
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each measurement against the baseline; returns the regressions"""
+    regressions = []
+    print(f"\n{'rows':>8} {'benchmark':<32} {'base best':>10} {'now best':>10} {'change':>8}")
+    for size, measurements in results.items():
+        for name, result in measurements.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                print(f"{size:>8} {name:<32} {'-':>10} {result['min'] * 1000:>10.3f} {'new':>8}")
+                continue
+            change = result["min"] / base["min"] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append((size, name, change))
+            elif change < -tolerance:
+                flag = "  faster"
+            print(f"{size:>8} {name:<32} {base['min'] * 1000:>10.3f} "
+                  f"{result['min'] * 1000:>10.3f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", help="default: the baseline's sizes, else 1000 100000 1000000")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend on each measurement")
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name contains one of these")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fractional slowdown of the best time that counts as a regression")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != BASELINE_VERSION:
+            parser.error(f"{args.compare} is not a version {BASELINE_VERSION} baseline")
+        if baseline["environment"] != environment():
+            print(f"warning: baseline was recorded on {baseline['environment']}", file=sys.stderr)
+    sizes = args.sizes or (sorted(int(size) for size in baseline["results"]) if baseline else [1000, 100000, 1000000])
+
+    print(f"{'rows':>8} {'benchmark':<32} {'median ms':>10} {'best ms':>10} {'runs':>5}")
+    results = run(sizes, args.min_time, args.only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"version": BASELINE_VERSION, "environment": environment(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save}")
+    if baseline:
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
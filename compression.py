@@ -0,0 +1,235 @@
+"""
+WSGI middleware that compresses responses on the fly.
+
+The middleware picks brotli (when the brotli package is installed) or gzip from
+Accept-Encoding. It leaves a response alone if it is small, is not a text type,
+is already encoded (images, precompressed assets), or is marked no-transform.
+
+A buffered body is compressed in one go. The result is kept in a small LRU
+keyed by a hash of the body, so a page that renders the same bytes again
+(a cached template page, say) is not compressed twice. Responses that set
+cookies or are marked private/no-store are never kept. A streamed body
+(stream_template, Content-Length unknown) is compressed chunk by chunk,
+flushing after each chunk so the client still sees it early.
+
+stats() reports bytes in and out, bytes saved, cache hits and the CPU time
+spent compressing.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+
+from werkzeug.datastructures import Headers, ResponseCacheControl
+from werkzeug.http import parse_accept_header, parse_cache_control_header
+
+from query_cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_SIZE = 500
+GZIP_LEVEL = 6
+# Brotli's higher qualities are meant for build-time compression, not per request
+BROTLI_QUALITY = 5
+CACHE_MAX_ENTRIES = 256
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "image/svg+xml",
+)
+
+
+def _encoders():
+    """Available encoders, preferred first when the client rates them equally"""
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    encoders["gzip"] = lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0)
+    return encoders
+
+
+class _StreamEncoder:
+    """Incremental compressor with a flush after every chunk"""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress = lambda data: self._compressor.process(data) + self._compressor.flush()
+            self.finish = self._compressor.finish
+        else:
+            # wbits=31: gzip container, so the result matches Content-Encoding: gzip
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = lambda data: (
+                self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            )
+            self.finish = self._compressor.flush
+
+
+class CompressionMiddleware:
+    """Wrap a WSGI app so text responses are gzip/brotli encoded when accepted"""
+
+    def __init__(self, app, min_size=MIN_SIZE, cache_max_entries=CACHE_MAX_ENTRIES):
+        self.app = app
+        self.min_size = min_size
+        self.encoders = _encoders()
+        self._cache = LRUCache(cache_max_entries) if cache_max_entries else None
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def _negotiate(self, environ):
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return None
+        accept = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING"))
+        best = None
+        for encoding in self.encoders:
+            quality = accept[encoding]
+            if quality and (best is None or quality > best[0]):
+                best = (quality, encoding)
+        return best[1] if best else None
+
+    def compress(self, body, accept_encoding, cacheable=True):
+        """Encode a complete body for an Accept-Encoding value; returns (encoding or None, body).
+
+        For servers that produce the body themselves instead of calling the
+        wrapped WSGI app (see asgi.py).
+        """
+        if len(body) < self.min_size:
+            return None, body
+        encoding = self._negotiate({"HTTP_ACCEPT_ENCODING": accept_encoding})
+        if encoding is None:
+            return None, body
+        return encoding, self._encode_body(body, encoding, cacheable)
+
+    def _should_compress(self, status, headers):
+        if not status.startswith("200") or "Content-Encoding" in headers:
+            return False
+        mimetype = headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if not mimetype.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if parse_cache_control_header(headers.get("Cache-Control"), cls=ResponseCacheControl).no_transform:
+            return False
+        length = headers.get("Content-Length")
+        return length is None or int(length) >= self.min_size
+
+    def _cacheable(self, headers):
+        if "Set-Cookie" in headers:
+            return False
+        cache_control = parse_cache_control_header(headers.get("Cache-Control"), cls=ResponseCacheControl)
+        return not (cache_control.no_store or cache_control.private)
+
+    def _record(self, bytes_in, bytes_out, cpu, cache_hit=False):
+        with self._lock:
+            self.compressed += 1
+            self.cache_hits += cache_hit
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu
+
+    def _encode_body(self, body, encoding, cacheable):
+        key = None
+        if self._cache is not None and cacheable:
+            key = (encoding, hashlib.sha1(body).digest())
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._record(len(body), len(cached), 0.0, cache_hit=True)
+                return cached
+        start = time.thread_time()
+        compressed = self.encoders[encoding](body)
+        self._record(len(body), len(compressed), time.thread_time() - start)
+        if key is not None:
+            self._cache.set(key, compressed)
+        return compressed
+
+    def _encode_stream(self, chunks, encoding):
+        encoder = _StreamEncoder(encoding)
+        bytes_in = bytes_out = 0
+        cpu = 0.0
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                start = time.thread_time()
+                out = encoder.compress(chunk)
+                cpu += time.thread_time() - start
+                bytes_in += len(chunk)
+                bytes_out += len(out)
+                yield out
+            start = time.thread_time()
+            tail = encoder.finish()
+            cpu += time.thread_time() - start
+            bytes_out += len(tail)
+            yield tail
+        finally:
+            self._record(bytes_in, bytes_out, cpu)
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def __call__(self, environ, start_response):
+        encoding = self._negotiate(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+
+        app_iter = self.app(environ, capture)
+        status, header_list, exc_info = captured
+        headers = Headers(header_list)
+        if not self._should_compress(status, headers):
+            with self._lock:
+                self.skipped += 1
+            start_response(status, header_list, exc_info)
+            return app_iter
+
+        vary = headers.get("Vary")
+        if not vary:
+            headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            headers["Vary"] = vary + ", Accept-Encoding"
+        headers["Content-Encoding"] = encoding
+        # The encoded bytes differ, so only a weak validator still holds
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+        if "Content-Length" in headers:
+            try:
+                body = b"".join(app_iter)
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+            body = self._encode_body(body, encoding, self._cacheable(headers))
+            headers["Content-Length"] = str(len(body))
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return [body]
+
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return self._encode_stream(app_iter, encoding)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "compressed": self.compressed,
+                "skipped": self.skipped,
+                "cache_hits": self.cache_hits,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "cpu_seconds": self.cpu_seconds,
+            }
@@ -9,6 +9,40 @@ import tempfile
 import sqlite3
 import DAL
 import contact_DAL
+import contact_writer
+import db_pool
+import passwords
+import query_cache
+
+# Keep password hashing cheap in tests; production uses passwords.ITERATIONS
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+# Write generated thumbnails and assets outside the source tree
+os.environ.setdefault('THUMBNAIL_DIR', tempfile.mkdtemp(prefix='thumbs-'))
+os.environ.setdefault('ASSETS_DIR', tempfile.mkdtemp(prefix='assets-'))
+
+
+@pytest.fixture(autouse=True)
+def close_connection_pools():
+    """Drop pooled connections and caches after each test so temp databases are not reused"""
+    yield
+    # Contact submissions are stored from hashing callbacks; let them land in this test's database
+    passwords.wait_idle(5)
+    contact_writer.close_all(timeout=5)
+    query_cache.clear_all()
+    db_pool.close_all()
+
+
+@pytest.fixture(autouse=True)
+def restore_database_paths():
+    """Put back DB_FILENAME for both DALs after each test.
+
+    With STORAGE_ATTACH=1, DAL connections attach contacts.db (see storage.py),
+    so a contacts path left pointing into a deleted temp dir would break later
+    projects tests.
+    """
+    original = (DAL.DB_FILENAME, contact_DAL.DB_FILENAME)
+    yield
+    DAL.DB_FILENAME, contact_DAL.DB_FILENAME = original
 
 
 @pytest.fixture(scope="function")
@@ -112,10 +146,8 @@ def sample_contacts():
 @pytest.fixture(scope="function")
 def flask_app():
     """Set up Flask app for testing"""
-    from app import app
-    app.config['TESTING'] = True
-    app.config['WTF_CSRF_ENABLED'] = False
-    return app
+    from app import create_app
+    return create_app({'TESTING': True, 'WTF_CSRF_ENABLED': False})
 
 
 @pytest.fixture(scope="function")
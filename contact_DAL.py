@@ -1,50 +1,97 @@
 import sqlite3
 import os
-import tempfile
+import csv
+import json
+
+import contact_writer
+import db_pool
+import metrics
+import migrations
+import query_cache
+import storage
 
 
 DB_FILENAME = os.path.join(os.path.dirname(__file__), "contacts.db")
 
+PAGE_SIZE = 50
+
+# Everything except the password, which listings and exports never expose
+PUBLIC_COLUMNS = ("id", "first_name", "last_name", "email", "created_at")
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 1000
+
+# Journal submissions and commit them in background batches (see contact_writer)
+WRITE_BEHIND = contact_writer.ENABLED
+
+# Shared with DAL; see storage.resolve_path
+_resolved_paths = storage._resolved_paths
+
 
 def _resolve_db_path():
-    path = DB_FILENAME
-    dirpath = os.path.dirname(path) or "."
-    try:
-        os.makedirs(dirpath, exist_ok=True)
-    except Exception:
-        pass
-    if not os.access(dirpath, os.W_OK):
-        tempdir = tempfile.gettempdir()
-        path = os.path.join(tempdir, os.path.basename(DB_FILENAME))
-    return path
+    return storage.resolve_path(DB_FILENAME)
+
+
+def _get_pool():
+    return storage.contacts_pool()
+
+
+def _get_cache():
+    return query_cache.get_cache(_resolve_db_path())
 
 
 def get_connection():
-    path = _resolve_db_path()
-    return sqlite3.connect(path)
+    """Check out a pooled connection; close() returns it to the pool"""
+    return _get_pool().acquire()
 
 
-def init_contact_db():
-    """Initialize the contact form database with contacts table"""
-    os.makedirs(os.path.dirname(__file__), exist_ok=True)
-    with get_connection() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
+MIGRATIONS = []
+
+
+@migrations.migration(MIGRATIONS, "contacts table")
+def _create_contacts(conn):
+    # IF NOT EXISTS: databases created before versioning start at version 0
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-        conn.commit()
+        """
+    )
 
 
-def insert_contact(first_name, last_name, email, password):
-    """Insert a new contact form submission into the database"""
+@migrations.migration(MIGRATIONS, "listing and email indexes")
+def _create_contact_indexes(conn):
+    # Newest-first listings and per-email lookups page by (created_at, id)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_contacts_created_at ON contacts (created_at, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts (email, created_at, id)"
+    )
+
+
+@migrations.migration(MIGRATIONS, "write-behind journal table")
+def _create_journal_table(conn):
+    conn.execute(contact_writer.JOURNAL_TABLE_SQL)
+
+
+@metrics.timed
+@db_pool.retry_on_lock
+def init_contact_db():
+    """Apply pending schema migrations to the contact form database"""
+    migrations.migrate(_resolve_db_path(), MIGRATIONS)
+    # Submissions journaled by a write-behind process that crashed before committing them
+    contact_writer.replay_orphans(_resolve_db_path())
+
+
+def validate_contact(first_name, last_name, email, password):
+    """Normalize and validate one submission's fields, returning the cleaned tuple"""
     # Normalize and validate inputs to prevent whitespace-only values
     first_name = (first_name or "").strip()
     last_name = (last_name or "").strip()
@@ -52,27 +99,122 @@ def insert_contact(first_name, last_name, email, password):
     password = (password or "").strip()
     if not all([first_name, last_name, email, password]):
         raise ValueError("All fields (first_name, last_name, email, password) are required")
+    return first_name, last_name, email, password
+
+
+@metrics.timed
+@db_pool.retry_on_lock
+def insert_contact(first_name, last_name, email, password):
+    """Insert a new contact form submission into the database"""
+    first_name, last_name, email, password = validate_contact(first_name, last_name, email, password)
 
-    with get_connection() as conn:
+    if WRITE_BEHIND:
+        contact_writer.get_writer(_resolve_db_path()).enqueue(first_name, last_name, email, password)
+        return
+
+    with _get_pool().connection() as conn:
         conn.execute(
             "INSERT INTO contacts (first_name, last_name, email, password) VALUES (?, ?, ?, ?)",
             (first_name, last_name, email, password),
         )
         conn.commit()
+    _get_cache().invalidate()
+
+
+def flush_pending(timeout=None):
+    """Wait until write-behind submissions are in the database; True if none remain"""
+    writer = contact_writer._writers.get(_resolve_db_path())
+    return writer is None or writer.flush(timeout)
 
 
+@metrics.timed
 def list_contacts():
     """Retrieve all contact form submissions"""
-    with get_connection() as conn:
+    with _get_pool().connection() as conn:
         conn.row_factory = sqlite3.Row
         rows = conn.execute(
-            "SELECT id, first_name, last_name, email, password, created_at FROM contacts ORDER BY created_at DESC"
+            "SELECT id, first_name, last_name, email, password, created_at FROM contacts ORDER BY created_at DESC, id DESC"
         ).fetchall()
         return [dict(row) for row in rows]
 
 
+@metrics.timed
+def list_contacts_page(before=None, limit=PAGE_SIZE, email=None):
+    """Retrieve one page of submissions, newest first, without passwords.
+
+    Pass the previous page's "next_cursor" as before to continue; the cursor is
+    a (created_at, id) pair, so each page is an index range scan. Returns a
+    dict with "contacts" and "next_cursor" (None on the last page).
+    """
+    clauses = []
+    params = []
+    if email is not None:
+        clauses.append("email = ?")
+        params.append(email)
+    if before is not None:
+        try:
+            created_at, contact_id = before
+        except (TypeError, ValueError):
+            raise ValueError(f"before must be a (created_at, id) cursor, got {before!r}") from None
+        if not isinstance(created_at, str) or isinstance(contact_id, bool) or not isinstance(contact_id, int):
+            raise ValueError(f"before must be a (created_at, id) cursor, got {before!r}")
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend((created_at, contact_id))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(limit + 1)
+    with _get_pool().connection() as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            f"SELECT {', '.join(PUBLIC_COLUMNS)} FROM contacts{where} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            params,
+        ).fetchall()
+    contacts = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = (contacts[-1]["created_at"], contacts[-1]["id"])
+    return {"contacts": contacts, "next_cursor": next_cursor}
+
+
+def iter_contacts(batch_size=EXPORT_BATCH_SIZE):
+    """Yield every submission without its password, in id order, as the cursor reads it"""
+    with _get_pool().connection() as conn:
+        cursor = conn.execute(f"SELECT {', '.join(PUBLIC_COLUMNS)} FROM contacts ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(PUBLIC_COLUMNS, row))
+
+
+@metrics.timed
+def export_contacts(stream, fmt="csv"):
+    """Write every submission to a text stream as CSV or NDJSON; returns the row count"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=PUBLIC_COLUMNS)
+        writer.writeheader()
+        for contact in iter_contacts():
+            writer.writerow(contact)
+            count += 1
+    else:
+        for contact in iter_contacts():
+            stream.write(json.dumps(contact) + "\n")
+            count += 1
+    return count
+
+
+@metrics.timed
 def get_contact_count():
     """Get the total number of contact form submissions"""
-    with get_connection() as conn:
+    # Cached until a write from any connection bumps the database's data_version
+    return _get_cache().get_or_load(("count",), _load_contact_count)
+
+
+def _load_contact_count():
+    with _get_pool().connection() as conn:
         cursor = conn.execute("SELECT COUNT(*) FROM contacts")
         return cursor.fetchone()[0]
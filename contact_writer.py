@@ -0,0 +1,417 @@
+"""
+Write-behind queue for contact submissions.
+
+In write-behind mode (CONTACT_WRITE_BEHIND=1) contact_DAL.insert_contact
+appends each submission to a durable, append-only journal file next to the
+database and returns as soon as that line is fsync'd (concurrent submissions
+share one fsync). A background thread
+drains the journal into SQLite in batched transactions, so a burst of
+submissions costs one commit per batch instead of one per row.
+
+Each process writes its own journal (<db>-wb-<token>.jsonl) and holds an
+exclusive lock on it while alive. Every batch records the last journal
+sequence number it applied in the contact_journal table, in the same
+transaction as the rows themselves, so replaying a journal after a crash
+never inserts a row twice. replay_orphans() picks up journals whose process
+is gone; contact_DAL.init_contact_db() runs it on startup.
+
+A batch that still fails after CONTACT_WRITE_BEHIND_ATTEMPTS commits is moved
+to <db>-dead-letter.jsonl, with the error, for an operator to inspect and
+re-apply, so one bad batch cannot stall the queue or shutdown.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals are not shared between processes there
+    fcntl = None
+
+import db_pool
+import query_cache
+
+
+ENABLED = os.getenv("CONTACT_WRITE_BEHIND", "0") == "1"
+BATCH_MAX = int(os.getenv("CONTACT_WRITE_BEHIND_BATCH", "500"))
+# How long the writer waits for more submissions before committing a partial batch
+BATCH_WAIT = float(os.getenv("CONTACT_WRITE_BEHIND_WAIT", "0.05"))
+# fsync each journal append; turning this off trades durability for latency
+FSYNC = os.getenv("CONTACT_WRITE_BEHIND_FSYNC", "1") == "1"
+# Commit attempts per batch before it is moved to the dead-letter journal
+MAX_ATTEMPTS = int(os.getenv("CONTACT_WRITE_BEHIND_ATTEMPTS", "5"))
+# Pause between attempts at a failing batch
+RETRY_WAIT = float(os.getenv("CONTACT_WRITE_BEHIND_RETRY_WAIT", "0.5"))
+# How long interpreter exit waits for the queue to drain; the journal keeps the rest
+EXIT_TIMEOUT = float(os.getenv("CONTACT_WRITE_BEHIND_EXIT_TIMEOUT", "10"))
+# Samples kept per metric for the percentile summaries in stats()
+METRIC_SAMPLES = 1024
+
+JOURNAL_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS contact_journal (
+        journal TEXT PRIMARY KEY,
+        applied_seq INTEGER NOT NULL
+    )
+"""
+_INSERT_SQL = (
+    "INSERT INTO contacts (first_name, last_name, email, password, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+_APPLIED_SQL = "INSERT OR REPLACE INTO contact_journal (journal, applied_seq) VALUES (?, ?)"
+
+log = logging.getLogger("contact_writer")
+
+
+def _journal_pattern(db_path):
+    return glob.escape(db_path) + "-wb-*.jsonl"
+
+
+def dead_letter_path(db_path):
+    # Deliberately outside _journal_pattern so replay_orphans never retries it
+    return db_path + "-dead-letter.jsonl"
+
+
+def _timestamp():
+    # Same format as SQLite's CURRENT_TIMESTAMP, taken when the visitor submitted
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _lock(f):
+    """Take an exclusive, non-blocking lock on an open journal; False if held elsewhere"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+class _Samples:
+    """Count, mean and percentiles over the most recent observations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=METRIC_SAMPLES)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        with self._lock:
+            self._recent.append(value)
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def summary(self):
+        with self._lock:
+            recent = sorted(self._recent)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(len(recent) * p))] if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "max": self.max,
+        }
+
+
+def _read_journal(path):
+    """Yield (seq, row) from a journal, stopping at a torn final line"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            yield record["seq"], tuple(record["row"])
+
+
+def _applied_seq(conn, journal):
+    row = conn.execute(
+        "SELECT applied_seq FROM contact_journal WHERE journal = ?", (journal,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+@db_pool.retry_on_lock
+def _commit_batch(db_path, journal, batch):
+    """Insert (seq, row) pairs and record the last seq, in one transaction"""
+    with db_pool.get_pool(db_path).connection() as conn:
+        conn.executemany(_INSERT_SQL, [row for _, row in batch])
+        conn.execute(_APPLIED_SQL, (journal, batch[-1][0]))
+        conn.commit()
+
+
+def replay_journal(db_path, path, batch_size=BATCH_MAX):
+    """Apply the unapplied tail of one journal file; returns the rows inserted"""
+    journal = os.path.basename(path)
+    with db_pool.get_pool(db_path).connection() as conn:
+        applied = _applied_seq(conn, journal)
+    replayed = 0
+    batch = []
+    for seq, row in _read_journal(path):
+        if seq <= applied:
+            continue
+        batch.append((seq, row))
+        if len(batch) >= batch_size:
+            _commit_batch(db_path, journal, batch)
+            replayed += len(batch)
+            batch = []
+    if batch:
+        _commit_batch(db_path, journal, batch)
+        replayed += len(batch)
+    return replayed
+
+
+def _retire(db_path, path):
+    os.remove(path)
+    with db_pool.get_pool(db_path).connection() as conn:
+        conn.execute("DELETE FROM contact_journal WHERE journal = ?", (os.path.basename(path),))
+        conn.commit()
+
+
+def replay_orphans(db_path):
+    """Replay and remove journals left behind by processes that have exited"""
+    replayed = 0
+    for path in sorted(glob.glob(_journal_pattern(db_path))):
+        writer = _writers.get(db_path)
+        if writer is not None and writer.path == path:
+            continue
+        try:
+            f = open(path, "a")
+        except OSError:
+            continue
+        with f:
+            if not _lock(f):
+                continue  # its process is still running
+            replayed += replay_journal(db_path, path)
+            _retire(db_path, path)
+    if replayed:
+        query_cache.get_cache(db_path).invalidate()
+    return replayed
+
+
+class ContactWriter:
+    """Journal plus background batch writer for one contacts database"""
+
+    def __init__(self, db_path, batch_max=BATCH_MAX, batch_wait=BATCH_WAIT, fsync=FSYNC,
+                 max_attempts=MAX_ATTEMPTS, retry_wait=RETRY_WAIT):
+        self.db_path = db_path
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self.fsync = fsync
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_wait = retry_wait
+        self.pid = os.getpid()
+        self.path = f"{db_path}-wb-{uuid.uuid4().hex}.jsonl"
+        self.journal = os.path.basename(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        _lock(self._file)
+        self._seq = 0
+        # Appends made while one fsync runs share the next one (group commit)
+        self._sync_lock = threading.Lock()
+        self._synced_seq = 0
+        self._pending = deque()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = False
+        self.enqueue_latency = _Samples()
+        self.batch_sizes = _Samples()
+        self.commit_latency = _Samples()
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self._thread = threading.Thread(target=self._run, name="contact-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, first_name, last_name, email, password):
+        """Durably journal a submission; it reaches the database in a later batch"""
+        start = time.perf_counter()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("ContactWriter is closed")
+            self._seq += 1
+            row = (first_name, last_name, email, password, _timestamp())
+            seq = self._seq
+            self._file.write(json.dumps({"seq": seq, "row": row}) + "\n")
+            self._file.flush()
+            self._pending.append((seq, row))
+            self._changed.notify_all()
+        if self.fsync:
+            self._sync(seq)
+        self.enqueue_latency.add(time.perf_counter() - start)
+
+    def _sync(self, seq):
+        """fsync the journal unless a concurrent caller's fsync already covered seq"""
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                target = self._seq
+            os.fsync(self._file.fileno())
+            self._synced_seq = target
+
+    def _take_batch(self):
+        with self._lock:
+            while not self._pending and not self._stopping:
+                self._changed.wait()
+            if not self._pending:
+                return None
+        # Give a burst a moment to fill the batch before committing
+        if self.batch_wait and len(self._pending) < self.batch_max and not self._stopping:
+            time.sleep(self.batch_wait)
+        with self._lock:
+            count = min(self.batch_max, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            self._in_flight = count
+            return batch
+
+    def _commit(self, batch):
+        """Commit a batch, retrying up to max_attempts; True once it is in the database"""
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                _commit_batch(self.db_path, self.journal, batch)
+            except Exception:
+                with self._lock:
+                    self.failed_batches += 1
+                log.exception(
+                    "Contact batch of %d row(s) failed to commit (attempt %d of %d)",
+                    len(batch), attempt, self.max_attempts,
+                )
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_wait)
+                continue
+            self.commit_latency.add(time.perf_counter() - start)
+            self.batch_sizes.add(len(batch))
+            return True
+        return False
+
+    def _dead_letter(self, batch, error):
+        """Append a batch that cannot be committed to the dead-letter journal"""
+        path = dead_letter_path(self.db_path)
+        with open(path, "a", encoding="utf-8") as f:
+            for seq, row in batch:
+                record = {"journal": self.journal, "seq": seq, "row": row, "error": error}
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        log.error("Moved %d contact row(s) to %s", len(batch), path)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            if self._commit(batch):
+                query_cache.get_cache(self.db_path).invalidate()
+            else:
+                try:
+                    self._dead_letter(batch, f"gave up after {self.max_attempts} attempt(s)")
+                except OSError:
+                    # Put the batch back ahead of later rows; if close() times out
+                    # first, the journal is kept and replayed on the next start
+                    log.exception("Could not write the contact dead-letter journal")
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                        self._in_flight = 0
+                    time.sleep(self.retry_wait)
+                    continue
+                with self._lock:
+                    self.dead_lettered += len(batch)
+            with self._lock:
+                self._in_flight = 0
+                if not self._pending:
+                    # Everything journaled is in the database; start the journal afresh
+                    self._file.truncate(0)
+                self._changed.notify_all()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending) + self._in_flight
+
+    def flush(self, timeout=None):
+        """Wait until every queued submission is committed; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Drain the queue, stop the writer and remove the journal"""
+        drained = self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        self._file.close()
+        if drained and os.path.exists(self.path):
+            _retire(self.db_path, self.path)
+
+    def stats(self):
+        return {
+            "journal": self.path,
+            "pending": self.pending(),
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead_lettered,
+            "enqueue_latency_seconds": self.enqueue_latency.summary(),
+            "batch_size": self.batch_sizes.summary(),
+            "commit_latency_seconds": self.commit_latency.summary(),
+        }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path, **kwargs):
+    """Return this process's writer for a database, starting it on first use"""
+    writer = _writers.get(db_path)
+    if writer is None or writer.pid != os.getpid():
+        with _writers_lock:
+            writer = _writers.get(db_path)
+            if writer is None or writer.pid != os.getpid():
+                writer = ContactWriter(db_path, **kwargs)
+                _writers[db_path] = writer
+    return writer
+
+
+def close_all(timeout=None):
+    """Drain and stop every writer started by this process"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        if writer.pid == os.getpid():
+            writer.close(timeout)
+
+
+def stats():
+    """Queue depth and latency metrics for every writer, keyed by database path"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    return {writer.db_path: writer.stats() for writer in writers if writer.pid == os.getpid()}
+
+
+def _close_at_exit():
+    # A finite wait, so a database that keeps failing cannot hang shutdown
+    close_all(timeout=EXIT_TIMEOUT)
+
+
+atexit.register(_close_at_exit)
@@ -0,0 +1,326 @@
+"""
+Connection pooling for the SQLite data access layers.
+
+DAL.py and contact_DAL.py hand out connections from a ConnectionPool keyed on
+the resolved database path (plus any attached databases, see storage.py), so a
+request reuses an already-open connection instead of paying for
+sqlite3.connect(), ATTACH and the pragma setup every time.
+
+Each thread's checked-out connections are tracked, so create_app() can return
+any that a request leaked (checked_out() when its app context is pushed,
+release_leaked() on teardown). Idle connections are closed by close_all(),
+which the servers call on shutdown and atexit calls as a last resort.
+"""
+
+import atexit
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import sqltrace
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, a single server process is assumed
+    fcntl = None
+
+
+DEFAULT_POOL_SIZE = 8
+
+# Concurrency mode: several workers share projects.db and contacts.db, so readers
+# must not block the writer (WAL) and a busy writer lock is waited on, not fatal.
+JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Retries for writes that still hit "database is locked" after the busy timeout
+MAX_RETRIES = int(os.getenv("DB_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.01"))
+RETRY_MAX_DELAY = 1.0
+
+# Pragmas that are set per database; attached databases get them as well
+PER_SCHEMA_PRAGMAS = {"journal_mode", "synchronous"}
+
+# Applied once when a connection is opened, never on checkout
+DEFAULT_PRAGMAS = (
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+)
+
+
+def _concurrency_pragmas():
+    return (
+        ("journal_mode", JOURNAL_MODE),
+        ("synchronous", SYNCHRONOUS),
+        ("busy_timeout", BUSY_TIMEOUT_MS),
+    )
+
+
+def configure(journal_mode=None, synchronous=None, busy_timeout_ms=None, max_retries=None):
+    """Change the concurrency settings; pools opened afterwards pick them up"""
+    global JOURNAL_MODE, SYNCHRONOUS, BUSY_TIMEOUT_MS, MAX_RETRIES
+    if journal_mode is not None:
+        JOURNAL_MODE = journal_mode
+    if synchronous is not None:
+        SYNCHRONOUS = synchronous
+    if busy_timeout_ms is not None:
+        BUSY_TIMEOUT_MS = int(busy_timeout_ms)
+    if max_retries is not None:
+        MAX_RETRIES = int(max_retries)
+    close_all()
+
+
+# Connections each thread has checked out and not yet returned
+_local = threading.local()
+
+
+def _held():
+    held = getattr(_local, "connections", None)
+    if held is None:
+        held = _local.connections = set()
+    return held
+
+
+def checked_out():
+    """The connections this thread has checked out, as a snapshot for release_leaked()"""
+    return frozenset(_held())
+
+
+def release_leaked(since=frozenset()):
+    """Return connections this thread checked out after the since snapshot; returns how many"""
+    held = _held()
+    leaked = [conn for conn in held - since if conn.checked_out and conn.owner == threading.get_ident()]
+    held.difference_update(held - since)
+    for conn in leaked:
+        conn.close()
+    return len(leaked)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool"""
+
+    pool = None
+    checked_out = False
+    owner = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        elif self.checked_out:
+            self.pool.release(self)
+
+
+class TracedConnection(sqltrace.TracingConnection, PooledConnection):
+    """Pooled connection that records its statements (SQL_TRACE=1, see sqltrace.py)"""
+
+
+class ConnectionPool:
+    """A bounded LIFO pool of long-lived connections to one database file.
+
+    attach is a sequence of (schema name, path) pairs ATTACHed to every
+    connection the pool opens.
+    """
+
+    def __init__(self, path, max_idle=DEFAULT_POOL_SIZE, pragmas=None, attach=()):
+        self.path = path
+        self.attach = tuple(attach)
+        self.max_idle = max_idle
+        if pragmas is None:
+            pragmas = _concurrency_pragmas() + DEFAULT_PRAGMAS
+        self.pragmas = tuple(pragmas)
+        self.pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Only misses reach here, so re-checking the directory stays off the hot path
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        except OSError:
+            pass
+        # Connections move between request threads, so the same-thread check is off;
+        # a connection is only ever used by the thread that checked it out.
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            factory=TracedConnection if sqltrace.ENABLED else PooledConnection,
+            check_same_thread=False,
+        )
+        for schema, path in self.attach:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+            if name in PER_SCHEMA_PRAGMAS:
+                for schema, _ in self.attach:
+                    conn.execute(f"PRAGMA {schema}.{name}={value}")
+        conn.pool = self
+        if isinstance(conn, sqltrace.TracingConnection):
+            conn.start_trace()
+        return conn
+
+    def acquire(self):
+        """Check out a connection, opening a new one only when none are idle"""
+        with self._lock:
+            if self._idle:
+                self.hits += 1
+                conn = self._idle.pop()
+            else:
+                self.misses += 1
+                conn = None
+        if conn is None:
+            conn = self._open()
+        conn.checked_out = True
+        conn.owner = threading.get_ident()
+        _held().add(conn)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        conn.checked_out = False
+        _held().discard(conn)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        conn.pool = None
+        with self._lock:
+            self.discarded += 1
+        try:
+            sqlite3.Connection.close(conn)
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection held by the pool"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.pool = None
+            sqlite3.Connection.close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "attached": [path for _, path in self.attach],
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "idle": len(self._idle),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(path, attach=(), **kwargs):
+    """Return the shared pool for a database path and attachments, creating it on first use"""
+    global _pools_pid
+    if _pools_pid != os.getpid():
+        # Forked worker: the parent's connections must never be used (or closed) here
+        with _pools_lock:
+            _pools.clear()
+            _pools_pid = os.getpid()
+    key = (path, attach) if attach else path
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(path, attach=attach, **kwargs)
+                _pools[key] = pool
+    return pool
+
+
+def close_all():
+    """Close and forget every pool (app teardown and test isolation)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+def stats():
+    """Hit/miss counters for every open pool, keyed by database path (and attachments)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {"+".join([pool.path] + pool.stats()["attached"]): pool.stats() for pool in pools}
+
+
+retry_stats = {"retries": 0, "gave_up": 0}
+
+
+def _is_lock_error(exc):
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def retry_on_lock(func):
+    """Retry a write with jittered exponential backoff while the database is locked"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                if not _is_lock_error(exc):
+                    raise
+                if attempt >= MAX_RETRIES:
+                    retry_stats["gave_up"] += 1
+                    raise
+                # Full jitter keeps competing workers from retrying in lockstep
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+                attempt += 1
+                retry_stats["retries"] += 1
+
+    return wrapper
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) across processes"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+atexit.register(close_all)
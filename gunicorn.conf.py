@@ -0,0 +1,62 @@
+"""
+Gunicorn settings for the production entry point (see wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment, so the same file serves
+the Docker image and local load tests. Send SIGHUP to the master to replace
+workers gracefully after a config change. With GUNICORN_PRELOAD=1 (the
+default), new code needs a fresh master: start a new one with SIGUSR2, then
+stop the old one's workers with SIGWINCH and the old master with SIGQUIT.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+# WEB_CONCURRENCY is the conventional knob on PaaS hosts
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Import app.py once in the master and fork the workers from it: they share its
+# loaded modules and asset manifest copy-on-write, and on_starting migrates the
+# databases there so no worker's first request waits on a migration
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Keep idle client connections open briefly so browsers can reuse them;
+# this should be lower than the idle timeout of any load balancer in front
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then; the jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# "-" logs to stdout; set GUNICORN_ACCESS_LOG= (empty) to turn access logging off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+# /dev/shm avoids heartbeat stalls when /tmp is on a slow overlay filesystem
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def on_starting(server):
+    # Runs in the master after the preloaded app was imported, before any fork.
+    # Migrating opens connections that workers must not share, so close them after
+    if preload_app:
+        import app
+        import db_pool
+        import query_cache
+
+        app.init_databases()
+        query_cache.clear_all()
+        db_pool.close_all()
+
+
+def worker_exit(server, worker):
+    # Close this worker's pooled connections (checkpointing the WAL) on a clean exit
+    import db_pool
+
+    db_pool.close_all()
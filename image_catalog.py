@@ -0,0 +1,161 @@
+"""
+In-memory catalog of the files in static/images.
+
+Each entry records file size, pixel dimensions, format and a content hash.
+Dimensions come from the file header (JPEG, PNG, GIF and WebP are understood),
+so no imaging library is needed. Constructing the catalog reads every image
+once; after that lookups are dict reads. refresh() re-reads only files whose mtime or size changed;
+once refresh_interval seconds have passed, the next lookup starts it on a
+background thread and answers from the current entries, so a request never
+waits for the directory scan.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+
+REFRESH_INTERVAL = float(os.getenv("IMAGE_CATALOG_REFRESH", "5"))
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+ImageInfo = namedtuple(
+    "ImageInfo", ["name", "size", "width", "height", "format", "sha256", "mtime_ns"]
+)
+
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            i += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def read_dimensions(data):
+    """Return (format, width, height) from an image's leading bytes; None if unknown"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return ("png",) + struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return ("gif",) + struct.unpack("<HH", data[6:10])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        size = _webp_size(data)
+        return ("webp",) + size if size else None
+    if data[:2] == b"\xff\xd8":
+        size = _jpeg_size(data)
+        return ("jpeg",) + size if size else None
+    return None
+
+
+def _read(path, name, stat):
+    with open(path, "rb") as f:
+        data = f.read()
+    dimensions = read_dimensions(data)
+    if dimensions is None:
+        return None
+    fmt, width, height = dimensions
+    return ImageInfo(
+        name, stat.st_size, width, height, fmt, hashlib.sha256(data).hexdigest(), stat.st_mtime_ns
+    )
+
+
+class ImageCatalog:
+    """Metadata for every readable image in one directory"""
+
+    def __init__(self, directory, refresh_interval=REFRESH_INTERVAL):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self._entries = {}
+        # Digest of every file's name and content hash; equal catalogs hash equal in every process
+        self.fingerprint = ""
+        # Newest modification time of any image, for Last-Modified headers
+        self.newest_mtime_ns = 0
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._refresher = None
+        self.reads = 0
+        self.refresh()
+
+    def refresh(self):
+        """Rescan the directory, re-reading only new or modified files"""
+        entries = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            if os.path.splitext(name)[1].lower() not in EXTENSIONS:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                previous = self._entries.get(name)
+                if previous and (previous.mtime_ns, previous.size) == (stat.st_mtime_ns, stat.st_size):
+                    entries[name] = previous
+                    continue
+                info = _read(path, name, stat)
+            except OSError:
+                continue
+            self.reads += 1
+            if info is not None:
+                entries[name] = info
+        fingerprint = hashlib.sha256(
+            "\n".join(f"{name}:{info.sha256}" for name, info in sorted(entries.items())).encode()
+        ).hexdigest()[:16]
+        with self._lock:
+            self._entries = entries
+            self.fingerprint = fingerprint
+            self.newest_mtime_ns = max((info.mtime_ns for info in entries.values()), default=0)
+            self._refreshed_at = time.monotonic()
+
+    def _maybe_refresh(self):
+        """Start a background rescan if the interval has passed; never waits for it"""
+        if self.refresh_interval and time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            with self._lock:
+                # One caller rescans; the others keep using the current entries
+                if time.monotonic() - self._refreshed_at < self.refresh_interval:
+                    return
+                self._refreshed_at = time.monotonic()
+                self._refresher = threading.Thread(target=self.refresh, name="image-catalog-refresh", daemon=True)
+            self._refresher.start()
+
+    def get(self, name):
+        """Return the ImageInfo for a file name, or None if it is not a known image"""
+        self._maybe_refresh()
+        return self._entries.get(name)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def names(self):
+        self._maybe_refresh()
+        return sorted(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
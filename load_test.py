@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator for a running instance of the site.
+
+Replays a weighted mix of page views and form posts against a server, for
+example the Docker container on localhost:5000, and reports throughput and
+p50/p95/p99/max latency per route.
+
+Two ways to drive it:
+- --concurrency N: N clients each send their next request as soon as the last
+  one finished (closed loop), which shows the throughput the server sustains.
+- --rate R: requests are started on a fixed schedule of R per second
+  (open loop) by up to --concurrency clients. Latency is measured from the
+  moment a request was due, so time spent waiting for a free client counts,
+  as it would for a real visitor.
+
+The POSTs write to the server's databases: /projects/new adds projects and
+/contact adds submissions. Leave them out of --mix against data you care about.
+A POST that redirects anywhere but its success page (a validation error or the
+hashing queue being full) counts as rejected.
+
+Usage:
+    python load_test.py --url http://localhost:5000 --concurrency 16 --duration 30
+    python load_test.py --rate 50 --duration 60 --mix "GET /=4,GET /projects=4,GET /resume=1,POST /contact=1"
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+
+
+DEFAULT_MIX = "GET /=4,GET /projects=4,GET /resume=2,POST /contact=1,POST /projects/new=1"
+
+Route = namedtuple("Route", ["method", "path", "weight"])
+
+# Form bodies for the routes that take posts, and where each redirects on success;
+# {n} is a per-run counter so every submission is distinct
+FORMS = {
+    "/contact": ({
+        "first-name": "Load", "last-name": "Test {n}", "email": "load-{n}@example.com",
+        "password": "load-test-password", "confirm-password": "load-test-password",
+    }, "/thank-you"),
+    "/projects/new": ({
+        "title": "Load test project {n}", "description": "Created by load_test.py",
+        "image_file_name": "sign.webp",
+    }, "/projects"),
+}
+
+
+def parse_mix(text):
+    """Parse "GET /=4,POST /contact=1" into Routes"""
+    routes = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        request, _, weight = item.rpartition("=") if "=" in item else (item, "", "")
+        method, _, path = request.strip().partition(" ")
+        method = method.upper()
+        if method not in ("GET", "POST") or not path.startswith("/"):
+            raise ValueError(f"bad mix entry {item!r}; expected e.g. 'GET /projects=3'")
+        if method == "POST" and path not in FORMS:
+            raise ValueError(f"no form data for POST {path}; known: {', '.join(sorted(FORMS))}")
+        routes.append(Route(method, path, float(weight or 1)))
+    if not routes:
+        raise ValueError("the mix is empty")
+    return routes
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Results:
+    """Latencies and outcomes per route, shared by the client threads"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.rejected = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, latency, outcome):
+        with self._lock:
+            if outcome == "ok":
+                self.latencies.setdefault(name, []).append(latency)
+            else:
+                counts = self.errors if outcome == "error" else self.rejected
+                counts[name] = counts.get(name, 0) + 1
+
+    def summary(self, elapsed):
+        """{route: {requests, rps, errors, rejected, p50, p95, p99, max}} with latencies in ms"""
+        names = sorted(set(self.latencies) | set(self.errors) | set(self.rejected))
+        everything = [v for values in self.latencies.values() for v in values]
+        rows = {}
+        for name, values in [(n, self.latencies.get(n, [])) for n in names] + [("all", everything)]:
+            errors = sum(self.errors.values()) if name == "all" else self.errors.get(name, 0)
+            rejected = sum(self.rejected.values()) if name == "all" else self.rejected.get(name, 0)
+            row = {
+                "requests": len(values) + errors + rejected,
+                "rps": len(values) / elapsed if elapsed else 0.0,
+                "errors": errors,
+                "rejected": rejected,
+            }
+            for label, pct in (("p50", 50), ("p95", 95), ("p99", 99)):
+                row[label] = percentile(values, pct) * 1000 if values else None
+            row["max"] = max(values) * 1000 if values else None
+            rows[name] = row
+        return rows
+
+
+class Client:
+    """One keep-alive connection sending requests from the mix"""
+
+    def __init__(self, url, timeout, counter):
+        parsed = urllib.parse.urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self._connect = lambda: connection_class(parsed.hostname, parsed.port, timeout=timeout)
+        self._prefix = parsed.path.rstrip("/")
+        self._counter = counter
+        self._connection = None
+
+    def send(self, route):
+        """Send one request; returns "ok", "rejected" or "error" """
+        if self._connection is None:
+            self._connection = self._connect()
+        headers = {"Accept-Encoding": "gzip"}
+        body = None
+        expect = None
+        if route.method == "POST":
+            form, expect = FORMS[route.path]
+            n = next(self._counter)
+            body = urllib.parse.urlencode({k: v.format(n=n) for k, v in form.items()})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self._connection.request(route.method, self._prefix + route.path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return "error"
+        if response.status >= 400:
+            return "error"
+        if expect is not None:
+            location = urllib.parse.urlsplit(response.getheader("Location", "")).path
+            if location != self._prefix + expect:
+                return "rejected"
+        return "ok"
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _pick(routes, rng):
+    return rng.choices(routes, weights=[route.weight for route in routes])[0]
+
+
+def run(url, routes, duration, concurrency, rate=None, timeout=10, seed=None):
+    """Generate load for duration seconds; returns (Results, elapsed seconds)"""
+    results = Results()
+    counter = itertools.count(int(time.time()))
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def closed_loop(index):
+        rng = random.Random(None if seed is None else seed + index)
+        client = Client(url, timeout, counter)
+        while time.perf_counter() < deadline:
+            route = _pick(routes, rng)
+            sent = time.perf_counter()
+            outcome = client.send(route)
+            results.add(f"{route.method} {route.path}", time.perf_counter() - sent, outcome)
+        client.close()
+
+    # Open loop: request k is due at start + k / rate; clients claim the next due slot
+    slots = itertools.count()
+    slots_lock = threading.Lock()
+
+    def open_loop(index):
+        rng = random.Random(None if seed is None else seed + index)
+        client = Client(url, timeout, counter)
+        while True:
+            with slots_lock:
+                due = start + next(slots) / rate
+            if due >= deadline:
+                break
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            route = _pick(routes, rng)
+            outcome = client.send(route)
+            results.add(f"{route.method} {route.path}", time.perf_counter() - due, outcome)
+        client.close()
+
+    target = open_loop if rate else closed_loop
+    threads = [threading.Thread(target=target, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def _ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_summary(summary):
+    print(f"{'route':<22} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'rejected':>8}")
+    for name, row in summary.items():
+        print(f"{name:<22} {row['requests']:>7} {row['rps']:>8.1f} {_ms(row['p50'])} {_ms(row['p95'])} "
+              f"{_ms(row['p99'])} {_ms(row['max'])} {row['errors']:>7} {row['rejected']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted routes (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--rate", type=float, help="target requests per second (open loop)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--timeout", type=float, default=10, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="seed the route choice for repeatable runs")
+    parser.add_argument("--json", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args(argv)
+    try:
+        routes = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    mode = f"{args.rate:g} req/s across up to {args.concurrency} clients" if args.rate else f"{args.concurrency} clients"
+    print(f"Load testing {args.url} for {args.duration:g} s with {mode}")
+    results, elapsed = run(args.url, routes, args.duration, args.concurrency, args.rate, args.timeout, args.seed)
+    summary = results.summary(elapsed)
+    print_summary(summary)
+    if args.rate and summary["all"]["rps"] < args.rate * 0.95:
+        print(f"Note: achieved {summary['all']['rps']:.1f} req/s, below the {args.rate:g} req/s target; "
+              "raise --concurrency or the server is saturated")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "duration": elapsed, "routes": summary}, f, indent=2)
+            f.write("\n")
+    return 1 if summary["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
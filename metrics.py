@@ -0,0 +1,273 @@
+"""
+Request, template and database timings in Prometheus text format.
+
+Metrics live in this process's memory. Recording a sample costs one bucket
+search and a counter update under a lock, and the text format is only built
+when /metrics is scraped. Under Gunicorn every worker keeps its own numbers,
+so a scrape shows whichever worker answered it; scrape workers individually
+(or run one worker per container) when the totals matter.
+
+    http_request_duration_seconds{endpoint, method, status}   histogram
+    http_requests_in_flight{endpoint}                          gauge
+    template_render_duration_seconds{template}                 histogram
+    db_call_duration_seconds{function}                         histogram
+
+init_app() adds the request and template hooks to a Flask app. DAL and
+contact_DAL functions are wrapped with @timed. With METRICS_ENABLED=0,
+@timed returns the function unchanged and init_app() does nothing.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+
+from flask import before_render_template, g, request, template_rendered
+
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Prometheus' default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Database calls are mostly sub-millisecond
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramChild:
+    """One label combination: per-bucket counts, sum and count"""
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self._sum = 0.0
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def snapshot(self):
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child for one combination of label values, creating it on first use"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def clear(self):
+        """Zero every child; @timed holds on to its child, so none are dropped"""
+        with self._lock:
+            children = list(self._children.values())
+        for child in children:
+            child.reset()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def _render_child(self, values, child):
+        counts, total = child.snapshot()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _number(bound) + '"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+        yield f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}"
+        yield f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_labels(self.labelnames, values)} {child.snapshot()}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by endpoint, method and status.",
+    ("endpoint", "method", "status"),
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled right now.", ("endpoint",))
+TEMPLATE_DURATION = Histogram(
+    "template_render_duration_seconds", "Time to render a template.", ("template",)
+)
+DB_DURATION = Histogram(
+    "db_call_duration_seconds", "Time spent in a DAL function.", ("function",), buckets=DB_BUCKETS
+)
+REGISTRY = (REQUEST_DURATION, IN_FLIGHT, TEMPLATE_DURATION, DB_DURATION)
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    """Forget every sample (tests)"""
+    for metric in REGISTRY:
+        metric.clear()
+
+
+def timed(fn):
+    """Record each call's duration in db_call_duration_seconds as module.function"""
+    if not ENABLED:
+        return fn
+    child = DB_DURATION.labels(f"{fn.__module__}.{fn.__name__}")
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def observe_request(endpoint, method, status, seconds):
+    REQUEST_DURATION.labels(endpoint, method, str(status)).observe(seconds)
+
+
+# Template renders in progress on this thread (stream_template finishes later)
+_rendering = threading.local()
+
+
+def _template_started(sender, template, context, **extra):
+    stack = getattr(_rendering, "stack", None)
+    if stack is None:
+        stack = _rendering.stack = []
+    stack.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stack = getattr(_rendering, "stack", None)
+    if stack:
+        TEMPLATE_DURATION.labels(template.name or "<string>").observe(time.perf_counter() - stack.pop())
+
+
+def _request_started():
+    endpoint = request.endpoint or "unmatched"
+    g._metrics = [endpoint, time.perf_counter(), False]
+    IN_FLIGHT.labels(endpoint).inc()
+
+
+def _request_finished(response):
+    state = g.get("_metrics")
+    if state is not None:
+        observe_request(state[0], request.method, response.status_code, time.perf_counter() - state[1])
+        state[2] = True
+    return response
+
+
+def _request_torn_down(exc):
+    state = g.get("_metrics")
+    if state is None:
+        return
+    if not state[2]:
+        # An unhandled exception skipped after_request
+        observe_request(state[0], request.method, 500, time.perf_counter() - state[1])
+    IN_FLIGHT.labels(state[0]).dec()
+
+
+def init_app(app):
+    """Time every request and template render of app"""
+    if not ENABLED:
+        return
+    # Call before registering other before_request hooks, so the timing covers them
+    app.before_request(_request_started)
+    app.after_request(_request_finished)
+    app.teardown_request(_request_torn_down)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
@@ -0,0 +1,132 @@
+"""
+Versioned schema migrations, keyed on SQLite's PRAGMA user_version.
+
+Each database has an ordered list of migrations (DAL.MIGRATIONS,
+contact_DAL.MIGRATIONS); migration N brings the schema from version N-1 to N.
+migrate() reads user_version first and returns straight away when the schema
+is current, so a worker start costs one pragma read. Otherwise it takes a file
+lock next to the database, re-reads the version (another process may have
+finished the job meanwhile), and applies each pending migration in its own
+transaction together with the version bump. A migration that fails leaves
+the database at the last version that succeeded.
+
+Migrations can also be run before the app starts, for example during a deploy:
+
+    python migrations.py status
+    python migrations.py upgrade [--projects-db PATH] [--contacts-db PATH]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+
+import db_pool
+
+
+Migration = namedtuple("Migration", ["version", "description", "apply"])
+
+
+class MigrationError(RuntimeError):
+    """A migration failed; the database stays at the previous version"""
+
+
+def migration(migrations, description):
+    """Decorator appending a function to a migration list as the next version"""
+    def register(fn):
+        migrations.append(Migration(len(migrations) + 1, description, fn))
+        return fn
+
+    return register
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _lock_path(path):
+    return path + ".migrate.lock"
+
+
+def _apply(conn, step):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        step.apply(conn)
+        # user_version lives in the database header and commits with the DDL
+        conn.execute(f"PRAGMA user_version = {int(step.version)}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise MigrationError(f"migration {step.version} ({step.description}) failed: {e}") from e
+
+
+def migrate(path, migrations):
+    """Bring the database at path up to the latest migration; returns the versions applied"""
+    target = len(migrations)
+    # A private pool on this file alone: DDL must not go through a connection
+    # with other databases attached, and nothing here is worth keeping open
+    pool = db_pool.ConnectionPool(path, max_idle=1)
+    try:
+        with pool.connection() as conn:
+            if current_version(conn) >= target:
+                return []
+        with db_pool.file_lock(_lock_path(path)):
+            with pool.connection() as conn:
+                applied = []
+                for step in migrations[current_version(conn):]:
+                    _apply(conn, step)
+                    applied.append(step.version)
+                return applied
+    finally:
+        pool.close()
+
+
+def status(path, migrations):
+    """Return (current version, latest version) without changing anything"""
+    if not os.path.exists(path):
+        return 0, len(migrations)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return current_version(conn), len(migrations)
+    finally:
+        conn.close()
+
+
+def _databases(args):
+    import DAL
+    import contact_DAL
+
+    if args.projects_db:
+        DAL.DB_FILENAME = args.projects_db
+    if args.contacts_db:
+        contact_DAL.DB_FILENAME = args.contacts_db
+    return [
+        ("projects", DAL._resolve_db_path(), DAL.MIGRATIONS),
+        ("contacts", contact_DAL._resolve_db_path(), contact_DAL.MIGRATIONS),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    parser.add_argument("--projects-db", help="Default: DAL.DB_FILENAME")
+    parser.add_argument("--contacts-db", help="Default: contact_DAL.DB_FILENAME")
+    args = parser.parse_args(argv)
+
+    for name, path, migrations in _databases(args):
+        if args.command == "status":
+            version, latest = status(path, migrations)
+            print(f"{name}: version {version} of {latest} ({path})")
+            continue
+        try:
+            applied = migrate(path, migrations)
+        except MigrationError as e:
+            print(f"{name}: {e}", file=sys.stderr)
+            return 1
+        print(f"{name}: applied {applied or 'nothing'}, now at version {status(path, migrations)[0]} ({path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Password hashing on a bounded worker pool.
+
+Passwords are hashed with PBKDF2-HMAC-SHA256 and stored as
+"pbkdf2_sha256$<iterations>$<salt>$<hash>", so the cost can be raised later
+without breaking hashes already in the database. The work runs on a small,
+bounded pool of worker threads (hashlib releases the GIL while it hashes), so a
+burst of submissions cannot use more than PASSWORD_HASH_WORKERS cores. Once
+PASSWORD_HASH_QUEUE jobs are waiting, new work is rejected with HashingPoolFull
+instead of piling up behind the ones already queued.
+
+The contact form does not wait for its hash: it queues the job with
+submit_hash() and stores the submission from the Future's callback, so the
+request only pays for the enqueue. A submission is held in memory until its
+hash is done, and is lost if the process dies first. shutdown() (run at exit)
+lets queued jobs finish. HashingPool.hash() is the blocking form for callers
+that need the result; it waits at most PASSWORD_HASH_TIMEOUT seconds, then
+cancels the job if it has not started and raises HashingTimeout.
+"""
+
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+import queue
+import secrets
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+ALGORITHM = "pbkdf2_sha256"
+ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "260000"))
+SALT_BYTES = 16
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+# How long a request waits for its hash before giving up: a few times one
+# hash's cost, so a request waits behind a short queue but not a long one
+TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "3"))
+
+
+class HashingPoolFull(RuntimeError):
+    """Raised when the hashing queue is at capacity"""
+
+
+class HashingTimeout(RuntimeError):
+    """Raised when a queued hash did not finish within the caller's timeout"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None):
+    """Hash a password on the calling thread"""
+    iterations = iterations or ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, encoded):
+    """Check a password against a hash from hash_password, in constant time.
+
+    A malformed or foreign hash is a mismatch, not an error.
+    """
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+        iterations = int(iterations)
+        if algorithm != ALGORITHM or iterations < 1:
+            return False
+        # binascii.Error (bad base64) is a ValueError
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _unb64(salt), iterations)
+        return hmac.compare_digest(digest, _unb64(expected))
+    except (AttributeError, ValueError, OverflowError):
+        return False
+
+
+def is_hashed(value):
+    return isinstance(value, str) and value.startswith(ALGORITHM + "$")
+
+
+class HashingPool:
+    """A fixed set of worker threads fed by a bounded queue"""
+
+    def __init__(self, workers=WORKERS, max_queue=MAX_QUEUE, iterations=None):
+        self.iterations = iterations or ITERATIONS
+        self.pid = os.getpid()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"password-hash-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            future, fn, args = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._lock:
+                self.completed += 1
+                self._idle.notify_all()
+
+    def _submit(self, fn, *args):
+        if self._closed:
+            raise RuntimeError("HashingPool is closed")
+        future = Future()
+        try:
+            self._queue.put_nowait((future, fn, args))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolFull(f"{self._queue.maxsize} password hashes already queued")
+        with self._lock:
+            self.submitted += 1
+        return future
+
+    def submit_hash(self, password):
+        """Queue a hash; returns a Future for the encoded hash"""
+        return self._submit(hash_password, password, self.iterations)
+
+    def submit_verify(self, password, encoded):
+        """Queue a verification; returns a Future for True/False"""
+        return self._submit(verify_password, password, encoded)
+
+    def _wait(self, future, timeout):
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # Skips the job if no worker has picked it up yet; a running hash finishes unobserved
+            future.cancel()
+            raise HashingTimeout(f"password hash not done within {timeout} s") from None
+
+    def hash(self, password, timeout=TIMEOUT):
+        """Hash on the pool, blocking the caller for at most timeout seconds"""
+        return self._wait(self.submit_hash(password), timeout)
+
+    def verify(self, password, encoded, timeout=TIMEOUT):
+        return self._wait(self.submit_verify(password, encoded), timeout)
+
+    def wait_idle(self, timeout=None):
+        """Wait until every submitted job (and its callbacks) has run; False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.completed >= self.submitted, timeout)
+
+    def close(self):
+        """Let queued jobs finish, then stop the workers"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        return {
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, recreating it after a fork"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = HashingPool()
+            pool = _pool
+    return pool
+
+
+def wait_idle(timeout=None):
+    """Wait for the process-wide pool's queued jobs; True at once if there is no pool"""
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        return True
+    return pool.wait_idle(timeout)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,131 @@
+"""
+Streaming parsers for bulk project imports.
+
+CSV files need a header row; JSON Lines files hold one object per line. Both
+accept the form field names (title, description, image_file_name) or the
+table's column names (Title, Description, ImageFileName). Rows are parsed as
+they are read and handed to DAL.insert_projects_bulk, so an import never holds
+the whole file in memory.
+
+Because chunks are committed as they fill, a file that stops being readable
+part-way (bad UTF-8, a malformed or oversized CSV field) cannot be rejected as
+a whole. The parse error becomes the last row's error and the report's
+"stopped" message, and the rows before it stay imported.
+"""
+
+import csv
+import json
+import os
+
+import DAL
+
+
+FORMATS = ("csv", "jsonl")
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+}
+
+_FIELDS = (
+    ("title", "Title"),
+    ("description", "Description"),
+    ("image_file_name", "ImageFileName"),
+)
+
+
+def detect_format(filename=None, content_type=None):
+    """Guess the import format from a file name or MIME type; None if unknown"""
+    if filename:
+        fmt = _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if fmt:
+            return fmt
+    if content_type:
+        return _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def decode_lines(binary_stream, encoding="utf-8"):
+    """Yield text lines from a binary stream (an upload or a request body)"""
+    for line in binary_stream:
+        yield line.decode(encoding)
+
+
+def _fields(record):
+    """(title, description, image_file_name) from a parsed row, or ValueError for a non-text field"""
+    values = []
+    for names in _FIELDS:
+        value = next((record[name] for name in names if record.get(name) is not None), None)
+        if value is not None and not isinstance(value, str):
+            return ValueError(f"Field '{names[0]}' must be a string, not {type(value).__name__}")
+        values.append(value)
+    return tuple(values)
+
+
+def iter_csv_records(stream):
+    for record in csv.DictReader(stream):
+        yield _fields(record)
+
+
+def iter_jsonl_records(stream):
+    for line in stream:
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield ValueError("Each line must be a JSON object")
+            continue
+        yield _fields(record)
+
+
+class UnreadableFile(ValueError):
+    """The rest of an import file could not be parsed"""
+
+
+def _until_unreadable(records):
+    try:
+        yield from records
+    except UnicodeDecodeError:
+        yield UnreadableFile("Import files must be UTF-8 encoded; the rest of the file was not read")
+    except csv.Error as e:
+        yield UnreadableFile(f"Malformed CSV ({e}); the rest of the file was not read")
+
+
+def iter_records(stream, fmt):
+    """Yield one (title, description, image_file_name) tuple or ValueError per row.
+
+    A decode or CSV error ends the rows with an UnreadableFile instead of raising.
+    """
+    if fmt == "csv":
+        return _until_unreadable(iter_csv_records(stream))
+    if fmt == "jsonl":
+        return _until_unreadable(iter_jsonl_records(stream))
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def import_projects(stream, fmt, chunk_size=DAL.BULK_CHUNK_SIZE, known_image=None):
+    """Import every row from an iterable of text lines (known_image: see DAL.insert_projects_bulk).
+
+    Returns DAL.insert_projects_bulk's report plus "stopped": the message of
+    the error that ended the file early, or None if every row was read.
+    """
+    stopped = []
+
+    def records():
+        for record in iter_records(stream, fmt):
+            if isinstance(record, UnreadableFile):
+                stopped.append(str(record))
+            yield record
+
+    report = DAL.insert_projects_bulk(records(), chunk_size=chunk_size, known_image=known_image)
+    report["stopped"] = stopped[0] if stopped else None
+    return report
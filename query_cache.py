@@ -0,0 +1,172 @@
+"""
+Read-through caching for DAL query results.
+
+A QueryCache sits in front of one database file. Writes made through the DAL
+invalidate it directly; writes from other connections or worker processes are
+noticed through SQLite's PRAGMA data_version, which changes on a connection
+whenever any *other* connection commits to the file. A DAL write commits on a
+pooled connection, so it moves data_version too; invalidate() takes the new
+value as its own, and only commits this process did not make count as remote. Each cache keeps one
+dedicated watcher connection for that check, so a lookup costs a pragma read
+instead of a query.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+class LRUCache:
+    """A thread-safe, size-bounded mapping that evicts the least recently used key"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class QueryCache:
+    """Bounded cache of query results for one database file"""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.pid = os.getpid()
+        self._entries = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._data_version = None
+        # Bumped on every clear so a load that raced with a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.local_invalidations = 0
+        self.remote_invalidations = 0
+        self.max_served_age = 0.0
+
+    def _check_version(self):
+        """Drop every entry if another connection has committed since the last check.
+
+        Returns the generation the caller's lookup belongs to.
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = sqlite3.connect(self.path, check_same_thread=False)
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if self._data_version is not None and version != self._data_version:
+                self._entries.clear()
+                self._generation += 1
+                self.remote_invalidations += 1
+            self._data_version = version
+            return self._generation
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        generation = self._check_version()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            self.hits += 1
+            self.max_served_age = max(self.max_served_age, time.monotonic() - loaded_at)
+            return value
+        self.misses += 1
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._entries.set(key, (value, time.monotonic()))
+        return value
+
+    def invalidate(self):
+        """Forget every entry after a write made in this process (call it after the commit)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.local_invalidations += 1
+            # Our own commit changed data_version; any other commit before it is
+            # covered by this clear as well, so neither counts as remote
+            if self._watcher is not None:
+                self._data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "local_invalidations": self.local_invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            # Age of the oldest entry served since start-up, not a staleness bound:
+            # an entry may be served at any age until a write invalidates it
+            "max_served_age_seconds": self.max_served_age,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path, **kwargs):
+    """Return the shared cache for a database path, creating it on first use"""
+    cache = _caches.get(path)
+    if cache is None or cache.pid != os.getpid():
+        with _caches_lock:
+            cache = _caches.get(path)
+            if cache is None or cache.pid != os.getpid():
+                cache = QueryCache(path, **kwargs)
+                _caches[path] = cache
+    return cache
+
+
+def clear_all():
+    """Close and forget every cache (test isolation)"""
+    with _caches_lock:
+        caches = list(_caches.values())
+        _caches.clear()
+    for cache in caches:
+        if cache.pid == os.getpid():
+            cache.close()
+
+
+def stats():
+    """Hit ratio and invalidation counters for every cache, keyed by database path"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.path: cache.stats() for cache in caches}
@@ -0,0 +1,234 @@
+"""
+Full-response caching for routes whose output depends only on their templates.
+
+Decorate a view with @cached("page.html") and the rendered response is kept in
+the backend selected by app.config["RESPONSE_CACHE_BACKEND"] ("memory", "disk"
+or None to disable). Entries are keyed by path, the query parameters named in
+params= and any headers named in vary=; other query parameters are ignored, so
+a client cannot mint new entries with ?x=1, ?x=2, ... Both backends hold at
+most RESPONSE_CACHE_MAX_ENTRIES entries (the disk backend removes its oldest
+files). Entries are dropped when one of the listed templates (or base.html)
+changes on disk or the static asset manifest (see assets.py) is rebuilt with
+different hashed URLs, so a disk cache that outlives a deploy never replays
+pages that link to the old assets. Requests with pending flash messages are
+never served from or stored in the cache, because base.html renders those
+messages.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app, request, session
+
+from query_cache import LRUCache
+
+
+DEFAULT_MAX_ENTRIES = 256
+BASE_TEMPLATES = ("base.html",)
+# How often a view re-stats its templates; edits show up within this window
+MTIME_CHECK_INTERVAL = 1.0
+# Headers that belong to one response and must not be replayed from the cache
+UNCACHED_HEADERS = {"set-cookie", "date"}
+_TMP_PREFIX = ".tmp-"
+
+
+class MemoryBackend:
+    """Keeps cached responses in an in-process LRU"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self._entries = LRUCache(max_entries)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry):
+        self._entries.set(key, entry)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DiskBackend:
+    """Keeps cached responses as files, shared by every worker on the host"""
+
+    def __init__(self, directory, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        headers = [tuple(header) for header in meta["headers"]]
+        return meta["status"], headers, body, meta["fingerprint"]
+
+    def set(self, key, entry):
+        status, headers, body, fingerprint = entry
+        meta = {"status": status, "headers": headers, "fingerprint": fingerprint}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=_TMP_PREFIX)
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(body)
+        # Atomic rename so a concurrent reader never sees a partial entry
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        """Remove the oldest entries beyond max_entries (only runs on a cache miss)"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                # Another worker's entry still being written
+                if entry.name.startswith(_TMP_PREFIX):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+class ResponseCacheState:
+    """Per-app backend plus hit/miss/bypass counters"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bypasses": self.bypasses}
+
+
+def _create_backend(app):
+    kind = app.config.get("RESPONSE_CACHE_BACKEND", "memory")
+    if kind == "memory":
+        return MemoryBackend(app.config.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    if kind == "disk":
+        directory = app.config.get("RESPONSE_CACHE_DIR") or os.path.join(
+            tempfile.gettempdir(), "response-cache"
+        )
+        return DiskBackend(directory, app.config.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    if kind:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {kind!r}")
+    return None
+
+
+def get_state(app=None):
+    """Return the app's cache state, creating the configured backend on first use"""
+    app = app or current_app
+    state = app.extensions.get("response_cache")
+    if state is None:
+        state = ResponseCacheState(_create_backend(app))
+        app.extensions["response_cache"] = state
+    return state
+
+
+def clear(app=None):
+    state = get_state(app)
+    if state.backend is not None:
+        state.backend.clear()
+
+
+class _TemplateFingerprint:
+    """mtimes of a view's templates, re-read at most every MTIME_CHECK_INTERVAL"""
+
+    def __init__(self, templates):
+        self.templates = templates
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, app):
+        now = time.monotonic()
+        with self._lock:
+            if self._value is None or now - self._checked_at >= MTIME_CHECK_INTERVAL:
+                folder = os.path.join(app.root_path, app.template_folder)
+                mtimes = []
+                for name in self.templates:
+                    try:
+                        mtimes.append(os.stat(os.path.join(folder, name)).st_mtime_ns)
+                    except OSError:
+                        mtimes.append(0)
+                self._value = ":".join(str(m) for m in mtimes)
+                self._checked_at = now
+            return self._value
+
+
+def _assets_version(app):
+    assets = app.extensions.get("assets")
+    return getattr(assets, "version", "")
+
+
+def cached(*templates, params=(), vary=()):
+    """Cache a GET view's full response until one of its templates or the assets change.
+
+    params names the query parameters the view reads; only those are part of the key.
+    """
+    fingerprint = _TemplateFingerprint(tuple(templates) + BASE_TEMPLATES)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            app = current_app._get_current_object()
+            state = get_state(app)
+            if (
+                state.backend is None
+                or request.method not in ("GET", "HEAD")
+                or session.get("_flashes")
+            ):
+                state.bypasses += 1
+                return view(*args, **kwargs)
+
+            key = "|".join(
+                [request.path]
+                + [f"{name}={request.args.get(name, '')}" for name in params]
+                + [request.headers.get(name, "") for name in vary]
+            )
+            current = f"{fingerprint.get(app)}|{_assets_version(app)}"
+            entry = state.backend.get(key)
+            if entry is not None and entry[3] == current:
+                state.hits += 1
+                status, headers, body, _ = entry
+                return app.response_class(body, status=status, headers=headers)
+
+            state.misses += 1
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed and "Set-Cookie" not in response.headers:
+                headers = [
+                    (name, value) for name, value in response.headers.items()
+                    if name.lower() not in UNCACHED_HEADERS
+                ]
+                state.backend.set(key, (response.status_code, headers, response.get_data(), current))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -49,6 +49,20 @@ def main():
         "test_database.py",
         "test_projects.py", 
         "test_contact.py",
+        "test_concurrency.py",
+        "test_query_cache.py",
+        "test_response_cache.py",
+        "test_passwords.py",
+        "test_thumbnails.py",
+        "test_assets.py",
+        "test_compression.py",
+        "test_image_catalog.py",
+        "test_asgi.py",
+        "test_migrations.py",
+        "test_startup.py",
+        "test_metrics.py",
+        "test_sqltrace.py",
+        "test_load_test.py",
         "test_app.py"
     ]
     
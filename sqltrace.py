@@ -0,0 +1,323 @@
+"""
+Opt-in tracing of the SQL that DAL.py and contact_DAL.py run.
+
+With SQL_TRACE=1, every pooled connection (see db_pool.py) is opened as a
+TracingConnection. Its cursors time each statement from execute() until its
+rows have been read, count the rows, and note the first calling function
+outside the database plumbing. SQLite's own trace callback adds the statement
+as SQLite ran it, with the parameters bound and any trigger statements.
+
+Each finished statement becomes a Statement in a ring buffer of the last
+SQL_TRACE_BUFFER statements (records()) and a DEBUG record on the "sqltrace"
+logger. Statements that take SQL_SLOW_MS or longer are also logged as a
+WARNING on "sqltrace.slow", together with their EXPLAIN QUERY PLAN, so a scan
+where an index was expected shows up in the log. SQL_SLOW_LOG names a file
+to append the slow-query log to; otherwise it goes wherever logging sends it.
+
+Tracing costs a few microseconds per statement and row, which is why it is
+off by default.
+"""
+
+import collections
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+
+ENABLED = os.getenv("SQL_TRACE", "0") == "1"
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+SLOW_LOG = os.getenv("SQL_SLOW_LOG")
+BUFFER_SIZE = int(os.getenv("SQL_TRACE_BUFFER", "1000"))
+
+# Statements EXPLAIN QUERY PLAN accepts; PRAGMA, BEGIN and COMMIT have no plan
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# Statements SQLite reports per traced statement; executemany() and triggers run many
+EXPANDED_LIMIT = 20
+
+# Frames from these modules are plumbing, not the caller worth reporting
+_INTERNAL_MODULES = {__name__, "db_pool", "metrics", "contextlib", "functools"}
+
+Statement = collections.namedtuple(
+    "Statement", ["sql", "params", "expanded", "duration", "rows", "caller", "plan"]
+)
+
+log = logging.getLogger("sqltrace")
+slow_log = logging.getLogger("sqltrace.slow")
+
+_records = collections.deque(maxlen=BUFFER_SIZE)
+_slow_handler_lock = threading.Lock()
+_slow_handler = None
+
+
+def configure(enabled=None, slow_ms=None, slow_log=None):
+    """Change the tracing settings; connections opened afterwards pick them up"""
+    global ENABLED, SLOW_MS, SLOW_LOG
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if slow_ms is not None:
+        SLOW_MS = float(slow_ms)
+    if slow_log is not None:
+        SLOW_LOG = slow_log or None
+        _close_slow_handler()
+    # Imported here: db_pool imports this module
+    import db_pool
+
+    db_pool.close_all()
+
+
+def records():
+    """The most recent traced statements, oldest first"""
+    return list(_records)
+
+
+def clear():
+    _records.clear()
+
+
+def _close_slow_handler():
+    global _slow_handler
+    with _slow_handler_lock:
+        if _slow_handler is not None:
+            slow_log.removeHandler(_slow_handler)
+            _slow_handler.close()
+            _slow_handler = None
+
+
+def _ensure_slow_handler():
+    global _slow_handler
+    if SLOW_LOG is None or _slow_handler is not None:
+        return
+    with _slow_handler_lock:
+        if _slow_handler is None:
+            handler = logging.FileHandler(SLOW_LOG, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            slow_log.addHandler(handler)
+            _slow_handler = handler
+
+
+def _caller():
+    """module.function of the nearest frame outside the database plumbing"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _INTERNAL_MODULES and not module.startswith("sqlite3"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN for sql as indented lines, or [] for statements without a plan"""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    paused = getattr(conn, "_trace_paused", False)
+    conn._trace_paused = True
+    try:
+        # A plain cursor, so the EXPLAIN itself is not traced
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    finally:
+        conn._trace_paused = paused
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def _record(conn, sql, params, expanded, duration, rows, caller):
+    plan = None
+    if duration * 1000 >= SLOW_MS:
+        plan = explain(conn, sql, params)
+    statement = Statement(sql, params, tuple(expanded), duration, rows, caller, plan)
+    _records.append(statement)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%.3f ms %s rows=%s %s", duration * 1000, caller, rows, " ".join(sql.split()))
+    if plan is not None:
+        _ensure_slow_handler()
+        slow_log.warning(
+            "slow query: %.1f ms in %s, %s rows\n%s\n%s",
+            duration * 1000, caller, rows,
+            "\n".join(expanded) or sql.strip(),
+            "\n".join("  plan: " + line for line in plan) or "  plan: (none)",
+        )
+    return statement
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that times each statement until its rows have been read"""
+
+    _pending = None
+
+    def _begin(self, sql, params):
+        self._finish()
+        conn = self.connection
+        conn._trace_expanded = []
+        self._pending = [sql, params, conn._trace_expanded, 0.0, 0, _caller()]
+        conn._trace_open.add(self)
+
+    def _add_time(self, start):
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        conn = self.connection
+        conn._trace_open.discard(self)
+        sql, params, expanded, duration, rows, caller = pending
+        if self.description is None and self.rowcount >= 0:
+            rows = self.rowcount
+        _record(conn, sql, params, expanded, duration, rows, caller)
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._add_time(start)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, ())
+        seq_of_parameters = list(seq_of_parameters)
+        if seq_of_parameters:
+            self._pending[1] = seq_of_parameters[0]
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add_time(start)
+            self._finish()
+        return self
+
+    def executescript(self, sql_script):
+        self._begin(sql_script, ())
+        start = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._add_time(start)
+            self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add_time(start)
+        if row is None:
+            self._finish()
+        elif self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_time(start)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        if not rows or len(rows) < (self.arraysize if size is None else size):
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add_time(start)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add_time(start)
+            self._finish()
+            raise
+        self._add_time(start)
+        if self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursors are TracingCursors; commit and rollback are timed too"""
+
+    _trace_paused = False
+    _tracing = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._trace_open = set()
+        self._trace_expanded = []
+
+    def start_trace(self):
+        """Trace from here on; the caller's connection setup (pragmas, ATTACH) is left out"""
+        self._tracing = True
+        self.set_trace_callback(self._traced)
+
+    def _traced(self, statement):
+        if not self._trace_paused and len(self._trace_expanded) < EXPANDED_LIMIT:
+            self._trace_expanded.append(statement)
+
+    def flush(self):
+        """Record statements whose cursors were abandoned before their last row"""
+        for cursor in list(self._trace_open):
+            cursor._finish()
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = TracingCursor if self._tracing else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def _timed(self, name, fn):
+        self._trace_expanded = []
+        caller = _caller()
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            _record(self, name, (), self._trace_expanded, time.perf_counter() - start, 0, caller)
+
+    def commit(self):
+        self.flush()
+        if not (self._tracing and self.in_transaction):
+            return super().commit()
+        return self._timed("COMMIT", super().commit)
+
+    def rollback(self):
+        self.flush()
+        if not (self._tracing and self.in_transaction):
+            return super().rollback()
+        return self._timed("ROLLBACK", super().rollback)
+
+    def close(self):
+        self.flush()
+        super().close()
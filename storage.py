@@ -0,0 +1,70 @@
+"""
+Where the data access layers get their SQLite connections.
+
+DAL.py and contact_DAL.py each resolve their own database file. By default
+each file has its own connection pool. With STORAGE_ATTACH=1 they share one:
+every connection opens projects.db and ATTACHes contacts.db as schema
+"contactdb". Table names are unique across the two files, so the unqualified
+SQL in both modules resolves as before, and a request that reads projects and
+writes a contact uses one connection instead of two. Each file keeps its own
+WAL, its own write lock and its own schema version; migrations and the
+write-behind writer still open the contacts file directly.
+
+Attaching halves the number of pooled connections, but each one holds the
+descriptors of both files, so the process's open files stay about the same.
+Projects calls also depend on contacts.db being reachable. Hence opt-in.
+"""
+
+import os
+import tempfile
+
+import db_pool
+
+
+ATTACH = os.getenv("STORAGE_ATTACH", "0") == "1"
+CONTACTS_SCHEMA = "contactdb"
+
+# filename -> resolved path, so the makedirs/access checks run once per file
+_resolved_paths = {}
+
+
+def resolve_path(filename):
+    """Return filename, or the same name in the temp dir when its directory is not writable"""
+    path = _resolved_paths.get(filename)
+    if path is not None:
+        return path
+    path = filename
+    dirpath = os.path.dirname(path) or "."
+    try:
+        os.makedirs(dirpath, exist_ok=True)
+    except Exception:
+        # If we cannot create the directory, fall back to temp dir
+        pass
+    # If directory is not writable, fall back to temp directory
+    if not os.access(dirpath, os.W_OK):
+        tempdir = tempfile.gettempdir()
+        path = os.path.join(tempdir, os.path.basename(filename))
+    _resolved_paths[filename] = path
+    return path
+
+
+def projects_pool():
+    """Pool for DAL: projects.db, with contacts.db attached when ATTACH is on"""
+    # Imported here: both data access modules import this one
+    import DAL
+    import contact_DAL
+
+    if not ATTACH:
+        return db_pool.get_pool(DAL._resolve_db_path())
+    return db_pool.get_pool(
+        DAL._resolve_db_path(), attach=((CONTACTS_SCHEMA, contact_DAL._resolve_db_path()),)
+    )
+
+
+def contacts_pool():
+    """Pool for contact_DAL: the shared pool when ATTACH is on, else contacts.db's own"""
+    if ATTACH:
+        return projects_pool()
+    import contact_DAL
+
+    return db_pool.get_pool(contact_DAL._resolve_db_path())
@@ -4,14 +4,19 @@ Tests all Flask routes, form submissions, and application functionality.
 """
 
 import pytest
+import io
+import json
 import os
 import tempfile
+import threading
 from flask import Flask
 import DAL
 import contact_DAL
+import passwords
 
-# Import the app after setting up test databases
-from app import app
+from app import create_app
+
+app = create_app({'TESTING': True})
 
 
 class TestFlaskApp:
@@ -72,6 +77,110 @@ class TestFlaskApp:
         if projects:
             assert projects[0]['Title'].encode() in response.data
     
+    def test_projects_route_pagination(self):
+        """Test next/previous links on the projects page"""
+        for i in range(DAL.PAGE_SIZE + 5):
+            DAL.insert_project(f"Paged Project {i}", "Description", "test.jpg")
+        ids = [p['id'] for p in DAL.list_projects()]
+        
+        response = self.client.get('/projects')
+        assert response.status_code == 200
+        assert f'after={ids[DAL.PAGE_SIZE - 1]}'.encode() in response.data
+        assert b'before=' not in response.data
+        
+        response = self.client.get(f'/projects?after={ids[DAL.PAGE_SIZE - 1]}')
+        assert response.status_code == 200
+        assert f'before={ids[DAL.PAGE_SIZE]}'.encode() in response.data
+        assert b'Paged Project 0<' not in response.data
+        assert f'Paged Project {DAL.PAGE_SIZE + 4}'.encode() in response.data
+    
+    def test_projects_route_out_of_range_cursor(self):
+        """Test that cursors beyond SQLite's integer range are ignored, not a 500"""
+        first_page = self.client.get('/projects').data
+        for query in ['after=99999999999999999999999', 'before=-99999999999999999999999']:
+            response = self.client.get(f'/projects?{query}')
+            assert response.status_code == 200
+            assert response.data == first_page
+    
+    def test_projects_route_streaming(self):
+        """Test that the streamed projects page matches the buffered one"""
+        from app import _get_thumbnails
+        for i in range(DAL.PAGE_SIZE + 5):
+            DAL.insert_project(f"Streamed Project {i}", "Description", "test.jpg")
+        # A thumbnail build finishing between the two requests would change the markup
+        self.client.get('/projects')
+        _get_thumbnails(app).wait()
+        buffered = self.client.get('/projects').data
+        
+        app.config['STREAM_PROJECTS'] = True
+        try:
+            response = self.client.get('/projects')
+        finally:
+            app.config['STREAM_PROJECTS'] = False
+        
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.data == buffered
+    
+    def test_projects_route_conditional_get(self):
+        """Test ETag and Last-Modified revalidation of the projects page"""
+        response = self.client.get('/projects')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        assert 'no-cache' in response.headers['Cache-Control']
+        # Thumbnails can change the markup under the same validator, so it is weak
+        assert etag.startswith('W/')
+        
+        response = self.client.get('/projects', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+        
+        response = self.client.get('/projects', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+        
+        # A different page has its own validator
+        response = self.client.get('/projects?after=1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+    
+    def test_projects_route_etag_changes_after_insert(self):
+        """Test that adding a project invalidates the cached page"""
+        etag = self.client.get('/projects').headers['ETag']
+        DAL.insert_project("Revalidated Project", "Description", "test.jpg")
+        
+        response = self.client.get('/projects', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert b'Revalidated Project' in response.data
+    
+    def test_projects_route_with_flash_is_not_conditional(self):
+        """Test that a page showing flash messages is never answered with 304"""
+        etag = self.client.get('/projects').headers['ETag']
+        data = {'title': 'Flashed Project', 'description': 'Description', 'image_file_name': 'sign.webp'}
+        self.client.post('/projects/new', data=data)
+        
+        response = self.client.get('/projects', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'added successfully' in response.data
+        assert 'ETag' not in response.headers
+    
+    def test_projects_search_route(self):
+        """Test the project search page"""
+        DAL.insert_project("Searchable Robot", "Walks on two legs", "test.jpg")
+        
+        response = self.client.get('/projects/search?q=robot')
+        assert response.status_code == 200
+        assert b'Searchable Robot' in response.data
+        assert b'Decentro Vault' not in response.data
+        
+        response = self.client.get('/projects/search?q=nomatchword')
+        assert response.status_code == 200
+        assert b'No matching projects' in response.data
+        
+        assert self.client.get('/projects/search?q=x%00y').status_code == 200
+        assert self.client.get('/projects/search?q=robot&page=99999999999999999999999').status_code == 200
+    
     def test_projects_new_route_get(self):
         """Test new project form GET request"""
         response = self.client.get('/projects/new')
@@ -83,7 +192,7 @@ class TestFlaskApp:
         data = {
             'title': 'Test Project',
             'description': 'Test Description',
-            'image_file_name': 'test.jpg'
+            'image_file_name': 'sign.webp'
         }
         
         response = self.client.post('/projects/new', data=data, follow_redirects=True)
@@ -98,7 +207,7 @@ class TestFlaskApp:
         data = {
             'title': '',
             'description': 'Test Description',
-            'image_file_name': 'test.jpg'
+            'image_file_name': 'sign.webp'
         }
         
         response = self.client.post('/projects/new', data=data, follow_redirects=True)
@@ -113,7 +222,7 @@ class TestFlaskApp:
         data = {
             'title': 'Test Project',
             'description': '',
-            'image_file_name': 'test.jpg'
+            'image_file_name': 'sign.webp'
         }
         
         response = self.client.post('/projects/new', data=data, follow_redirects=True)
@@ -157,7 +266,8 @@ class TestFlaskApp:
         response = self.client.post('/contact', data=data, follow_redirects=True)
         assert response.status_code == 200
         
-        # Check that contact was added to database
+        # Check that contact was added to database once its hash is done
+        assert passwords.wait_idle(5)
         contacts = contact_DAL.list_contacts()
         assert any(c['email'] == 'john@example.com' for c in contacts)
     
@@ -225,7 +335,8 @@ class TestFlaskApp:
         response = self.client.post('/contact', data=data, follow_redirects=True)
         assert response.status_code == 200
         
-        # Should add contact to database
+        # Should add contact to database once its hash is done
+        assert passwords.wait_idle(5)
         contacts = contact_DAL.list_contacts()
         assert any(c['email'] == 'john@example.com' for c in contacts)
     
@@ -255,7 +366,7 @@ class TestFlaskApp:
         data = {
             'title': 'Flash Test Project',
             'description': 'Test Description',
-            'image_file_name': 'test.jpg'
+            'image_file_name': 'sign.webp'
         }
         
         response = self.client.post('/projects/new', data=data, follow_redirects=True)
@@ -284,9 +395,9 @@ class TestFlaskApp:
     def test_multiple_project_submissions(self):
         """Test multiple project submissions"""
         projects_data = [
-            {'title': 'Project 1', 'description': 'Description 1', 'image_file_name': 'img1.jpg'},
-            {'title': 'Project 2', 'description': 'Description 2', 'image_file_name': 'img2.jpg'},
-            {'title': 'Project 3', 'description': 'Description 3', 'image_file_name': 'img3.jpg'},
+            {'title': 'Project 1', 'description': 'Description 1', 'image_file_name': 'block.webp'},
+            {'title': 'Project 2', 'description': 'Description 2', 'image_file_name': 'career.webp'},
+            {'title': 'Project 3', 'description': 'Description 3', 'image_file_name': 'gaming.webp'},
         ]
         
         for data in projects_data:
@@ -311,6 +422,267 @@ class TestFlaskApp:
             assert response.status_code == 200
         
         # Check that all contacts were added
+        assert passwords.wait_idle(5)
         contacts = contact_DAL.list_contacts()
         for data in contacts_data:
             assert any(c['email'] == data['email'] for c in contacts)
+    
+    def test_export_contacts_command(self):
+        """Test the export-contacts CLI command"""
+        contact_DAL.insert_contact("Cli", "Export", "cli@example.com", "hidden-password")
+        output = os.path.join(self.temp_dir.name, 'contacts.ndjson')
+        
+        result = app.test_cli_runner().invoke(args=['export-contacts', '--format', 'ndjson', '--output', output])
+        assert result.exit_code == 0
+        
+        with open(output) as f:
+            exported = f.read()
+        assert 'cli@example.com' in exported
+        assert 'hidden-password' not in exported
+    
+    def test_import_projects_csv_upload(self):
+        """Test bulk import of an uploaded CSV file"""
+        body = b"title,description,image_file_name\nUploaded,From CSV,sign.webp\n,No title,sign.webp\n"
+        response = self.client.post('/projects/import', data={
+            'file': (io.BytesIO(body), 'projects.csv'),
+        }, content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.json['inserted'] == 1
+        assert [e['row'] for e in response.json['errors']] == [2]
+        assert any(p['Title'] == 'Uploaded' for p in DAL.list_projects())
+    
+    def test_import_projects_jsonl_body(self):
+        """Test bulk import of a raw JSON Lines request body"""
+        lines = [json.dumps({'title': f'Line {i}', 'description': 'd', 'image_file_name': 'sign.webp'}) for i in range(3)]
+        response = self.client.post('/projects/import', data='\n'.join(lines),
+                                    content_type='application/x-ndjson')
+        
+        assert response.status_code == 200
+        assert response.json == {'inserted': 3, 'errors': []}
+    
+    def test_import_projects_non_text_fields(self):
+        """Test that JSON numbers or objects in a field are row errors, not a failed import"""
+        lines = [
+            json.dumps({'title': 5, 'description': 'd', 'image_file_name': 'sign.webp'}),
+            json.dumps({'title': 'Fine', 'description': {'a': 1}, 'image_file_name': 'sign.webp'}),
+            json.dumps({'title': 'Kept', 'description': 'd', 'image_file_name': 'sign.webp'}),
+        ]
+        response = self.client.post('/projects/import?format=jsonl', data='\n'.join(lines))
+        
+        assert response.status_code == 200
+        assert response.json['inserted'] == 1
+        assert [e['row'] for e in response.json['errors']] == [1, 2]
+        assert "must be a string" in response.json['errors'][0]['message']
+    
+    def test_import_projects_unreadable_csv(self):
+        """Test that an oversized CSV field is a 400 saying how many rows were already imported"""
+        body = "title,description,image_file_name\nBefore,Fine,sign.webp\n"
+        body += 'Huge,"' + "x" * 200000 + '",sign.webp\nAfter,Never read,sign.webp\n'
+        response = self.client.post('/projects/import?format=csv', data=body.encode())
+        
+        assert response.status_code == 400
+        assert response.json['inserted'] == 1
+        assert '1 rows before it were imported' in response.json['error']
+        assert response.json['errors'][-1]['row'] == 2
+        titles = [p['Title'] for p in DAL.list_projects()]
+        assert 'Before' in titles and 'After' not in titles
+    
+    def test_import_projects_bad_utf8_after_first_chunk(self):
+        """Test that a decode error late in the file keeps and reports the committed chunks"""
+        lines = [json.dumps({'title': f'Early {i}', 'description': 'd', 'image_file_name': 'sign.webp'})
+                 for i in range(DAL.BULK_CHUNK_SIZE + 1)]
+        body = '\n'.join(lines).encode() + b'\n\xff\xfe\n'
+        response = self.client.post('/projects/import?format=jsonl', data=body)
+        
+        assert response.status_code == 400
+        assert response.json['inserted'] == DAL.BULK_CHUNK_SIZE + 1
+        assert 'UTF-8' in response.json['error']
+    
+    def test_import_projects_rejects_unknown_images(self):
+        """Test that rows naming images outside the catalog are row errors, as on the form"""
+        body = ("title,description,image_file_name\n"
+                "Good,d,sign.webp\nEscape,d,../../etc/passwd\nMissing,d,missing.webp\n")
+        response = self.client.post('/projects/import?format=csv', data=body)
+        
+        assert response.status_code == 200
+        assert response.json['inserted'] == 1
+        assert [e['row'] for e in response.json['errors']] == [2, 3]
+        assert 'not found in static/images' in response.json['errors'][0]['message']
+        assert not any(p['Title'] in ('Escape', 'Missing') for p in DAL.list_projects())
+    
+    def test_import_projects_unknown_format(self):
+        """Test that an unrecognised upload is rejected"""
+        response = self.client.post('/projects/import', data='x', content_type='text/plain')
+        assert response.status_code == 400
+    
+    def test_import_projects_command(self):
+        """Test the import-projects CLI command"""
+        path = os.path.join(self.temp_dir.name, 'projects.jsonl')
+        with open(path, 'w') as f:
+            f.write('{"Title": "From CLI", "Description": "d", "ImageFileName": "sign.webp"}\n')
+        
+        result = app.test_cli_runner().invoke(args=['import-projects', path])
+        assert result.exit_code == 0
+        assert 'Imported 1 projects' in result.output
+        assert any(p['Title'] == 'From CLI' for p in DAL.list_projects())
+    
+    def test_contact_password_is_hashed(self):
+        """Test that the contact route stores a verifiable hash, not the password"""
+        self.client.post('/contact', data={
+            'first-name': 'Hash', 'last-name': 'Check', 'email': 'hash@example.com',
+            'message': 'Hi', 'password': 'plaintext-secret', 'confirm-password': 'plaintext-secret',
+        })
+        assert passwords.wait_idle(5)
+        stored = next(c for c in contact_DAL.list_contacts() if c['email'] == 'hash@example.com')
+        assert stored['password'] != 'plaintext-secret'
+        assert passwords.verify_password('plaintext-secret', stored['password'])
+    
+    def test_contact_does_not_wait_for_the_hash(self, monkeypatch):
+        """Test that the request returns while the hash is still queued, and the row appears once it is done"""
+        release = threading.Event()
+        pool = passwords.HashingPool(workers=1, max_queue=4)
+        monkeypatch.setattr(passwords, 'get_pool', lambda: pool)
+        try:
+            pool._submit(release.wait)
+            response = self.client.post('/contact', data={
+                'first-name': 'Queued', 'last-name': 'Hash', 'email': 'queued@example.com',
+                'message': 'Hi', 'password': 'pass1', 'confirm-password': 'pass1',
+            })
+            assert response.status_code == 302
+            assert response.location.endswith('/thank-you')
+            assert not any(c['email'] == 'queued@example.com' for c in contact_DAL.list_contacts())
+            
+            release.set()
+            assert pool.wait_idle(5)
+            assert any(c['email'] == 'queued@example.com' for c in contact_DAL.list_contacts())
+        finally:
+            release.set()
+            pool.close()
+    
+    def test_contact_whitespace_fields_rejected_up_front(self):
+        """Test that fields the DAL would reject are refused before hashing"""
+        response = self.client.post('/contact', data={
+            'first-name': '   ', 'last-name': 'Blank', 'email': 'blank@example.com',
+            'message': 'Hi', 'password': 'pass1', 'confirm-password': 'pass1',
+        }, follow_redirects=True)
+        assert b'required' in response.data
+        assert passwords.wait_idle(5)
+        assert not any(c['email'] == 'blank@example.com' for c in contact_DAL.list_contacts())
+    
+    def test_contact_rejected_when_hashing_pool_full(self, monkeypatch):
+        """Test that a saturated hashing pool turns the visitor away instead of queueing"""
+        class FullPool:
+            def submit_hash(self, password):
+                raise passwords.HashingPoolFull()
+        monkeypatch.setattr(passwords, 'get_pool', lambda: FullPool())
+        
+        response = self.client.post('/contact', data={
+            'first-name': 'Busy', 'last-name': 'Server', 'email': 'busy@example.com',
+            'message': 'Hi', 'password': 'pass1', 'confirm-password': 'pass1',
+        }, follow_redirects=True)
+        assert b'try again' in response.data
+        assert not any(c['email'] == 'busy@example.com' for c in contact_DAL.list_contacts())
+    
+    def test_projects_use_responsive_images_once_built(self):
+        """Test srcset/sizes output and immutable thumbnail URLs"""
+        pytest.importorskip("PIL")
+        from app import _get_thumbnails
+        DAL.insert_project("Responsive", "Has thumbnails", "sign.webp")
+        _get_thumbnails(app).build("sign.webp")
+        
+        response = self.client.get('/projects')
+        assert b'srcset=' in response.data
+        assert b'sizes="' in response.data
+        assert b'type="image/webp"' in response.data
+        
+        info = _get_thumbnails(app).lookup("sign.webp")
+        thumb = self.client.get('/thumbs/' + info['variants']['webp'][0][0])
+        assert thumb.status_code == 200
+        assert 'immutable' in thumb.headers['Cache-Control']
+    
+    def test_base_template_links_fingerprinted_assets(self):
+        """Test that pages reference hashed static URLs that are served as immutable"""
+        response = self.client.get('/about')
+        assert b'/static/css/styles.css' not in response.data
+        css = next(a for a in app.extensions['assets'].urls.items() if a[0] == 'css/styles.css')[1]
+        assert ('/static/' + css).encode() in response.data
+        
+        asset = self.client.get('/static/' + css, headers={'Accept-Encoding': 'gzip'})
+        assert asset.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in asset.headers['Cache-Control']
+        asset.close()
+    
+    def test_thumbnail_cache_created_once_under_concurrency(self):
+        """Test that concurrent first requests share a single thumbnail builder"""
+        from app import _get_thumbnails
+        _get_thumbnails(app).close()
+        app.extensions.pop('thumbnails', None)
+        start = threading.Barrier(8)
+        caches = []
+        
+        def first_request():
+            start.wait()
+            caches.append(_get_thumbnails(app))
+        
+        workers = [threading.Thread(target=first_request) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert len({id(cache) for cache in caches}) == 1
+        assert app.extensions['thumbnails'] is caches[0]
+    
+    def test_projects_etag_ignores_background_thumbnail_builds(self):
+        """Test that thumbnails finishing between requests leave the ETag alone"""
+        from app import _get_thumbnails
+        _get_thumbnails(app).close()
+        app.extensions.pop('thumbnails', None)
+        first = self.client.get('/projects').headers['ETag']
+        _get_thumbnails(app).wait()
+        assert self.client.get('/projects').headers['ETag'] == first
+        
+        # A second app (another worker) computes the same validator
+        other = create_app({'TESTING': True}).test_client()
+        assert other.get('/projects').headers['ETag'] == first
+    
+    def test_projects_last_modified_follows_images(self):
+        """Test that a newer image moves Last-Modified along with the ETag"""
+        from app import _get_image_catalog
+        before = self.client.get('/projects').headers['Last-Modified']
+        with app.app_context():
+            catalog = _get_image_catalog()
+        saved, catalog.newest_mtime_ns = catalog.newest_mtime_ns, 4102444800 * 10**9
+        try:
+            response = self.client.get('/projects', headers={'If-Modified-Since': before})
+            assert response.status_code == 200
+            assert response.headers['Last-Modified'] == 'Fri, 01 Jan 2100 00:00:00 GMT'
+        finally:
+            catalog.newest_mtime_ns = saved
+    
+    def test_compressed_projects_page_revalidates(self):
+        """Test gzip on /projects and that its weakened ETag still yields 304"""
+        for i in range(10):
+            DAL.insert_project(f"Compressed {i}", "Description " * 20, "sign.webp")
+        first = self.client.get('/projects', headers={'Accept-Encoding': 'gzip'})
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert first.headers['ETag'].startswith('W/')
+        
+        second = self.client.get('/projects', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag'],
+        })
+        assert second.status_code == 304
+    
+    def test_projects_new_route_rejects_unknown_image(self):
+        """Test that the image file name must exist in static/images"""
+        data = {'title': 'Missing Image', 'description': 'Description', 'image_file_name': 'nope.jpg'}
+        response = self.client.post('/projects/new', data=data, follow_redirects=True)
+        
+        assert b'was not found' in response.data
+        assert not any(p['Title'] == 'Missing Image' for p in DAL.list_projects())
+    
+    def test_projects_table_has_image_dimensions(self):
+        """Test that catalog dimensions are emitted so the table does not reflow"""
+        DAL.insert_project("Sized", "Has dimensions", "sign.webp")
+        response = self.client.get('/projects')
+        assert b'width="600" height="397"' in response.data
@@ -0,0 +1,189 @@
+"""
+Test script for the ASGI variant of the site.
+Tests the async pages, conditional GETs, the Flask fallback and the bounded DB executor.
+"""
+
+import pytest
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+pytest.importorskip("starlette")
+pytest.importorskip("a2wsgi")
+
+import DAL
+import contact_DAL
+import asgi
+
+
+def _call(method, path, headers=(), body=b''):
+    """Run one request through asgi.app; returns (status, headers dict, body)"""
+    path, _, query = path.partition('?')
+    if body:
+        headers = list(headers) + [('Content-Length', str(len(body)))]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(k.lower().encode(), v.encode()) for k, v in headers],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    messages = []
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return pending.pop(0) if pending else {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    try:
+        asyncio.run(asgi.app(scope, receive, send))
+    finally:
+        # A fresh event loop per call, so drop the loop-bound executor state
+        asgi.db.shutdown()
+        asgi.renderer.shutdown()
+    start = messages[0]
+    response_headers = {k.decode().lower(): v.decode() for k, v in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+
+class TestAsgiApp:
+    """Test asgi.app against temporary databases"""
+    
+    def setup_method(self):
+        """Set up test databases before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        DAL.init_db()
+        contact_DAL.init_contact_db()
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+    
+    def test_async_pages_render(self):
+        """Test that the natively served pages return HTML"""
+        DAL.insert_project("Async Project", "Served from the event loop", "sign.webp")
+        for path in ['/', '/about', '/resume', '/thank-you', '/projects', '/projects/search?q=async']:
+            status, headers, body = _call('GET', path)
+            assert status == 200, path
+            assert headers['content-type'].startswith('text/html')
+        assert b'Async Project' in _call('GET', '/projects')[2]
+        assert b'Async Project' in _call('GET', '/projects/search?q=async')[2]
+    
+    def test_projects_conditional_get(self):
+        """Test ETag revalidation on the async projects page"""
+        _, headers, _ = _call('GET', '/projects')
+        status, _, body = _call('GET', '/projects', headers=[('If-None-Match', headers['etag'])])
+        assert status == 304
+        assert body == b''
+        
+        DAL.insert_project("Changed", "New row", "sign.webp")
+        assert _call('GET', '/projects', headers=[('If-None-Match', headers['etag'])])[0] == 200
+    
+    def test_pages_are_compressed(self):
+        """Test that async pages get the same compression as the WSGI app"""
+        status, headers, body = _call('GET', '/about', headers=[('Accept-Encoding', 'gzip')])
+        assert headers['content-encoding'] == 'gzip'
+        assert headers['vary'] == 'Accept-Encoding'
+    
+    def test_other_routes_fall_back_to_flask(self):
+        """Test that forms and static files are still served by the Flask app"""
+        status, headers, _ = _call(
+            'POST', '/projects/new',
+            headers=[('Content-Type', 'application/x-www-form-urlencoded')],
+            body=b'title=Posted&description=Via+fallback&image_file_name=sign.webp',
+        )
+        assert status == 302
+        assert any(p['Title'] == 'Posted' for p in DAL.list_projects())
+        
+        cookie = headers['set-cookie'].split(';')[0]
+        status, _, body = _call('GET', '/projects', headers=[('Cookie', cookie)])
+        assert status == 200
+        assert b'added successfully' in body
+        
+        assert _call('GET', '/contact')[0] == 200
+        assert _call('GET', '/missing-page')[0] == 404
+
+    def test_templates_render_off_the_event_loop(self, monkeypatch):
+        """Test that pages are rendered on the render pool's threads"""
+        threads = []
+        render = asgi._render
+        
+        def recording_render(request, template, **context):
+            threads.append(threading.current_thread().name)
+            return render(request, template, **context)
+        monkeypatch.setattr(asgi, '_render', recording_render)
+        
+        assert _call('GET', '/about')[0] == 200
+        assert _call('GET', '/projects')[0] == 200
+        assert len(threads) == 2
+        assert all(name.startswith('asgi-render') for name in threads)
+    
+    def test_out_of_range_cursor_is_ignored(self):
+        """Test that a cursor beyond SQLite's integer range is treated as missing, not a 500"""
+        status, _, body = _call('GET', '/projects?after=99999999999999999999999&before=-99999999999999999999999')
+        assert status == 200
+        assert b'Sign Language Recognition' in body
+        assert _call('GET', '/projects/search?q=sign&page=99999999999999999999999')[0] == 200
+    
+    def test_lifespan_builds_image_catalog(self, monkeypatch):
+        """Test that the image catalog is read at start-up rather than by the first request"""
+        monkeypatch.delitem(asgi.flask_app.extensions, 'image_catalog', raising=False)
+        messages = []
+        pending = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        
+        async def receive():
+            return pending.pop(0)
+        
+        async def send(message):
+            messages.append(message['type'])
+        
+        asyncio.run(asgi.app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, receive, send))
+        assert messages == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        assert 'image_catalog' in asgi.flask_app.extensions
+    
+    @pytest.mark.skipif(not asgi.metrics.ENABLED, reason="METRICS_ENABLED=0")
+    def test_async_pages_recorded_in_metrics(self):
+        """Test that native pages report under the same endpoint names as Flask"""
+        asgi.metrics.clear()
+        _call('GET', '/projects')
+        child = asgi.metrics.REQUEST_DURATION.labels('projects', 'GET', '200')
+        assert sum(child.snapshot()[0]) == 1
+        assert asgi.metrics.IN_FLIGHT.labels('projects').snapshot() == 0
+
+
+class TestBoundedExecutor:
+    """Test the thread pool the async handlers use for DAL calls"""
+    
+    def test_thread_limit(self):
+        """Test that no more than `threads` blocking calls run at once"""
+        executor = asgi.BoundedExecutor(threads=2, max_pending=4)
+        lock = threading.Lock()
+        running = [0, 0]
+        
+        def blocking(i):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return i
+        
+        async def main():
+            return await asyncio.gather(*(executor.run(blocking, i) for i in range(10)))
+        
+        try:
+            assert asyncio.run(main()) == list(range(10))
+        finally:
+            executor.shutdown()
+        assert running[1] == 2
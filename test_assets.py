@@ -0,0 +1,112 @@
+"""
+Test script for fingerprinted, precompressed static assets.
+Tests manifest building, hashed URLs, encoding negotiation and cache headers.
+"""
+
+import gzip
+import os
+import tempfile
+from flask import Flask, url_for
+import assets
+
+
+class TestAssetBuild:
+    """Test assets.build against a throwaway static folder"""
+    
+    def setup_method(self):
+        """Create a static folder with text and binary files"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.temp_dir.name, 'static')
+        self.output = os.path.join(self.static, 'dist')
+        os.makedirs(os.path.join(self.static, 'css'))
+        self.css = b'body { color: red; }\n' * 200
+        with open(os.path.join(self.static, 'css', 'site.css'), 'wb') as f:
+            f.write(self.css)
+        with open(os.path.join(self.static, 'logo.png'), 'wb') as f:
+            f.write(os.urandom(2048))
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        self.temp_dir.cleanup()
+    
+    def _app(self):
+        app = Flask(__name__, static_folder=self.static)
+        app.config['TESTING'] = True
+        assets.init_app(app, self.output)
+        return app
+    
+    def test_manifest_maps_to_hashed_names(self):
+        """Test content-hashed names and precompressed siblings"""
+        manifest = assets.build(self.static, self.output)
+        css = manifest['files']['css/site.css']
+        
+        assert css['path'].startswith('css/site.') and css['path'].endswith('.css')
+        assert css['path'] != 'css/site.css'
+        with open(os.path.join(self.output, css['encodings']['gzip']), 'rb') as f:
+            assert gzip.decompress(f.read()) == self.css
+        # Random bytes are neither compressible nor a text type
+        assert manifest['files']['logo.png']['encodings'] == {}
+        assert assets.load(self.output) == manifest
+    
+    def test_changed_file_gets_new_name(self):
+        """Test that editing a file changes its URL"""
+        before = assets.build(self.static, self.output)['files']['css/site.css']['path']
+        with open(os.path.join(self.static, 'css', 'site.css'), 'ab') as f:
+            f.write(b'a { color: blue; }\n')
+        after = assets.build(self.static, self.output)['files']['css/site.css']['path']
+        assert before != after
+    
+    def test_rebuild_reuses_unchanged_entries(self, monkeypatch):
+        """Test that a rebuild with no changes compresses nothing and keeps the manifest"""
+        manifest = assets.build(self.static, self.output)
+        manifest_path = os.path.join(self.output, assets.MANIFEST_NAME)
+        mtime = os.stat(manifest_path).st_mtime_ns
+        
+        def fail(data):
+            raise AssertionError("unchanged file compressed again")
+        
+        monkeypatch.setattr(assets, '_encodings', fail)
+        assert assets.build(self.static, self.output) == manifest
+        assert os.stat(manifest_path).st_mtime_ns == mtime
+    
+    def test_url_for_returns_hashed_url(self):
+        """Test that url_for('static') is rewritten and unknown files are left alone"""
+        app = self._app()
+        with app.test_request_context():
+            assert url_for('static', filename='css/site.css') != '/static/css/site.css'
+            assert url_for('static', filename='missing.css') == '/static/missing.css'
+    
+    def test_encoding_negotiation_and_cache_headers(self):
+        """Test brotli/gzip/identity selection and immutable caching"""
+        app = self._app()
+        client = app.test_client()
+        with app.test_request_context():
+            url = url_for('static', filename='css/site.css')
+        
+        plain = client.get(url)
+        assert plain.data == self.css
+        assert 'Content-Encoding' not in plain.headers
+        assert 'immutable' in plain.headers['Cache-Control']
+        assert 'max-age=31536000' in plain.headers['Cache-Control']
+        assert plain.headers['Vary'] == 'Accept-Encoding'
+        assert plain.mimetype == 'text/css'
+        
+        gzipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert gzipped.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(gzipped.data) == self.css
+        plain.close()
+        gzipped.close()
+        
+        if assets.brotli is not None:
+            br = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+            assert br.headers['Content-Encoding'] == 'br'
+            assert assets.brotli.decompress(br.data) == self.css
+            br.close()
+    
+    def test_unhashed_path_still_served(self):
+        """Test that the original path keeps working without immutable caching"""
+        client = self._app().test_client()
+        response = client.get('/static/css/site.css')
+        assert response.status_code == 200
+        assert 'immutable' not in response.headers.get('Cache-Control', '')
+        response.close()
@@ -0,0 +1,117 @@
+"""
+Test script for the response compression middleware.
+Tests negotiation, skip rules, streamed compression, the output cache and stats.
+"""
+
+import pytest
+import gzip
+import zlib
+from flask import Flask, Response, make_response
+import compression
+
+
+PAGE = ('<p>' + 'compress me please ' * 200 + '</p>')
+
+
+class TestCompressionMiddleware:
+    """Test CompressionMiddleware around a throwaway app"""
+    
+    def setup_method(self):
+        """Create an app with one route per case"""
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        
+        @app.route('/page')
+        def page():
+            return PAGE
+        
+        @app.route('/small')
+        def small():
+            return '<p>tiny</p>'
+        
+        @app.route('/image')
+        def image():
+            return Response(b'\xff\xd8' + b'\x00' * 4000, mimetype='image/jpeg')
+        
+        @app.route('/stream')
+        def stream():
+            return Response((f'<li>row {i}</li>' * 50 for i in range(20)), mimetype='text/html')
+        
+        @app.route('/cookie')
+        def cookie():
+            response = make_response(PAGE)
+            response.set_cookie('session', 'x')
+            return response
+        
+        @app.route('/etag')
+        def etag():
+            response = make_response(PAGE)
+            response.set_etag('abc')
+            return response
+        
+        self.middleware = compression.CompressionMiddleware(app.wsgi_app)
+        app.wsgi_app = self.middleware
+        self.client = app.test_client()
+    
+    def test_gzip_when_accepted(self):
+        """Test that a large HTML body is gzip encoded with the right headers"""
+        response = self.client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert gzip.decompress(response.data).decode() == PAGE
+    
+    def test_brotli_preferred_when_available(self):
+        """Test that br wins over gzip at equal quality"""
+        if compression.brotli is None:
+            pytest.skip("brotli not installed")
+        response = self.client.get('/page', headers={'Accept-Encoding': 'gzip, deflate, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert compression.brotli.decompress(response.data).decode() == PAGE
+    
+    def test_no_accept_encoding_is_untouched(self):
+        """Test that clients that do not ask for compression get identity"""
+        response = self.client.get('/page')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.decode() == PAGE
+    
+    def test_small_and_binary_bodies_are_skipped(self):
+        """Test the size and content-type skip rules"""
+        for path in ('/small', '/image'):
+            response = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in response.headers
+        assert self.middleware.stats()['skipped'] == 2
+    
+    def test_streamed_response_is_compressed_incrementally(self):
+        """Test that a streamed body is encoded chunk by chunk and decodes fully"""
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        chunks = list(response.iter_encoded())
+        response.close()
+        # Every chunk is flushed, so the first one already decodes to a complete row
+        assert zlib.decompressobj(31).decompress(chunks[0]).startswith(b'<li>row 0</li>')
+        expected = ''.join(f'<li>row {i}</li>' * 50 for i in range(20))
+        assert gzip.decompress(b''.join(chunks)).decode() == expected
+    
+    def test_repeated_body_is_served_from_cache(self):
+        """Test that identical bodies are compressed once"""
+        for _ in range(3):
+            self.client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        stats = self.middleware.stats()
+        assert stats['compressed'] == 3
+        assert stats['cache_hits'] == 2
+        assert stats['bytes_saved'] > 0
+        assert stats['bytes_out'] < stats['bytes_in']
+    
+    def test_responses_setting_cookies_are_not_cached(self):
+        """Test that per-user responses never enter the cache"""
+        for _ in range(2):
+            response = self.client.get('/cookie', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+        assert self.middleware.stats()['cache_hits'] == 0
+    
+    def test_etag_is_weakened(self):
+        """Test that a strong ETag becomes weak once the bytes are re-encoded"""
+        response = self.client.get('/etag', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['ETag'] == 'W/"abc"'
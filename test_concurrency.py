@@ -0,0 +1,171 @@
+"""
+Stress tests for concurrent access to the projects and contacts databases.
+Runs several threads and processes of mixed reads and writes and checks that
+no write is lost to "database is locked" errors.
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import threading
+import multiprocessing
+import DAL
+import contact_DAL
+import db_pool
+
+
+THREADS = 8
+PROCESSES = 4
+WRITES_PER_WORKER = 25
+
+
+def _mixed_workload(projects_db, contacts_db, worker_id):
+    """Interleave inserts with full reads against both databases"""
+    DAL.DB_FILENAME = projects_db
+    contact_DAL.DB_FILENAME = contacts_db
+    for i in range(WRITES_PER_WORKER):
+        DAL.insert_project(f"Worker {worker_id} project {i}", "Stress test", "test.jpg")
+        contact_DAL.insert_contact("Stress", f"Worker{worker_id}", f"w{worker_id}-{i}@example.com", "password123")
+        DAL.list_projects()
+        contact_DAL.get_contact_count()
+
+
+def _start_worker(projects_db, contacts_db, barrier):
+    """What each server worker does at boot: create the app, then serve a first request"""
+    from app import create_app
+    client = create_app({'TESTING': True}).test_client()
+    DAL.DB_FILENAME = projects_db
+    contact_DAL.DB_FILENAME = contacts_db
+    barrier.wait()
+    assert client.get('/projects').status_code == 200
+
+
+class TestConcurrentWrites:
+    """Test that concurrent writers do not lose data"""
+
+    def setup_method(self):
+        """Set up test databases before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects_filename = DAL.DB_FILENAME
+        self.original_contacts_filename = contact_DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        DAL.init_db()
+        contact_DAL.init_contact_db()
+        self.seed_count = len(DAL.list_projects())
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        db_pool.close_all()
+        DAL.DB_FILENAME = self.original_projects_filename
+        contact_DAL.DB_FILENAME = self.original_contacts_filename
+        self.temp_dir.cleanup()
+
+    def test_wal_mode_enabled(self):
+        """Test that pooled connections run in WAL mode with a busy timeout"""
+        conn = DAL.get_connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db_pool.BUSY_TIMEOUT_MS
+        conn.close()
+
+    def test_retry_on_lock_retries_then_succeeds(self, monkeypatch):
+        """Test that lock errors are retried and other errors are not"""
+        monkeypatch.setattr(db_pool, "RETRY_BASE_DELAY", 0)
+        calls = []
+
+        @db_pool.retry_on_lock
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+
+        assert flaky() == "ok"
+        assert len(calls) == 3
+
+        @db_pool.retry_on_lock
+        def broken():
+            raise sqlite3.OperationalError("no such table: missing")
+
+        with pytest.raises(sqlite3.OperationalError, match="no such table"):
+            broken()
+
+    def test_retry_on_lock_gives_up(self, monkeypatch):
+        """Test that retries are bounded"""
+        monkeypatch.setattr(db_pool, "RETRY_BASE_DELAY", 0)
+        monkeypatch.setattr(db_pool, "MAX_RETRIES", 2)
+        calls = []
+
+        @db_pool.retry_on_lock
+        def always_locked():
+            calls.append(1)
+            raise sqlite3.OperationalError("database is locked")
+
+        with pytest.raises(sqlite3.OperationalError):
+            always_locked()
+        assert len(calls) == 3
+
+    @pytest.mark.slow
+    def test_threads_lose_no_writes(self):
+        """Test mixed reads and writes from many threads"""
+        errors = []
+
+        def run(worker_id):
+            try:
+                _mixed_workload(DAL.DB_FILENAME, contact_DAL.DB_FILENAME, worker_id)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert len(DAL.list_projects()) == self.seed_count + THREADS * WRITES_PER_WORKER
+        assert contact_DAL.get_contact_count() == THREADS * WRITES_PER_WORKER
+
+    @pytest.mark.slow
+    def test_processes_lose_no_writes(self):
+        """Test mixed reads and writes from several worker processes"""
+        ctx = multiprocessing.get_context("spawn")
+        procs = [
+            ctx.Process(target=_mixed_workload, args=(DAL.DB_FILENAME, contact_DAL.DB_FILENAME, i))
+            for i in range(PROCESSES)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=120)
+
+        assert all(p.exitcode == 0 for p in procs)
+        assert len(DAL.list_projects()) == self.seed_count + PROCESSES * WRITES_PER_WORKER
+        assert contact_DAL.get_contact_count() == PROCESSES * WRITES_PER_WORKER
+
+
+class TestConcurrentStartup:
+    """Test that workers booting together initialise the databases once"""
+
+    @pytest.mark.slow
+    def test_simultaneous_init_seeds_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            projects_db = os.path.join(temp_dir, "boot_projects.db")
+            contacts_db = os.path.join(temp_dir, "boot_contacts.db")
+            ctx = multiprocessing.get_context("spawn")
+            barrier = ctx.Barrier(PROCESSES)
+            procs = [
+                ctx.Process(target=_start_worker, args=(projects_db, contacts_db, barrier))
+                for _ in range(PROCESSES)
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join(timeout=120)
+            assert all(p.exitcode == 0 for p in procs)
+
+            conn = sqlite3.connect(projects_db)
+            titles = [row[0] for row in conn.execute("SELECT Title FROM projects")]
+            conn.close()
+            assert len(titles) == len(set(titles)) == 2
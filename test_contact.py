@@ -5,8 +5,13 @@ Tests contact form submission, validation, and data handling.
 
 import pytest
 import os
+import io
+import csv
+import json
+import sqlite3
 import tempfile
 import contact_DAL
+import contact_writer
 
 
 class TestContactFormOperations:
@@ -241,3 +246,197 @@ class TestContactFormOperations:
         count = contact_DAL.get_contact_count()
         assert isinstance(count, int)
         assert count >= 0
+
+
+
+class TestContactRetrieval:
+    """Test paginated listing, export and counting of contacts"""
+    
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = contact_DAL.DB_FILENAME
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        contact_DAL.init_contact_db()
+        for i in range(7):
+            contact_DAL.insert_contact(f"User{i}", "Test", f"user{i % 3}@example.com", f"secret{i}")
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        contact_DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def test_indexes_exist(self):
+        """Test that listing and email lookups are indexed"""
+        conn = contact_DAL.get_connection()
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE email = ? ORDER BY created_at DESC, id DESC",
+            ("user1@example.com",),
+        ).fetchall()
+        conn.close()
+        assert any('idx_contacts_email' in row[-1] for row in plan)
+    
+    def test_pages_cover_all_contacts_newest_first(self):
+        """Test that following next_cursor visits every contact once, newest first"""
+        seen = []
+        page = contact_DAL.list_contacts_page(limit=3)
+        while True:
+            seen.extend(page['contacts'])
+            if page['next_cursor'] is None:
+                break
+            page = contact_DAL.list_contacts_page(before=page['next_cursor'], limit=3)
+        
+        assert [c['id'] for c in seen] == [c['id'] for c in contact_DAL.list_contacts()]
+        assert len(seen) == 7
+    
+    def test_page_rejects_malformed_cursor(self):
+        """Test that a cursor that is not a (created_at, id) pair raises ValueError"""
+        for before in [('x',), 5, ('2024-01-01 00:00:00', 'one'), (1, 2), ('a', 'b', 'c')]:
+            with pytest.raises(ValueError, match="cursor"):
+                contact_DAL.list_contacts_page(before=before)
+        # A cursor that went through JSON comes back as a list
+        cursor = contact_DAL.list_contacts_page(limit=3)['next_cursor']
+        assert len(contact_DAL.list_contacts_page(before=list(cursor))['contacts']) == 4
+    
+    def test_pages_never_include_passwords(self):
+        """Test that paginated rows omit the password column"""
+        page = contact_DAL.list_contacts_page()
+        assert page['contacts']
+        assert all('password' not in c for c in page['contacts'])
+    
+    def test_page_filtered_by_email(self):
+        """Test listing submissions from one address"""
+        page = contact_DAL.list_contacts_page(email="user1@example.com")
+        assert [c['first_name'] for c in page['contacts']] == ["User4", "User1"]
+    
+    def test_export_csv(self):
+        """Test CSV export without passwords"""
+        out = io.StringIO()
+        assert contact_DAL.export_contacts(out, "csv") == 7
+        
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert len(rows) == 7
+        assert list(rows[0].keys()) == list(contact_DAL.PUBLIC_COLUMNS)
+        assert 'secret' not in out.getvalue()
+    
+    def test_export_ndjson(self):
+        """Test NDJSON export, one object per line"""
+        out = io.StringIO()
+        assert contact_DAL.export_contacts(out, "ndjson") == 7
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r['first_name'] for r in records] == [f"User{i}" for i in range(7)]
+    
+    def test_export_rejects_unknown_format(self):
+        """Test export format validation"""
+        with pytest.raises(ValueError, match="Unsupported export format"):
+            contact_DAL.export_contacts(io.StringIO(), "xml")
+    
+    def test_iter_contacts_is_lazy(self):
+        """Test that export rows come from a generator"""
+        rows = contact_DAL.iter_contacts(batch_size=2)
+        assert next(rows)['first_name'] == "User0"
+        rows.close()
+    
+    def test_count_sees_writes_from_other_connections(self):
+        """Test that the cached count is refreshed after an outside write"""
+        assert contact_DAL.get_contact_count() == 7
+        other = sqlite3.connect(contact_DAL.DB_FILENAME)
+        other.execute(
+            "INSERT INTO contacts (first_name, last_name, email, password) VALUES ('A', 'B', 'c@d.e', 'pw')"
+        )
+        other.commit()
+        other.close()
+        assert contact_DAL.get_contact_count() == 8
+
+
+class TestWriteBehind:
+    """Test the journaled write-behind mode of insert_contact"""
+    
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = contact_DAL.DB_FILENAME
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        contact_DAL.init_contact_db()
+        self.db_path = contact_DAL._resolve_db_path()
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        contact_writer.close_all(timeout=5)
+        contact_DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def _journals(self):
+        return [name for name in os.listdir(self.temp_dir.name) if '-wb-' in name]
+    
+    def test_submissions_are_batched_into_database(self, monkeypatch):
+        """Test that queued submissions arrive after a flush, in fewer commits than rows"""
+        monkeypatch.setattr(contact_DAL, 'WRITE_BEHIND', True)
+        for i in range(50):
+            contact_DAL.insert_contact("Queued", str(i), f"queued{i}@example.com", "hash")
+        
+        assert contact_DAL.flush_pending(timeout=5)
+        assert contact_DAL.get_contact_count() == 50
+        stats = contact_writer.stats()[self.db_path]
+        assert stats['pending'] == 0
+        assert stats['enqueue_latency_seconds']['count'] == 50
+        assert stats['batch_size']['count'] < 50
+        assert stats['commit_latency_seconds']['max'] > 0
+    
+    def test_validation_still_raises(self, monkeypatch):
+        """Test that invalid submissions are rejected before they are journaled"""
+        monkeypatch.setattr(contact_DAL, 'WRITE_BEHIND', True)
+        with pytest.raises(ValueError):
+            contact_DAL.insert_contact("", "Doe", "x@example.com", "hash")
+    
+    def test_close_removes_journal(self, monkeypatch):
+        """Test that a clean shutdown drains and deletes the journal"""
+        monkeypatch.setattr(contact_DAL, 'WRITE_BEHIND', True)
+        contact_DAL.insert_contact("Closing", "Doe", "close@example.com", "hash")
+        assert len(self._journals()) == 1
+        
+        contact_writer.close_all(timeout=5)
+        assert self._journals() == []
+        assert contact_DAL.get_contact_count() == 1
+    
+    def test_failing_batch_is_dead_lettered(self, monkeypatch):
+        """Test that a batch that keeps failing is capped, logged and set aside"""
+        def broken(db_path, journal, batch):
+            raise sqlite3.OperationalError("no such table: contacts")
+        monkeypatch.setattr(contact_writer, '_commit_batch', broken)
+        writer = contact_writer.get_writer(self.db_path, max_attempts=3, retry_wait=0)
+        writer.enqueue("Dead", "Letter", "dead@example.com", "hash")
+        
+        assert writer.flush(timeout=5)
+        stats = writer.stats()
+        assert stats['failed_batches'] == 3
+        assert stats['dead_lettered'] == 1
+        with open(contact_writer.dead_letter_path(self.db_path)) as f:
+            records = [json.loads(line) for line in f]
+        assert [r['row'][2] for r in records] == ['dead@example.com']
+        assert contact_DAL.get_contact_count() == 0
+    
+    def test_orphaned_journal_is_replayed_once(self):
+        """Test crash recovery: unapplied journal rows are inserted exactly once"""
+        journal = os.path.basename(self.db_path) + "-wb-crashed.jsonl"
+        path = os.path.join(self.temp_dir.name, journal)
+        with open(path, 'w') as f:
+            for seq in (1, 2, 3):
+                row = ["Crash", str(seq), f"crash{seq}@example.com", "hash", "2024-01-01 00:00:00"]
+                f.write(json.dumps({"seq": seq, "row": row}) + "\n")
+            f.write('{"seq": 4, "row": ["torn')  # the process died mid-write
+        # Pretend seq 1 was committed before the crash
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO contacts (first_name, last_name, email, password) VALUES ('Crash', '1', 'crash1@example.com', 'hash')")
+        conn.execute("INSERT INTO contact_journal (journal, applied_seq) VALUES (?, 1)", (journal,))
+        conn.commit()
+        conn.close()
+        
+        contact_DAL.init_contact_db()
+        
+        emails = sorted(c['email'] for c in contact_DAL.list_contacts())
+        assert emails == ['crash1@example.com', 'crash2@example.com', 'crash3@example.com']
+        assert self._journals() == []
+        contact_DAL.init_contact_db()
+        assert contact_DAL.get_contact_count() == 3
@@ -9,6 +9,9 @@ import os
 import tempfile
 import DAL
 import contact_DAL
+import db_pool
+import migrations
+import storage
 
 
 class TestDatabaseConnection:
@@ -214,3 +217,153 @@ class TestContactsDatabase:
         contact_DAL.insert_contact("Jane", "Smith", "jane@example.com", "password456")
         
         assert contact_DAL.get_contact_count() == initial_count + 1
+
+
+class TestConnectionPool:
+    """Test pooled connection reuse"""
+    
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        DAL.init_db()
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        db_pool.close_all()
+        DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def test_connections_are_reused(self, monkeypatch):
+        """Test that repeated DAL calls do not open new connections"""
+        monkeypatch.setattr(DAL, 'CACHE_MAX_ENTRIES', 0)
+        DAL.list_projects()
+        before = DAL._get_pool().stats()
+        
+        for _ in range(10):
+            DAL.list_projects()
+        
+        after = DAL._get_pool().stats()
+        assert after['misses'] == before['misses']
+        assert after['hits'] == before['hits'] + 10
+    
+    def test_close_returns_connection_to_pool(self):
+        """Test that closing a checked-out connection keeps it open for reuse"""
+        conn = DAL.get_connection()
+        conn.close()
+        conn.close()  # a second close must not add it to the pool twice
+        
+        assert DAL._get_pool().stats()['idle'] == 1
+        assert DAL.get_connection() is conn
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    
+    def test_row_factory_is_reset_on_release(self, monkeypatch):
+        """Test that a pooled connection comes back with default settings"""
+        monkeypatch.setattr(DAL, 'CACHE_MAX_ENTRIES', 0)
+        DAL.list_projects()
+        conn = DAL.get_connection()
+        assert conn.row_factory is None
+        conn.close()
+    
+    def test_uncommitted_work_is_rolled_back_on_release(self):
+        """Test that a released connection does not leak an open transaction"""
+        conn = DAL.get_connection()
+        conn.execute(
+            "INSERT INTO projects (Title, Description, ImageFileName) VALUES ('x', 'y', 'z')"
+        )
+        conn.close()
+        
+        assert not any(p['Title'] == 'x' for p in DAL.list_projects())
+    
+    def test_app_teardown_returns_leaked_connections(self):
+        """Test that a request's unclosed connection goes back to the pool, but not one the caller held before"""
+        from app import create_app
+        app = create_app({'TESTING': True})
+        leaked = []
+        
+        @app.route('/leak')
+        def leak():
+            conn = DAL.get_connection()
+            leaked.append(conn)
+            return str(conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0])
+        
+        held = DAL.get_connection()
+        assert app.test_client().get('/leak').status_code == 200
+        
+        assert leaked[0] is not held
+        assert not leaked[0].checked_out
+        assert held.checked_out
+        held.close()
+        assert DAL._get_pool().stats()['idle'] == 2
+    
+    def test_resolved_path_is_cached(self):
+        """Test that the database path is only resolved once per filename"""
+        assert DAL._resolve_db_path() is DAL._resolve_db_path()
+        assert DAL.DB_FILENAME in DAL._resolved_paths
+
+
+class TestSharedStorage:
+    """Test serving projects and contacts from one attached connection"""
+    
+    def setup_method(self):
+        """Set up both test databases before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        DAL.init_db()
+        contact_DAL.init_contact_db()
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        db_pool.close_all()
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+    
+    def test_one_connection_serves_both_tables(self, monkeypatch):
+        """Test that projects and contacts calls share a pool and a connection"""
+        monkeypatch.setattr(storage, 'ATTACH', True)
+        monkeypatch.setattr(DAL, 'CACHE_MAX_ENTRIES', 0)
+        assert DAL._get_pool() is contact_DAL._get_pool()
+        
+        DAL.insert_project("Shared", "One connection", "sign.webp")
+        contact_DAL.insert_contact("Shared", "Pool", "shared@example.com", "secret")
+        DAL.list_projects()
+        contact_DAL.list_contacts()
+        
+        stats = DAL._get_pool().stats()
+        assert stats['misses'] == 1
+        assert stats['attached'] == [contact_DAL._resolve_db_path()]
+    
+    def test_each_file_keeps_its_own_tables_and_version(self, monkeypatch):
+        """Test that writes through the attached connection land in contacts.db"""
+        monkeypatch.setattr(storage, 'ATTACH', True)
+        contact_DAL.insert_contact("Attached", "Write", "attached@example.com", "secret")
+        
+        for path, table, steps in (
+            (DAL.DB_FILENAME, 'projects', DAL.MIGRATIONS),
+            (contact_DAL.DB_FILENAME, 'contacts', contact_DAL.MIGRATIONS),
+        ):
+            conn = sqlite3.connect(path)
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert table in tables
+            assert migrations.current_version(conn) == len(steps)
+            conn.close()
+        
+        conn = sqlite3.connect(DAL.DB_FILENAME)
+        assert 'contacts' not in {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        conn.close()
+        conn = sqlite3.connect(contact_DAL.DB_FILENAME)
+        assert conn.execute("SELECT email FROM contacts").fetchall() == [('attached@example.com',)]
+        conn.close()
+    
+    def test_separate_pools_without_attach(self, monkeypatch):
+        """Test that STORAGE_ATTACH=0 restores one pool per file"""
+        monkeypatch.setattr(storage, 'ATTACH', False)
+        assert DAL._get_pool() is not contact_DAL._get_pool()
+        assert DAL._get_pool().stats()['attached'] == []
+        contact_DAL.insert_contact("Separate", "Pool", "separate@example.com", "secret")
+        assert contact_DAL.get_contact_count() == 1
@@ -0,0 +1,103 @@
+"""
+Test script for the static image catalog.
+Tests header parsing, lookups and incremental and background refresh.
+"""
+
+import os
+import struct
+import tempfile
+import time
+import image_catalog
+
+
+def _png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def _gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 10
+
+
+def _jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\x03' + b'\x00' * 9
+    return b'\xff\xd8' + app0 + sof + b'\xff\xd9'
+
+
+class TestImageCatalog:
+    """Test ImageCatalog against a temporary image directory"""
+    
+    def setup_method(self):
+        """Create a directory with a few minimal images"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.write('a.png', _png(64, 32))
+        self.write('b.gif', _gif(10, 20))
+        self.write('c.jpeg', _jpeg(300, 200))
+        self.write('notes.txt', b'not an image')
+        self.catalog = image_catalog.ImageCatalog(self.temp_dir.name, refresh_interval=0)
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        self.temp_dir.cleanup()
+    
+    def write(self, name, data):
+        with open(os.path.join(self.temp_dir.name, name), 'wb') as f:
+            f.write(data)
+    
+    def test_metadata_is_recorded(self):
+        """Test size, dimensions, format and hash for each image"""
+        assert self.catalog.names() == ['a.png', 'b.gif', 'c.jpeg']
+        info = self.catalog.get('c.jpeg')
+        assert (info.format, info.width, info.height) == ('jpeg', 300, 200)
+        assert info.size == os.path.getsize(os.path.join(self.temp_dir.name, 'c.jpeg'))
+        assert len(info.sha256) == 64
+        assert (self.catalog.get('b.gif').width, self.catalog.get('b.gif').height) == (10, 20)
+    
+    def test_membership(self):
+        """Test validation lookups, including names that try to leave the directory"""
+        assert 'a.png' in self.catalog
+        for name in ['missing.png', 'notes.txt', '../a.png', '']:
+            assert name not in self.catalog
+    
+    def test_refresh_only_rereads_changed_files(self):
+        """Test that an unchanged file is not read again and a modified one is"""
+        reads = self.catalog.reads
+        self.catalog.refresh()
+        assert self.catalog.reads == reads
+        
+        self.write('a.png', _png(128, 64))
+        stat = os.stat(os.path.join(self.temp_dir.name, 'a.png'))
+        os.utime(os.path.join(self.temp_dir.name, 'a.png'), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.write('d.png', _png(1, 1))
+        os.remove(os.path.join(self.temp_dir.name, 'b.gif'))
+        self.catalog.refresh()
+        
+        assert self.catalog.reads == reads + 2
+        assert self.catalog.get('a.png').width == 128
+        assert 'd.png' in self.catalog
+        assert 'b.gif' not in self.catalog
+    
+    def test_lookups_refresh_at_most_every_interval(self):
+        """Test that lookups do not rescan within the refresh interval"""
+        catalog = image_catalog.ImageCatalog(self.temp_dir.name, refresh_interval=3600)
+        self.write('e.png', _png(2, 2))
+        assert 'e.png' not in catalog
+    
+    def test_lookup_refreshes_in_the_background(self):
+        """Test that a lookup past the interval answers from the current entries and rescans on a thread"""
+        catalog = image_catalog.ImageCatalog(self.temp_dir.name, refresh_interval=0.05)
+        self.write('e.png', _png(2, 2))
+        time.sleep(0.06)
+        catalog.get('a.png')
+        refresher = catalog._refresher
+        assert refresher is not None and refresher.daemon
+        refresher.join(5)
+        assert len(catalog) == 4
+        assert catalog.get('e.png').width == 2
+    
+    def test_repository_images_parse(self):
+        """Test that every shipped image has readable dimensions"""
+        images = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+        catalog = image_catalog.ImageCatalog(images)
+        assert len(catalog) == len([n for n in os.listdir(images) if not n.startswith('.')])
+        assert all(catalog.get(name).width > 0 for name in catalog.names())
@@ -0,0 +1,110 @@
+"""
+Test script for the HTTP load generator.
+Tests mix parsing, percentile reporting and a short run against a local server.
+"""
+
+import pytest
+import os
+import tempfile
+import threading
+
+from werkzeug.serving import make_server
+
+import DAL
+import contact_DAL
+import load_test
+from app import create_app
+
+
+class TestMixAndSummary:
+    """Test parsing of the route mix and the per-route summary"""
+
+    def test_parse_mix(self):
+        """Test weights, defaults and method normalisation"""
+        routes = load_test.parse_mix("GET /=4, get /projects, POST /contact=0.5")
+        assert routes == [
+            load_test.Route("GET", "/", 4.0),
+            load_test.Route("GET", "/projects", 1.0),
+            load_test.Route("POST", "/contact", 0.5),
+        ]
+
+    def test_parse_mix_rejects_unknown_posts(self):
+        """Test that a POST without known form data is refused"""
+        with pytest.raises(ValueError):
+            load_test.parse_mix("POST /projects/import=1")
+        with pytest.raises(ValueError):
+            load_test.parse_mix("DELETE /=1")
+        with pytest.raises(ValueError):
+            load_test.parse_mix("")
+
+    def test_summary_percentiles(self):
+        """Test per-route and overall percentiles, errors and rejections"""
+        results = load_test.Results()
+        for ms in range(1, 101):
+            results.add("GET /", ms / 1000, "ok")
+        results.add("GET /", 0, "error")
+        results.add("POST /contact", 0, "rejected")
+        summary = results.summary(elapsed=10)
+
+        route = summary["GET /"]
+        assert route["requests"] == 101
+        assert route["rps"] == 10.0
+        assert (route["p50"], route["p95"], route["p99"], route["max"]) == (51.0, 96.0, 100.0, 100.0)
+        assert route["errors"] == 1
+        assert summary["POST /contact"]["p50"] is None
+        assert summary["all"]["requests"] == 102
+        assert summary["all"]["rejected"] == 1
+
+
+class TestLoadRun:
+    """Test a short run against the app served on a local port"""
+
+    def setup_method(self):
+        """Serve the app from test databases on a free port"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        self.server = make_server("127.0.0.1", 0, create_app({'TESTING': True}), threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+
+    def test_closed_loop(self):
+        """Test that every route in the mix is exercised without errors"""
+        routes = load_test.parse_mix("GET /=1,GET /projects=1,POST /projects/new=1")
+        results, elapsed = load_test.run(self.url, routes, duration=0.5, concurrency=2, seed=1)
+        summary = results.summary(elapsed)
+        assert set(summary) == {"GET /", "GET /projects", "POST /projects/new", "all"}
+        assert summary["all"]["errors"] == 0
+        assert summary["all"]["rejected"] == 0
+        assert any(p["Title"].startswith("Load test project") for p in DAL.list_projects())
+
+    def test_rate_mode(self):
+        """Test that an open-loop run sends about rate * duration requests"""
+        routes = load_test.parse_mix("GET /about=1")
+        results, elapsed = load_test.run(self.url, routes, duration=1, concurrency=4, rate=20)
+        summary = results.summary(elapsed)
+        assert 15 <= summary["all"]["requests"] <= 21
+        assert summary["all"]["errors"] == 0
+
+    def test_rejected_post(self):
+        """Test that a form post redirected back to its form counts as rejected"""
+        load_test.FORMS["/projects/new"][0]["image_file_name"] = "missing.webp"
+        try:
+            routes = load_test.parse_mix("POST /projects/new=1")
+            results, elapsed = load_test.run(self.url, routes, duration=0.3, concurrency=1)
+        finally:
+            load_test.FORMS["/projects/new"][0]["image_file_name"] = "sign.webp"
+        summary = results.summary(elapsed)
+        assert summary["all"]["rejected"] == summary["all"]["requests"] > 0
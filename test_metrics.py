@@ -0,0 +1,134 @@
+"""
+Test script for request, template and database metrics.
+Tests the histogram and gauge text format, the Flask hooks and the /metrics endpoint.
+"""
+
+import pytest
+import os
+import tempfile
+
+import DAL
+import contact_DAL
+import metrics
+from app import create_app
+
+pytestmark = pytest.mark.skipif(not metrics.ENABLED, reason="METRICS_ENABLED=0")
+
+
+def _sample(text, line_prefix):
+    """Value of the first exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestExpositionFormat:
+    """Test the Prometheus text rendering of histograms and gauges"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts, sum and count for a few observations"""
+        histogram = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "home")
+        lines = histogram.render()
+
+        assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+        assert 'demo_seconds_bucket{route="home",le="0.1"} 1' in lines
+        assert 'demo_seconds_bucket{route="home",le="1.0"} 3' in lines
+        assert 'demo_seconds_bucket{route="home",le="+Inf"} 4' in lines
+        assert 'demo_seconds_sum{route="home"} 6.05' in lines
+        assert 'demo_seconds_count{route="home"} 4' in lines
+
+    def test_bucket_bound_is_inclusive(self):
+        """Test that a value equal to a bucket bound counts in that bucket"""
+        histogram = metrics.Histogram("edge_seconds", "Edge.", buckets=(0.1,))
+        histogram.observe(0.1)
+        assert 'edge_seconds_bucket{le="0.1"} 1' in histogram.render()
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes, backslashes and newlines cannot break a line"""
+        gauge = metrics.Gauge("demo_items", "Demo.", ("name",))
+        gauge.labels('a"b\\c\nd').inc(2)
+        assert 'demo_items{name="a\\"b\\\\c\\nd"} 2' in gauge.render()
+
+
+class TestRequestMetrics:
+    """Test the metrics recorded for requests to the Flask app"""
+
+    def setup_method(self):
+        """Set up test databases and an empty registry"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+
+        self.app = create_app({'TESTING': True, 'STREAM_PROJECTS': False})
+        self.client = self.app.test_client()
+        metrics.clear()
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+
+    def test_request_duration_recorded_per_endpoint(self):
+        """Test that a GET lands in the histogram under its endpoint, method and status"""
+        assert self.client.get('/projects').status_code == 200
+        assert self.client.get('/no-such-page').status_code == 404
+        text = metrics.render()
+
+        assert _sample(text, 'http_request_duration_seconds_count{endpoint="projects",method="GET",status="200"}') == 1
+        assert _sample(text, 'http_request_duration_seconds_count{endpoint="unmatched",method="GET",status="404"}') == 1
+
+    def test_in_flight_returns_to_zero(self):
+        """Test that the in-flight gauge is back to 0 after requests finish"""
+        self.client.get('/projects')
+        self.client.get('/about')
+        text = metrics.render()
+        assert _sample(text, 'http_requests_in_flight{endpoint="projects"}') == 0
+        assert _sample(text, 'http_requests_in_flight{endpoint="about"}') == 0
+
+    def test_template_render_timed(self):
+        """Test that rendering a page records its template"""
+        self.client.get('/projects')
+        text = metrics.render()
+        assert _sample(text, 'template_render_duration_seconds_count{template="projects.html"}') == 1
+
+    def test_dal_calls_timed(self):
+        """Test that DAL functions record their duration by qualified name"""
+        self.client.get('/projects')
+        DAL.list_projects()
+        DAL.list_projects()
+        text = metrics.render()
+        assert _sample(text, 'db_call_duration_seconds_count{function="DAL.list_projects"}') == 2
+        assert _sample(text, 'db_call_duration_seconds_count{function="DAL.get_projects_page"}') >= 1
+
+    def test_unhandled_exception_recorded_as_500(self):
+        """Test that a view raising an exception still counts as a finished request"""
+        @self.app.route('/boom')
+        def boom():
+            raise RuntimeError("boom")
+
+        self.app.config['PROPAGATE_EXCEPTIONS'] = False
+        assert self.client.get('/boom').status_code == 500
+        text = metrics.render()
+        assert _sample(text, 'http_request_duration_seconds_count{endpoint="boom",method="GET",status="500"}') == 1
+        assert _sample(text, 'http_requests_in_flight{endpoint="boom"}') == 0
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves the text format"""
+        self.client.get('/projects')
+        response = self.client.get('/metrics')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+        body = response.get_data(as_text=True)
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'endpoint="projects"' in body
+
+    def test_metrics_endpoint_can_be_disabled(self):
+        """Test that METRICS_ENDPOINT=False hides /metrics"""
+        app = create_app({'TESTING': True, 'METRICS_ENDPOINT': False})
+        assert app.test_client().get('/metrics').status_code == 404
@@ -0,0 +1,145 @@
+"""
+Test script for the schema migration subsystem.
+Tests versioning via PRAGMA user_version, the fast path, failure handling and the CLI.
+"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+import DAL
+import contact_DAL
+import db_pool
+import migrations
+
+
+class TestMigrate:
+    """Test migrations.migrate() against temporary databases"""
+    
+    def setup_method(self):
+        """Set up a temporary database path before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "test_migrations.db")
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        db_pool.close_all()
+        self.temp_dir.cleanup()
+    
+    def version(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return migrations.current_version(conn)
+        finally:
+            conn.close()
+    
+    def test_fresh_database_reaches_latest_version(self):
+        """Test that every migration is applied once, in order"""
+        applied = migrations.migrate(self.path, DAL.MIGRATIONS)
+        assert applied == list(range(1, len(DAL.MIGRATIONS) + 1))
+        assert self.version() == len(DAL.MIGRATIONS)
+        
+        conn = sqlite3.connect(self.path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        count = conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+        conn.close()
+        assert {'projects', 'projects_fts'} <= tables
+        assert count == 2
+    
+    def test_current_schema_skips_lock_and_ddl(self, monkeypatch):
+        """Test the fast path: no file lock and no migration when the version is current"""
+        migrations.migrate(self.path, DAL.MIGRATIONS)
+        
+        @contextmanager
+        def fail_lock(path):
+            raise AssertionError("file lock taken on the fast path")
+            yield
+        
+        monkeypatch.setattr(db_pool, 'file_lock', fail_lock)
+        assert migrations.migrate(self.path, DAL.MIGRATIONS) == []
+    
+    def test_unversioned_database_is_adopted(self):
+        """Test that a database created before versioning upgrades without reseeding"""
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, Title TEXT NOT NULL, "
+            "Description TEXT NOT NULL, ImageFileName TEXT NOT NULL, CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO projects (Title, Description, ImageFileName) VALUES ('Old', 'Kept', 'a.jpg')")
+        conn.commit()
+        conn.close()
+        
+        migrations.migrate(self.path, DAL.MIGRATIONS)
+        
+        conn = sqlite3.connect(self.path)
+        titles = [row[0] for row in conn.execute("SELECT Title FROM projects")]
+        matches = conn.execute("SELECT rowid FROM projects_fts WHERE projects_fts MATCH 'kept'").fetchall()
+        conn.close()
+        assert titles == ['Old']
+        assert len(matches) == 1
+    
+    def test_new_migration_applies_only_itself(self):
+        """Test that appending a migration upgrades an existing database by one version"""
+        steps = list(DAL.MIGRATIONS)
+        migrations.migrate(self.path, steps)
+        
+        @migrations.migration(steps, "add projects url column")
+        def add_url(conn):
+            conn.execute("ALTER TABLE projects ADD COLUMN Url TEXT")
+        
+        assert migrations.migrate(self.path, steps) == [len(steps)]
+        assert self.version() == len(steps)
+        conn = sqlite3.connect(self.path)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(projects)")]
+        conn.close()
+        assert 'Url' in columns
+    
+    def test_failed_migration_rolls_back(self):
+        """Test that a failing migration leaves the previous version and schema intact"""
+        steps = list(DAL.MIGRATIONS)
+        migrations.migrate(self.path, steps)
+        
+        @migrations.migration(steps, "half done")
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            conn.execute("SELECT * FROM no_such_table")
+        
+        with pytest.raises(migrations.MigrationError, match="half done"):
+            migrations.migrate(self.path, steps)
+        assert self.version() == len(DAL.MIGRATIONS)
+        conn = sqlite3.connect(self.path)
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+        conn.close()
+
+
+class TestMigrationsCli:
+    """Test the offline `python migrations.py` entry point"""
+    
+    def setup_method(self):
+        """Point both DALs at temporary databases before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        self.projects_db = os.path.join(self.temp_dir.name, "cli_projects.db")
+        self.contacts_db = os.path.join(self.temp_dir.name, "cli_contacts.db")
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+    
+    def test_status_and_upgrade(self, capsys):
+        """Test that status reports pending versions and upgrade applies them"""
+        args = ['--projects-db', self.projects_db, '--contacts-db', self.contacts_db]
+        assert migrations.main(['status'] + args) == 0
+        assert f"projects: version 0 of {len(DAL.MIGRATIONS)}" in capsys.readouterr().out
+        assert not os.path.exists(self.projects_db)
+        
+        assert migrations.main(['upgrade'] + args) == 0
+        assert migrations.main(['status'] + args) == 0
+        out = capsys.readouterr().out
+        assert f"projects: version {len(DAL.MIGRATIONS)} of {len(DAL.MIGRATIONS)}" in out
+        assert f"contacts: version {len(contact_DAL.MIGRATIONS)} of {len(contact_DAL.MIGRATIONS)}" in out
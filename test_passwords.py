@@ -0,0 +1,110 @@
+"""
+Test script for password hashing and the bounded hashing pool.
+Tests hash/verify round trips, tunable cost and queue rejection.
+"""
+
+import pytest
+import threading
+import time
+import passwords
+
+
+class TestPasswordHashing:
+    """Test hash_password and verify_password"""
+    
+    def test_round_trip(self):
+        """Test that a hash verifies against its password only"""
+        encoded = passwords.hash_password("correct horse")
+        assert passwords.is_hashed(encoded)
+        assert "correct horse" not in encoded
+        assert passwords.verify_password("correct horse", encoded)
+        assert not passwords.verify_password("wrong horse", encoded)
+    
+    def test_salts_differ(self):
+        """Test that hashing the same password twice gives different hashes"""
+        assert passwords.hash_password("same") != passwords.hash_password("same")
+    
+    def test_cost_is_stored_in_hash(self):
+        """Test that a hash made at one cost verifies after the default changes"""
+        encoded = passwords.hash_password("secret", iterations=1234)
+        assert encoded.split("$")[1] == "1234"
+        assert passwords.verify_password("secret", encoded)
+    
+    def test_malformed_hash_does_not_verify(self):
+        """Test that plaintext or garbage stored values are rejected"""
+        for value in ["secret", "", None, "md5$1$x$y", "pbkdf2_sha256$abc$x$y",
+                      "pbkdf2_sha256$0$YWJj$YWJj", "pbkdf2_sha256$-5$YWJj$YWJj", "pbkdf2_sha256$1$a$YWJj",
+                      "pbkdf2_sha256$1$YWJj$a", "pbkdf2_sha256$99999999999999999999999$YWJj$YWJj"]:
+            assert not passwords.verify_password("secret", value)
+
+
+class TestHashingPool:
+    """Test the worker pool in front of the hashing functions"""
+    
+    def setup_method(self):
+        self.pool = passwords.HashingPool(workers=2, max_queue=4, iterations=1000)
+    
+    def teardown_method(self):
+        self.pool.close()
+    
+    def test_hash_and_verify(self):
+        """Test the blocking helpers"""
+        encoded = self.pool.hash("pool password")
+        assert self.pool.verify("pool password", encoded)
+        assert not self.pool.verify("other", encoded)
+        assert self.pool.stats()['completed'] == 3
+    
+    def test_full_queue_rejects(self):
+        """Test that work beyond the queue limit is rejected, not queued"""
+        release = threading.Event()
+        pool = passwords.HashingPool(workers=1, max_queue=1)
+        try:
+            blocker = pool._submit(release.wait)
+            # Wait until the worker has taken the blocker off the queue
+            while pool.stats()['queued']:
+                time.sleep(0.001)
+            queued = pool.submit_hash("queued")
+            with pytest.raises(passwords.HashingPoolFull):
+                pool.submit_hash("rejected")
+            assert pool.stats()['rejected'] == 1
+            release.set()
+            assert blocker.result(5)
+            assert passwords.verify_password("queued", queued.result(5))
+        finally:
+            release.set()
+            pool.close()
+
+    def test_wait_idle(self):
+        """Test that wait_idle returns once queued jobs and their callbacks have run"""
+        release = threading.Event()
+        stored = []
+        pool = passwords.HashingPool(workers=1, max_queue=4)
+        try:
+            pool._submit(release.wait)
+            pool.submit_hash("later").add_done_callback(lambda f: stored.append(f.result()))
+            assert not pool.wait_idle(0.01)
+            release.set()
+            assert pool.wait_idle(5)
+            assert passwords.verify_password("later", stored[0])
+        finally:
+            release.set()
+            pool.close()
+    
+    def test_timeout_cancels_queued_job(self):
+        """Test that a hash still queued when the wait runs out raises HashingTimeout and is skipped"""
+        release = threading.Event()
+        pool = passwords.HashingPool(workers=1, max_queue=2)
+        try:
+            blocker = pool._submit(release.wait)
+            with pytest.raises(passwords.HashingTimeout):
+                pool.hash("too slow", timeout=0.01)
+            slow = pool.submit_hash("also too slow")
+            with pytest.raises(passwords.HashingTimeout):
+                pool._wait(slow, 0.01)
+            assert slow.cancelled()
+            release.set()
+            assert blocker.result(5)
+            assert passwords.verify_password("later", pool.hash("later", timeout=5))
+        finally:
+            release.set()
+            pool.close()
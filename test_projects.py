@@ -7,6 +7,7 @@ import pytest
 import os
 import tempfile
 import DAL
+import project_import
 
 
 class TestProjectOperations:
@@ -175,3 +176,258 @@ class TestProjectOperations:
         # Note: This test assumes seed data exists, so we check it's not empty
         # In a real scenario, you might want to test with a truly empty database
         assert len(projects) >= 0
+
+
+class TestProjectPagination:
+    """Test keyset pagination of the projects listing"""
+    
+    def setup_method(self):
+        """Set up a database with enough projects for several pages"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        DAL.init_db()
+        for i in range(23):
+            DAL.insert_project(f"Paged Project {i}", "Description", "image.jpg")
+        self.all_ids = [p['id'] for p in DAL.list_projects()]
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def test_list_projects_limit_and_after(self):
+        """Test that after_id and limit select a keyset range"""
+        page = DAL.list_projects(after_id=self.all_ids[4], limit=3)
+        assert [p['id'] for p in page] == self.all_ids[5:8]
+    
+    def test_list_projects_before(self):
+        """Test that before_id returns the preceding rows in ascending order"""
+        page = DAL.list_projects(before_id=self.all_ids[10], limit=3)
+        assert [p['id'] for p in page] == self.all_ids[7:10]
+    
+    def test_first_page_has_only_next(self):
+        """Test the first page cursors"""
+        page = DAL.get_projects_page(page_size=10)
+        assert [p['id'] for p in page['projects']] == self.all_ids[:10]
+        assert page['next_after'] == self.all_ids[9]
+        assert page['prev_before'] is None
+    
+    def test_walk_forward_and_back(self):
+        """Test that following the cursors visits every project once and returns"""
+        seen = []
+        pages = []
+        page = DAL.get_projects_page(page_size=10)
+        while True:
+            pages.append(page)
+            seen.extend(p['id'] for p in page['projects'])
+            if page['next_after'] is None:
+                break
+            page = DAL.get_projects_page(after_id=page['next_after'], page_size=10)
+        assert seen == self.all_ids
+        assert len(pages) == 3
+        
+        previous = DAL.get_projects_page(before_id=pages[-1]['prev_before'], page_size=10)
+        assert previous['projects'] == pages[-2]['projects']
+        assert previous['next_after'] == pages[-2]['next_after']
+        assert previous['prev_before'] == pages[-2]['prev_before']
+    
+    def test_page_past_the_end_is_empty(self):
+        """Test a cursor beyond the last project"""
+        page = DAL.get_projects_page(after_id=self.all_ids[-1])
+        assert page['projects'] == []
+        assert page['next_after'] is None
+        assert page['prev_before'] is None
+    
+    def test_iter_projects_is_lazy(self):
+        """Test that iter_projects yields rows from a generator"""
+        rows = DAL.iter_projects(after_id=self.all_ids[2], limit=4)
+        assert not isinstance(rows, list)
+        assert [p['id'] for p in rows] == self.all_ids[3:7]
+    
+    def test_project_stream_matches_page(self):
+        """Test that a streamed page yields the same rows and cursors as a buffered one"""
+        for after_id in (None, self.all_ids[9], self.all_ids[19]):
+            expected = DAL.get_projects_page(after_id=after_id, page_size=10)
+            stream = DAL.ProjectStream(after_id=after_id, page_size=10)
+            assert list(stream) == expected['projects']
+            assert bool(stream) == bool(expected['projects'])
+            assert stream.next_after == expected['next_after']
+            assert stream.prev_before == expected['prev_before']
+
+
+class TestProjectSearch:
+    """Test full-text search over projects"""
+    
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        DAL.init_db()
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def test_seed_projects_are_indexed(self):
+        """Test that rows inserted during init are searchable"""
+        results = DAL.search_projects("banking")
+        assert [p['Title'] for p in results['projects']] == ["Decentro Vault: Decentralized Banking System"]
+    
+    def test_inserted_projects_are_indexed(self):
+        """Test that the trigger indexes new projects"""
+        DAL.insert_project("Compiler Toolkit", "An optimizing compiler", "image.jpg")
+        results = DAL.search_projects("optimizing")
+        assert [p['Title'] for p in results['projects']] == ["Compiler Toolkit"]
+    
+    def test_title_matches_rank_first(self):
+        """Test bm25 ordering with title weighting"""
+        DAL.insert_project("Gardening notes", "Notes on robotics for plants", "a.jpg")
+        DAL.insert_project("Robotics Arm", "A six axis arm", "b.jpg")
+        results = DAL.search_projects("robotics")
+        assert [p['Title'] for p in results['projects']] == ["Robotics Arm", "Gardening notes"]
+    
+    def test_all_words_must_match_and_last_is_prefix(self):
+        """Test AND semantics and prefix matching of the final word"""
+        DAL.insert_project("Weather Station", "Solar powered sensors", "a.jpg")
+        DAL.insert_project("Solar Car", "Racing prototype", "b.jpg")
+        assert [p['Title'] for p in DAL.search_projects("solar sens")['projects']] == ["Weather Station"]
+    
+    def test_search_syntax_is_escaped(self):
+        """Test that FTS operators and quotes in user input do not raise"""
+        for query in ['"unterminated', 'title: OR AND', 'NEAR(a b)', '*', '-x']:
+            assert isinstance(DAL.search_projects(query)['projects'], list)
+    
+    def test_control_characters_and_huge_pages(self):
+        """Test that NUL bytes in the query and absurd page numbers do not raise"""
+        DAL.insert_project("Null Safe", "Control characters", "n.jpg")
+        assert [p['Title'] for p in DAL.search_projects("null\x00safe")['projects']] == ["Null Safe"]
+        results = DAL.search_projects("null", page=10 ** 23)
+        assert results['projects'] == []
+        assert results['has_next'] is False
+    
+    def test_malformed_page_arguments(self):
+        """Test that a bad page number means page 1 and a bad page_size raises"""
+        DAL.insert_project("Paged", "Search paging", "p.jpg")
+        for page in ["abc", None, ""]:
+            results = DAL.search_projects("paged", page=page)
+            assert results['page'] == 1
+            assert [p['Title'] for p in results['projects']] == ["Paged"]
+        for page_size in [0, -1, "10", True]:
+            with pytest.raises(ValueError, match="page_size"):
+                DAL.search_projects("paged", page_size=page_size)
+    
+    def test_empty_query_returns_nothing(self):
+        """Test that a blank query does not match everything"""
+        results = DAL.search_projects("   ")
+        assert results['projects'] == []
+        assert results['has_next'] is False
+    
+    def test_search_pagination(self):
+        """Test that result pages do not overlap"""
+        for i in range(5):
+            DAL.insert_project(f"Quantum project {i}", "Qubits", "q.jpg")
+        first = DAL.search_projects("quantum", page=1, page_size=3)
+        second = DAL.search_projects("quantum", page=2, page_size=3)
+        
+        assert first['has_next'] is True
+        assert second['has_next'] is False
+        ids = [p['id'] for p in first['projects'] + second['projects']]
+        assert len(ids) == len(set(ids)) == 5
+
+
+class TestBulkImport:
+    """Test DAL.insert_projects_bulk and the project_import parsers"""
+    
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        DAL.init_db()
+        self.initial_count = len(DAL.list_projects())
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+    
+    def test_bulk_insert_across_chunks(self):
+        """Test that every valid row is inserted when spanning several chunks"""
+        records = [(f"Bulk {i}", "Description", "image.jpg") for i in range(25)]
+        report = DAL.insert_projects_bulk(records, chunk_size=10)
+        
+        assert report == {"inserted": 25, "errors": []}
+        assert len(DAL.list_projects()) == self.initial_count + 25
+    
+    def test_invalid_rows_are_reported_not_fatal(self):
+        """Test that bad rows are skipped with their 1-based row number"""
+        records = [
+            ("Good", "Description", "image.jpg"),
+            ("", "Missing title", "image.jpg"),
+            ValueError("Invalid JSON"),
+            ("Also good", "Description", "image.jpg"),
+        ]
+        report = DAL.insert_projects_bulk(records + [(5, "Numeric title", "image.jpg")])
+        
+        assert report['inserted'] == 2
+        assert report['errors'][-1] == (5, "Project fields must be text")
+        assert [row for row, _ in report['errors']] == [2, 3, 5]
+        assert "required" in report['errors'][0][1]
+        titles = [p['Title'] for p in DAL.list_projects()]
+        assert "Good" in titles and "Also good" in titles
+    
+    def test_known_image_check(self):
+        """Test that rows whose image the check rejects are reported and skipped"""
+        records = [("Known", "d", "sign.webp"), ("Unknown", "d", "../secret.jpg")]
+        report = DAL.insert_projects_bulk(records, known_image={"sign.webp"}.__contains__)
+        
+        assert report['inserted'] == 1
+        assert report['errors'] == [(2, 'Image "../secret.jpg" was not found in static/images')]
+    
+    def test_bulk_insert_invalidates_cache(self):
+        """Test that imported rows show up in cached listings"""
+        DAL.list_projects()
+        DAL.insert_projects_bulk([("Imported", "Description", "image.jpg")])
+        assert any(p['Title'] == "Imported" for p in DAL.list_projects())
+    
+    def test_csv_and_jsonl_parsing(self):
+        """Test both formats and both field-name spellings"""
+        csv_lines = [
+            "Title,Description,ImageFileName\n",
+            'CSV One,"Multi-line\ndescription",one.jpg\n',
+        ]
+        jsonl_lines = [
+            '{"title": "JSON One", "description": "d", "image_file_name": "two.jpg"}\n',
+            'not json\n',
+            '[1, 2]\n',
+        ]
+        assert list(project_import.iter_records(csv_lines, "csv")) == [
+            ("CSV One", "Multi-line\ndescription", "one.jpg")
+        ]
+        parsed = list(project_import.iter_records(jsonl_lines, "jsonl"))
+        assert parsed[0] == ("JSON One", "d", "two.jpg")
+        assert all(isinstance(item, ValueError) for item in parsed[1:])
+    
+    def test_parse_errors_end_the_rows(self):
+        """Test that CSV and decode errors become a final UnreadableFile row, not an exception"""
+        lines = ['title,description,image_file_name\n', 'One,d,one.jpg\n', 'Two,' + 'x' * 200000 + ',two.jpg\n']
+        parsed = list(project_import.iter_records(lines, "csv"))
+        assert parsed[0] == ("One", "d", "one.jpg")
+        assert isinstance(parsed[1], project_import.UnreadableFile)
+        assert "field larger than field limit" in str(parsed[1])
+        
+        binary = [b'{"title": "A", "description": "d", "image_file_name": "a.jpg"}\n', b'\xff\n']
+        parsed = list(project_import.iter_records(project_import.decode_lines(binary), "jsonl"))
+        assert parsed[0] == ("A", "d", "a.jpg")
+        assert isinstance(parsed[1], project_import.UnreadableFile)
+        assert len(parsed) == 2
+    
+    def test_detect_format(self):
+        """Test format detection from file names and MIME types"""
+        assert project_import.detect_format("projects.CSV") == "csv"
+        assert project_import.detect_format("projects.ndjson") == "jsonl"
+        assert project_import.detect_format(None, "text/csv; charset=utf-8") == "csv"
+        assert project_import.detect_format("projects.txt") is None
@@ -0,0 +1,101 @@
+"""
+Test script for the read-through project listing cache.
+Tests cache hits, local and cross-connection invalidation, and bounds.
+"""
+
+import os
+import sqlite3
+import tempfile
+import DAL
+import query_cache
+
+
+class TestLRUCache:
+    """Test the bounded LRU mapping"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched key is evicted first"""
+        cache = query_cache.LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1  # 'b' is now least recently used
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+
+class TestProjectListingCache:
+    """Test caching in front of DAL.list_projects"""
+
+    def setup_method(self):
+        """Set up test database before each test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_filename = DAL.DB_FILENAME
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        DAL.init_db()
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        query_cache.clear_all()
+        DAL.DB_FILENAME = self.original_filename
+        self.temp_dir.cleanup()
+
+    def test_repeated_listing_is_served_from_cache(self):
+        """Test that the second identical listing is a cache hit"""
+        first = DAL.list_projects()
+        second = DAL.list_projects()
+
+        assert first == second
+        stats = DAL.cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['hit_ratio'] == 0.5
+
+    def test_cached_list_is_not_shared(self):
+        """Test that callers cannot corrupt the cached list"""
+        DAL.list_projects().clear()
+        assert len(DAL.list_projects()) >= 2
+
+    def test_insert_invalidates_cache(self):
+        """Test that a write in this process is visible immediately"""
+        DAL.list_projects()
+        DAL.insert_project("Fresh Project", "Description", "image.jpg")
+
+        assert any(p['Title'] == "Fresh Project" for p in DAL.list_projects())
+        assert DAL.cache_stats()['local_invalidations'] == 1
+        # The DAL's own commit moves data_version but is not another writer
+        assert DAL.cache_stats()['remote_invalidations'] == 0
+        hits = DAL.cache_stats()['hits']
+        DAL.list_projects()
+        assert DAL.cache_stats()['hits'] == hits + 1
+
+    def test_write_from_other_connection_invalidates_cache(self):
+        """Test that a commit made outside the DAL (e.g. another worker) is detected"""
+        DAL.list_projects()
+
+        other = sqlite3.connect(DAL.DB_FILENAME)
+        other.execute(
+            "INSERT INTO projects (Title, Description, ImageFileName) VALUES ('Remote', 'Written elsewhere', 'r.jpg')"
+        )
+        other.commit()
+        other.close()
+
+        assert any(p['Title'] == "Remote" for p in DAL.list_projects())
+        assert DAL.cache_stats()['remote_invalidations'] == 1
+
+    def test_pages_are_cached(self):
+        """Test that get_projects_page is served from the cache"""
+        DAL.get_projects_page()
+        before = DAL.cache_stats()['hits']
+        DAL.get_projects_page()
+        assert DAL.cache_stats()['hits'] == before + 1
+
+    def test_cache_can_be_disabled(self, monkeypatch):
+        """Test that CACHE_MAX_ENTRIES = 0 bypasses the cache"""
+        monkeypatch.setattr(DAL, 'CACHE_MAX_ENTRIES', 0)
+        DAL.list_projects()
+        DAL.list_projects()
+        assert DAL.cache_stats()['hits'] == 0
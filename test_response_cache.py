@@ -0,0 +1,155 @@
+"""
+Test script for the full-response cache used by the static routes.
+Tests hits, template-change and asset-rebuild invalidation, flash bypass and both backends.
+"""
+
+import os
+import tempfile
+from flask import Flask, flash, render_template
+import assets
+import response_cache
+
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+class TestResponseCache:
+    """Test the @cached decorator against a throwaway app"""
+
+    def setup_method(self):
+        """Create an app whose templates can be edited by the test"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        templates = os.path.join(self.temp_dir.name, 'templates')
+        os.makedirs(templates)
+        self.page_template = os.path.join(templates, 'page.html')
+        _write(os.path.join(templates, 'base.html'),
+               '{% for m in get_flashed_messages() %}[{{ m }}]{% endfor %}{% block content %}{% endblock %}')
+        _write(self.page_template, '{% extends "base.html" %}{% block content %}version one{% endblock %}')
+
+        self.renders = 0
+        app = Flask(__name__, root_path=self.temp_dir.name)
+        app.secret_key = 'test'
+        app.config['TESTING'] = True
+
+        @app.route('/page')
+        @response_cache.cached('page.html', params=('x',), vary=('Accept-Language',))
+        def page():
+            self.renders += 1
+            return render_template('page.html')
+
+        @app.route('/flash')
+        def set_flash():
+            flash('hello')
+            return 'ok'
+
+        self.app = app
+        self.client = app.test_client()
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        self.temp_dir.cleanup()
+
+    def test_second_request_is_served_from_cache(self):
+        """Test that the view only renders once"""
+        first = self.client.get('/page')
+        second = self.client.get('/page')
+
+        assert first.data == second.data == b'version one'
+        assert self.renders == 1
+        stats = response_cache.get_state(self.app).stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_query_string_and_vary_headers_are_part_of_the_key(self):
+        """Test that listed query parameters and varied headers are cached separately"""
+        self.client.get('/page')
+        self.client.get('/page?x=1')
+        self.client.get('/page', headers={'Accept-Language': 'fr'})
+        self.client.get('/page', headers={'Accept-Language': 'fr'})
+        assert self.renders == 3
+    
+    def test_unlisted_query_parameters_share_an_entry(self):
+        """Test that parameters the view does not read cannot create new entries"""
+        for i in range(5):
+            self.client.get(f'/page?junk={i}')
+        self.client.get('/page?x=1&junk=9')
+        self.client.get('/page?junk=9&x=1')
+        assert self.renders == 2
+
+    def test_template_change_invalidates(self, monkeypatch):
+        """Test that editing a template is picked up"""
+        monkeypatch.setattr(response_cache, 'MTIME_CHECK_INTERVAL', 0)
+        self.app.config['TEMPLATES_AUTO_RELOAD'] = True  # so Jinja itself re-reads the file
+        self.client.get('/page')
+
+        _write(self.page_template, '{% extends "base.html" %}{% block content %}version two{% endblock %}')
+        stat = os.stat(self.page_template)
+        os.utime(self.page_template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert self.client.get('/page').data == b'version two'
+        assert self.renders == 2
+
+    def test_pending_flash_bypasses_cache(self):
+        """Test that flashed messages are rendered, not replayed from the cache"""
+        self.client.get('/page')
+        self.client.get('/flash')
+
+        assert self.client.get('/page').data == b'[hello]version one'
+        assert self.client.get('/page').data == b'version one'
+        assert response_cache.get_state(self.app).stats()['bypasses'] == 1
+
+    def test_disk_backend(self):
+        """Test that the disk backend stores and replays responses"""
+        self.app.config['RESPONSE_CACHE_BACKEND'] = 'disk'
+        self.app.config['RESPONSE_CACHE_DIR'] = os.path.join(self.temp_dir.name, 'cache')
+
+        first = self.client.get('/page')
+        second = self.client.get('/page')
+
+        assert second.data == first.data
+        assert second.headers['Content-Type'] == first.headers['Content-Type']
+        assert self.renders == 1
+        assert len(os.listdir(self.app.config['RESPONSE_CACHE_DIR'])) == 1
+
+    def test_disk_backend_is_bounded(self):
+        """Test that the disk backend keeps at most RESPONSE_CACHE_MAX_ENTRIES files, dropping the oldest"""
+        cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.app.config.update(RESPONSE_CACHE_BACKEND='disk', RESPONSE_CACHE_DIR=cache_dir,
+                               RESPONSE_CACHE_MAX_ENTRIES=3)
+        for i in range(6):
+            self.client.get(f'/page?x={i}')
+        assert len(os.listdir(cache_dir)) == 3
+        
+        self.client.get('/page?x=5')
+        assert self.renders == 6
+        self.client.get('/page?x=0')
+        assert self.renders == 7
+    
+    def test_asset_rebuild_invalidates_disk_cache(self):
+        """Test that a disk cache surviving a deploy is not replayed once the asset URLs change"""
+        cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.app.config['RESPONSE_CACHE_BACKEND'] = 'disk'
+        self.app.config['RESPONSE_CACHE_DIR'] = cache_dir
+        self.app.extensions['assets'] = assets.Assets(
+            {'files': {'app.css': {'path': 'app.111111111111.css', 'encodings': {}}}}, cache_dir)
+        self.client.get('/page')
+        self.client.get('/page')
+        assert self.renders == 1
+
+        # The next deploy starts with a fresh in-memory state but the same cache directory
+        del self.app.extensions['response_cache']
+        self.app.extensions['assets'] = assets.Assets(
+            {'files': {'app.css': {'path': 'app.222222222222.css', 'encodings': {}}}}, cache_dir)
+        self.client.get('/page')
+        assert self.renders == 2
+        self.client.get('/page')
+        assert self.renders == 2
+
+    def test_cache_can_be_disabled(self):
+        """Test that an empty backend setting renders every time"""
+        self.app.config['RESPONSE_CACHE_BACKEND'] = ''
+        self.client.get('/page')
+        self.client.get('/page')
+        assert self.renders == 2
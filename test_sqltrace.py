@@ -0,0 +1,106 @@
+"""
+Test script for SQL tracing and the slow-query log.
+Tests statement records, row counts, callers, EXPLAIN QUERY PLAN capture and the log file.
+"""
+
+import os
+import tempfile
+
+import DAL
+import contact_DAL
+import db_pool
+import sqltrace
+
+
+class TestSqlTrace:
+    """Test tracing on the pooled DAL connections"""
+
+    def setup_method(self):
+        """Set up test databases with tracing on"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_projects = DAL.DB_FILENAME
+        self.original_contacts = contact_DAL.DB_FILENAME
+        self.original_settings = (sqltrace.ENABLED, sqltrace.SLOW_MS, sqltrace.SLOW_LOG)
+        DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_projects.db")
+        contact_DAL.DB_FILENAME = os.path.join(self.temp_dir.name, "test_contacts.db")
+        self.slow_log = os.path.join(self.temp_dir.name, "slow.log")
+        sqltrace.configure(enabled=True, slow_ms=10000, slow_log=self.slow_log)
+        DAL.init_db()
+        contact_DAL.init_contact_db()
+        sqltrace.clear()
+
+    def teardown_method(self):
+        """Clean up after each test"""
+        enabled, slow_ms, slow_log = self.original_settings
+        sqltrace.configure(enabled=enabled, slow_ms=slow_ms, slow_log=slow_log or "")
+        sqltrace.clear()
+        DAL.DB_FILENAME = self.original_projects
+        contact_DAL.DB_FILENAME = self.original_contacts
+        self.temp_dir.cleanup()
+
+    def _records(self, caller):
+        return [r for r in sqltrace.records() if r.caller == caller]
+
+    def test_select_recorded_with_rows_and_caller(self):
+        """Test that a listing query records its text, row count and calling function"""
+        count = len(DAL.list_projects())
+        statements = [r for r in sqltrace.records() if r.sql.lstrip().startswith("SELECT")]
+        assert len(statements) == 1
+        statement = statements[0]
+        assert "FROM projects" in statement.sql
+        assert statement.rows == count
+        assert statement.caller.startswith("DAL.")
+        assert statement.duration > 0
+        assert statement.plan is None
+
+    def test_write_records_rowcount_and_commit(self):
+        """Test that an insert records one affected row, bound parameters and its commit"""
+        DAL.insert_project("Traced", "Insert", "sign.webp")
+        statements = self._records("DAL.insert_project")
+        insert = next(r for r in statements if r.sql.startswith("INSERT"))
+        assert insert.rows == 1
+        assert insert.params == ("Traced", "Insert", "sign.webp")
+        assert any("'Traced'" in line for line in insert.expanded)
+        assert any(r.sql == "COMMIT" for r in statements)
+
+    def test_partly_read_cursor_recorded_on_release(self):
+        """Test that a statement whose rows were not all read is recorded when the connection goes back"""
+        with DAL._get_pool().connection() as conn:
+            conn.execute("SELECT id FROM projects").fetchone()
+            assert not sqltrace.records()
+        (statement,) = sqltrace.records()
+        assert statement.rows == 1
+
+    def test_slow_query_logged_with_plan(self):
+        """Test that statements over the threshold get EXPLAIN QUERY PLAN and a log entry"""
+        sqltrace.configure(slow_ms=0)
+        contact_DAL.list_contacts_page(email="someone@example.com")
+        (statement,) = self._records("contact_DAL.list_contacts_page")
+        assert any("idx_contacts_email" in line for line in statement.plan)
+
+        with open(self.slow_log, encoding="utf-8") as f:
+            log = f.read()
+        assert "slow query" in log
+        assert "contact_DAL.list_contacts_page" in log
+        assert "plan: SEARCH contacts USING INDEX idx_contacts_email" in log
+
+    def test_explain_reports_scans(self):
+        """Test that a query without a usable index shows up as a scan"""
+        with DAL._get_pool().connection() as conn:
+            plan = sqltrace.explain(conn, "SELECT * FROM projects WHERE Title = ?", ("x",))
+            assert plan == ["SCAN projects"]
+            assert sqltrace.explain(conn, "PRAGMA user_version") == []
+
+    def test_connection_setup_not_traced(self):
+        """Test that the pool's pragmas are not reported as the caller's statements"""
+        db_pool.close_all()
+        DAL.list_projects()
+        assert not any(r.sql.startswith("PRAGMA") for r in sqltrace.records())
+
+    def test_disabled_uses_plain_connections(self):
+        """Test that with tracing off the pool hands out untraced connections"""
+        sqltrace.configure(enabled=False)
+        with DAL._get_pool().connection() as conn:
+            assert not isinstance(conn, sqltrace.TracingConnection)
+            conn.execute("SELECT 1").fetchall()
+        assert not sqltrace.records()
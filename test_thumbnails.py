@@ -0,0 +1,83 @@
+"""
+Test script for the responsive-image pipeline.
+Tests variant generation, content-hash naming, regeneration and lazy lookups.
+"""
+
+import pytest
+import os
+import tempfile
+
+Image = pytest.importorskip("PIL.Image")
+
+import thumbnails
+
+
+class TestThumbnailCache:
+    """Test ThumbnailCache against generated source images"""
+    
+    def setup_method(self):
+        """Create a source directory with a couple of images"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, 'images')
+        self.cache_dir = os.path.join(self.temp_dir.name, 'thumbs')
+        os.makedirs(self.source_dir)
+        Image.new('RGB', (400, 300), 'red').save(os.path.join(self.source_dir, 'photo.jpeg'))
+        Image.new('RGBA', (100, 50), (0, 0, 255, 128)).save(os.path.join(self.source_dir, 'small.webp'))
+        self.cache = thumbnails.ThumbnailCache(self.source_dir, self.cache_dir)
+    
+    def teardown_method(self):
+        """Clean up after each test"""
+        self.cache.close()
+        self.temp_dir.cleanup()
+    
+    def test_build_creates_each_width_and_format(self):
+        """Test that every configured width smaller than the source is produced"""
+        info = self.cache.build('photo.jpeg')
+        
+        assert (info['width'], info['height']) == (400, 300)
+        assert [w for _, w in info['variants']['webp']] == [80, 160, 320]
+        for name, w in info['variants']['jpeg']:
+            with Image.open(os.path.join(self.cache_dir, name)) as variant:
+                assert variant.format == 'JPEG'
+                assert variant.size == (w, w * 3 // 4)
+    
+    def test_small_images_are_not_upscaled(self):
+        """Test that a narrow source is offered at its own width, never upscaled"""
+        info = self.cache.build('small.webp')
+        assert [w for _, w in info['variants']['jpeg']] == [80, 100]
+        assert [w for _, w in info['variants']['webp']] == [80, 100]
+    
+    def test_unchanged_source_is_not_regenerated(self):
+        """Test that the content-hash names let a second build skip work"""
+        self.cache.build('photo.jpeg')
+        generated = self.cache.generated
+        fresh = thumbnails.ThumbnailCache(self.source_dir, self.cache_dir)
+        try:
+            fresh.build('photo.jpeg')
+            assert fresh.generated == 0
+        finally:
+            fresh.close()
+        assert generated == 6
+    
+    def test_changed_source_replaces_variants(self):
+        """Test that editing an image produces new names and removes the old files"""
+        old = {name for name, _ in self.cache.build('photo.jpeg')['variants']['webp']}
+        Image.new('RGB', (400, 300), 'green').save(os.path.join(self.source_dir, 'photo.jpeg'))
+        new = {name for name, _ in self.cache.build('photo.jpeg')['variants']['webp']}
+        
+        assert old.isdisjoint(new)
+        assert not any(name in os.listdir(self.cache_dir) for name in old)
+    
+    def test_lookup_is_lazy(self):
+        """Test that the first lookup queues work and returns None instead of blocking"""
+        assert self.cache.lookup('photo.jpeg') is None
+        self.cache.wait()
+        info = self.cache.lookup('photo.jpeg')
+        assert info is not None and info['width'] == 400
+    
+    def test_lookup_rejects_unknown_and_unsafe_names(self):
+        """Test that missing files, other extensions and paths are ignored"""
+        for name in ['missing.jpeg', '../photo.jpeg', 'notes.txt', '', None]:
+            assert self.cache.lookup(name) is None
+        self.cache.wait()
+        assert self.cache.stats()['indexed'] == 0
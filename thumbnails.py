@@ -0,0 +1,172 @@
+"""
+Resized WebP/JPEG variants of the images in static/images.
+
+Variants are written to a cache directory under content-hashed names
+(<stem>-<hash>-<width>.<ext>), so they only need regenerating when the
+source bytes change, and can be served as immutable. Requests never resize
+anything themselves: ThumbnailCache.lookup() answers from memory and, on a
+miss, queues the work on a single background thread and returns None so the
+page falls back to the original image for that render. `flask thumbnails`
+builds every variant ahead of time.
+
+Pillow is optional; without it lookup() always returns None. It is imported by
+the first build, not at start-up.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+# Widths cover the 60px/80px table cell at 1x, 2x and 4x density
+WIDTHS = (80, 160, 320)
+FORMATS = ("webp", "jpeg")
+QUALITY = {"webp": 80, "jpeg": 82}
+SIZES = "(max-width: 768px) 60px, 80px"
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+HASH_LENGTH = 16
+
+
+def _pil_image():
+    from PIL import Image
+
+    return Image
+
+
+class ThumbnailCache:
+    """Generates and remembers the variants of every image in source_dir"""
+
+    def __init__(self, source_dir, cache_dir, widths=WIDTHS, formats=FORMATS):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(widths))
+        self.formats = formats
+        # filename -> ((mtime_ns, size), info dict from build())
+        self._index = {}
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+        self.generated = 0
+
+    def _source_path(self, filename):
+        # Only plain names inside source_dir; anything else is not ours to resize
+        if not filename or os.path.basename(filename) != filename:
+            return None
+        if os.path.splitext(filename)[1].lower() not in SOURCE_EXTENSIONS:
+            return None
+        return os.path.join(self.source_dir, filename)
+
+    def lookup(self, filename, signature=None):
+        """Return variant info for an image, or None while it is not ready yet.
+
+        signature is the source's (mtime_ns, size) when the caller already knows
+        it (the image catalog does); otherwise the file is stat'ed.
+        """
+        if not AVAILABLE:
+            return None
+        path = self._source_path(filename)
+        if path is None:
+            return None
+        if signature is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._index.get(filename)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with self._lock:
+            if filename not in self._queued:
+                self._queued.add(filename)
+                self._executor.submit(self._build_queued, filename)
+        return None
+
+    def _build_queued(self, filename):
+        try:
+            self.build(filename)
+        except Exception:
+            pass  # leave it to the original image; the next lookup retries
+        finally:
+            with self._lock:
+                self._queued.discard(filename)
+
+    def build(self, filename):
+        """Create any missing variants of one image synchronously and index them"""
+        path = self._source_path(filename)
+        if not AVAILABLE or path is None:
+            return None
+        Image = _pil_image()
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+        stem = os.path.splitext(filename)[0]
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        with Image.open(path) as source:
+            width, height = source.size
+            widths = [w for w in self.widths if w < width]
+            if width < self.widths[-1]:
+                # Narrow source: also offer it at full size rather than upscaling
+                widths.append(width)
+            variants = {fmt: [] for fmt in self.formats}
+            loaded = None
+            for fmt in self.formats:
+                for w in widths:
+                    name = f"{stem}-{digest}-{w}.{'jpg' if fmt == 'jpeg' else fmt}"
+                    variants[fmt].append((name, w))
+                    target = os.path.join(self.cache_dir, name)
+                    if os.path.exists(target):
+                        continue
+                    if loaded is None:
+                        loaded = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+                    image = loaded.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                    if fmt == "jpeg" and image.mode != "RGB":
+                        image = image.convert("RGB")
+                    tmp = target + ".tmp"
+                    image.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                    os.replace(tmp, target)
+                    self.generated += 1
+
+        self._remove_stale(stem, digest)
+        info = {"width": width, "height": height, "variants": variants}
+        with self._lock:
+            self._index[filename] = ((stat.st_mtime_ns, stat.st_size), info)
+        return info
+
+    def _remove_stale(self, stem, digest):
+        """Delete variants made from earlier contents of the same file"""
+        pattern = os.path.join(glob.escape(self.cache_dir), glob.escape(stem) + "-*")
+        for path in glob.glob(pattern):
+            rest = os.path.basename(path)[len(stem) + 1:]
+            parts = rest.split("-")
+            if len(parts) == 2 and len(parts[0]) == HASH_LENGTH and parts[0] != digest:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def prewarm(self):
+        """Build variants for every image in source_dir; returns the number of images"""
+        count = 0
+        for name in sorted(os.listdir(self.source_dir)):
+            if self._source_path(name) and os.path.isfile(os.path.join(self.source_dir, name)):
+                self.build(name)
+                count += 1
+        return count
+
+    def wait(self):
+        """Block until queued builds have finished (tests and the CLI)"""
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {"indexed": len(self._index), "queued": len(self._queued), "generated": self.generated}